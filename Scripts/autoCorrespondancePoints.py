@@ -4,6 +4,10 @@ Automated Correspondence Points Detection Script
 Uses YOLO to detect yard markers and automatically generate correspondence points
 based on NCAA football field standards.
 
+With --video the cached yard marker stage (yardMarkerDetection.py) samples the clip and
+the markers found over time are pooled into one robust set of correspondences per
+camera segment.
+
 Yard marker format: (near/far)(left/right)(yardNumber)
 Possible values: fl1,fl2,fl3,fl4,f5,nl1,nl2,nl3,nl4,n5,nr1,nr2,nr3,nr4,nr5
 
@@ -18,7 +22,7 @@ import cv2
 import json
 import os
 import numpy as np
-from ultralytics import YOLO
+from detectionPostprocess import extract_boxes
 
 # NCAA Field dimensions (in feet)
 FIELD_LENGTH_FT = 360  # 120 yards * 3 feet/yard
@@ -28,66 +32,93 @@ YARD_MARKER_HEIGHT_FT = 6  # Max height per NCAA rules
 YARD_MARKER_WIDTH_FT = 4   # Max width per NCAA rules
 YARD_MARKER_TOP_DIST_FT = 27  # 9 yards * 3 feet/yard from sidelines
 
-def load_yard_marker_model(model_path="yolo_models/bestYardMarkerDetector.pt"):
+# No yard marker weights are shipped in yolo_models/, the model path is always passed
+# explicitly and this is only the name the error message suggests
+EXPECTED_MODEL_PATH = "yolo_models/bestYardMarkerDetector.pt"
+MARKER_CONFIDENCE = 0.3
+
+def check_model_path(model_path):
+    """Raise a FileNotFoundError naming the expected weights if the yard marker model is missing"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Yard marker model not found: {model_path}. No yard marker weights are "
+                                f"shipped with the repository, train a model and pass its weights "
+                                f"(expected at {EXPECTED_MODEL_PATH})")
+
+def load_yard_marker_model(model_path):
     """Load the YOLO model for yard marker detection"""
-    try:
-        model = YOLO(model_path)
-        return model
-    except Exception as e:
-        print(f"Error loading yard marker model: {e}")
-        print("Please ensure you have a trained YOLO model for yard marker detection")
-        return None
+    check_model_path(model_path)
+    from ultralytics import YOLO
+    return YOLO(model_path)
 
-def detect_yard_markers(image_path, model):
+def marker_detections(result, names):
+    """
+    Convert one YOLO result into yard marker detections
+
+    Args:
+        result: YOLO result of one image
+        names: Class id to label mapping of the model
+
+    Returns:
+        List of detected yard markers with bounding boxes and labels
+    """
+    boxes = extract_boxes(result)
+    # Convert each column to Python floats in one call rather than per box
+    x1, y1, x2, y2 = boxes["xyxy"].T.tolist() if len(boxes["xyxy"]) else ([], [], [], [])
+    columns = zip(boxes["cls"].tolist(), boxes["conf"].tolist(), x1, y1, x2, y2,
+                  boxes["center_x"].tolist(), boxes["center_y"].tolist(),
+                  boxes["width"].tolist(), boxes["height"].tolist())
+
+    detections = []
+    for cls_id, conf, bx1, by1, bx2, by2, center_x, center_y, width, height in columns:
+        label = names[cls_id]
+        # Parse yard marker label (e.g., "fl1", "nr5", etc.)
+        if len(label) >= 3:  # Minimum length for valid yard marker
+            detections.append({
+                "label": label,
+                "confidence": conf,
+                "bbox": {
+                    "x1": bx1,
+                    "y1": by1,
+                    "x2": bx2,
+                    "y2": by2,
+                    "center_x": center_x,
+                    "center_y": center_y,
+                    "width": width,
+                    "height": height
+                }
+            })
+
+    return detections
+
+def detect_yard_markers(image, model):
     """
     Detect yard markers in the image using YOLO
     
     Args:
-        image_path: Path to input image
+        image: BGR image array (or path to the image)
         model: YOLO model for yard marker detection
     
     Returns:
         List of detected yard markers with bounding boxes and labels
     """
-    image = cv2.imread(image_path)
-    if image is None:
-        raise FileNotFoundError(f"Could not load image: {image_path}")
+    if isinstance(image, str):
+        image = read_image(image)
     
     # Run YOLO detection
-    results = model(image, verbose=False, conf=0.3)
+    results = model(image, verbose=False, conf=MARKER_CONFIDENCE)
     
     detections = []
     for r in results:
-        for box in r.boxes:
-            cls_id = int(box.cls.cpu().item())
-            conf = float(box.conf.cpu().item())
-            label = model.names[cls_id]
-            
-            # Parse yard marker label (e.g., "fl1", "nr5", etc.)
-            if len(label) >= 3:  # Minimum length for valid yard marker
-                x1, y1, x2, y2 = box.xyxy[0].cpu().tolist()
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                width = x2 - x1
-                height = y2 - y1
-                
-                detections.append({
-                    "label": label,
-                    "confidence": conf,
-                    "bbox": {
-                        "x1": float(x1),
-                        "y1": float(y1),
-                        "x2": float(x2),
-                        "y2": float(y2),
-                        "center_x": float(center_x),
-                        "center_y": float(center_y),
-                        "width": float(width),
-                        "height": float(height)
-                    }
-                })
+        detections.extend(marker_detections(r, model.names))
     
     return detections
 
+def read_image(image_path):
+    image = cv2.imread(image_path)
+    if image is None:
+        raise FileNotFoundError(f"Could not load image: {image_path}")
+    return image
+
 def parse_yard_marker_label(label):
     """
     Parse yard marker label to extract position and yard information
@@ -181,30 +212,18 @@ def calculate_field_coordinates(parsed_label, bbox, image_width, image_height):
         "yard_number": yard_number
     }
 
-def findCorrespondancePoints(image_path, model_path="yolo_models/yardMarkerDetector.pt"):
+def correspondences_from_detections(detections, image_width, image_height):
     """
-    Find correspondence points using automated yard marker detection
+    Turn yard marker detections into correspondence points
     
     Args:
-        image_path: Path to reference image
-        model_path: Path to YOLO model for yard marker detection
+        detections: Yard marker detections (see marker_detections)
+        image_width: Width of the frame
+        image_height: Height of the frame
     
     Returns:
         List of correspondence points
     """
-    # Load model
-    model = load_yard_marker_model(model_path)
-    if model is None:
-        return []
-    
-    # Detect yard markers
-    detections = detect_yard_markers(image_path, model)
-    print(f"Detected {len(detections)} yard markers")
-    
-    # Load image to get dimensions
-    image = cv2.imread(image_path)
-    image_height, image_width = image.shape[:2]
-    
     correspondence_points = []
     
     for detection in detections:
@@ -219,7 +238,7 @@ def findCorrespondancePoints(image_path, model_path="yolo_models/yardMarkerDetec
         )
         
         if field_coords:
-            correspondence_points.append({
+            point = {
                 "image_point": {
                     "x": detection["bbox"]["center_x"],
                     "y": detection["bbox"]["center_y"]
@@ -236,18 +255,171 @@ def findCorrespondancePoints(image_path, model_path="yolo_models/yardMarkerDetec
                     "yard_number": field_coords["yard_number"],
                     "confidence": detection["confidence"]
                 }
-            })
+            }
+            if "support" in detection:
+                point["yard_marker_info"]["support"] = detection["support"]
+                point["yard_marker_info"]["spread_px"] = detection["spread_px"]
+            correspondence_points.append(point)
+    
+    return correspondence_points
+
+def findCorrespondancePoints(image_path, model_path):
+    """
+    Find correspondence points using automated yard marker detection
+    
+    Args:
+        image_path: Path to reference image
+        model_path: Path to YOLO model for yard marker detection
+    
+    Returns:
+        List of correspondence points
+    """
+    # Load model
+    model = load_yard_marker_model(model_path)
+    
+    # Read the image once for detection and its dimensions
+    image = read_image(image_path)
+    image_height, image_width = image.shape[:2]
+    
+    # Detect yard markers
+    detections = detect_yard_markers(image, model)
+    print(f"Detected {len(detections)} yard markers")
+    
+    correspondence_points = correspondences_from_detections(detections, image_width, image_height)
     
     print(f"Generated {len(correspondence_points)} correspondence points")
     return correspondence_points
 
-def save_correspondence_points(points, output_path):
+def samples_from_marker_data(marker_data):
+    """
+    Group the frames of yard marker stage output into samples for pooling
+    
+    Args:
+        marker_data: Detection data written by yardMarkerDetection.py
+    
+    Returns:
+        List of {"frame_number", "segment", "detections"} in frame order, detections
+        in the format of marker_detections
+    """
+    samples = []
+    for frame in marker_data.get("frames", []):
+        detections = [{"label": d["class"], "confidence": d["confidence"], "bbox": d["bbox"]}
+                      for d in frame.get("detections", []) if len(d["class"]) >= 3]
+        samples.append({
+            "frame_number": frame["frame_number"],
+            "segment": frame.get("segment", 0),
+            "detections": detections
+        })
+    return samples
+
+def pool_marker_detections(samples, min_support=0.5):
+    """
+    Pool the detections of one camera segment into one robust detection per marker
+    
+    Per label the most confident detection of every sample is kept. Labels seen in
+    fewer than min_support of the samples are dropped as false positives, the pooled
+    position is the median of the centers after removing observations further than
+    three median absolute deviations (at least 2 px) from the median.
+    
+    Args:
+        samples: Samples of one segment from samples_from_marker_data
+        min_support: Fraction of the samples a marker must be detected in
+    
+    Returns:
+        List of pooled detections with "support" and "spread_px" added
+    """
+    observations = {}
+    for sample in samples:
+        best = {}
+        for detection in sample["detections"]:
+            label = detection["label"]
+            if label not in best or detection["confidence"] > best[label]["confidence"]:
+                best[label] = detection
+        for label, detection in best.items():
+            observations.setdefault(label, []).append(detection)
+    
+    pooled = []
+    required = max(1, int(np.ceil(min_support * len(samples))))
+    for label, detections in sorted(observations.items()):
+        if len(detections) < required:
+            continue
+        
+        centers = np.array([[d["bbox"]["center_x"], d["bbox"]["center_y"]] for d in detections])
+        confidences = np.array([d["confidence"] for d in detections])
+        distance = np.linalg.norm(centers - np.median(centers, axis=0), axis=1)
+        mad = np.median(distance)
+        inliers = distance <= max(3.0 * mad, 2.0)
+        if inliers.sum() < required:
+            continue
+        
+        center = np.median(centers[inliers], axis=0)
+        pooled.append({
+            "label": label,
+            "confidence": float(confidences[inliers].mean()),
+            "bbox": {"center_x": float(center[0]), "center_y": float(center[1])},
+            "support": int(inliers.sum()),
+            "spread_px": float(np.median(distance[inliers]))
+        })
+    
+    return pooled
+
+def findVideoCorrespondancePoints(video_path, model_path, every=15, batch_size=16,
+                                  cut_threshold=20.0, min_support=0.5, use_cache=True):
+    """
+    Find correspondence points for every camera segment of a video
+    
+    The sampled yard marker detections come from the cached yard marker stage, so the
+    model only runs the first time a clip is seen with these settings.
+    
+    Args:
+        video_path: Path to input video file
+        model_path: Path to YOLO model for yard marker detection
+        every: Sample one frame in this many
+        batch_size: Frames per model call
+        cut_threshold: Mean thumbnail change (0-255) between samples treated as a cut
+        min_support: Fraction of a segment's samples a marker must be detected in
+        use_cache: Reuse cached yard marker detections when possible
+    
+    Returns:
+        List of segments {"start_frame", "end_frame", "samples", "correspondences"}
+    """
+    from yardMarkerDetection import cachedYardMarkerDetection
+    from detectionStore import load_detection_data
+    
+    check_model_path(model_path)
+    marker_path, hit = cachedYardMarkerDetection(video_path, model_path, every, use_cache=use_cache,
+                                                 batch_size=batch_size, cut_threshold=cut_threshold)
+    marker_data = load_detection_data(marker_path)
+    width, height = marker_data["video_info"]["width"], marker_data["video_info"]["height"]
+    
+    samples = samples_from_marker_data(marker_data)
+    print(f"{'Loaded' if hit else 'Sampled'} {len(samples)} frames, "
+          f"{sum(len(s['detections']) for s in samples)} yard markers")
+    
+    segments = []
+    for segment in sorted(set(s["segment"] for s in samples)):
+        segment_samples = [s for s in samples if s["segment"] == segment]
+        pooled = pool_marker_detections(segment_samples, min_support)
+        segments.append({
+            "start_frame": segment_samples[0]["frame_number"],
+            "end_frame": segment_samples[-1]["frame_number"],
+            "samples": len(segment_samples),
+            "correspondences": correspondences_from_detections(pooled, width, height)
+        })
+        print(f"Segment {segment}: frames {segments[-1]['start_frame']}-{segments[-1]['end_frame']}, "
+              f"{len(segments[-1]['correspondences'])} correspondence points")
+    
+    return segments
+
+def save_correspondence_points(points, output_path, segments=None, source=None):
     """
     Save correspondence points to JSON file
     
     Args:
         points: List of correspondence points
         output_path: Path to output JSON file
+        segments: Optional per camera segment correspondences (video mode)
+        source: Optional image or video the points were found in
     """
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
@@ -268,6 +440,10 @@ def save_correspondence_points(points, output_path):
             }
         }
     }
+    if source is not None:
+        output_data["metadata"]["source"] = source
+    if segments is not None:
+        output_data["segments"] = segments
     
     with open(output_path, 'w') as f:
         json.dump(output_data, f, indent=2)
@@ -305,27 +481,44 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Automated Correspondence Points Detection')
-    parser.add_argument('--image', type=str, required=True, help='Path to reference image')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--image', type=str, help='Path to reference image')
+    source.add_argument('--video', type=str, help='Path to video, frames are sampled and pooled per camera segment')
     parser.add_argument('--output', type=str, default='cache/correspondence/correspondences.json', 
                        help='Path to output JSON file')
-    parser.add_argument('--model', type=str, default='yolo_models/yardMarkerDetector.pt',
-                       help='Path to YOLO model for yard marker detection')
+    parser.add_argument('--model', type=str, required=True,
+                       help=f'Path to YOLO model for yard marker detection (e.g. {EXPECTED_MODEL_PATH})')
     parser.add_argument('--min-points', type=int, default=4,
                        help='Minimum number of correspondence points required (default: 4)')
+    parser.add_argument('--every', type=int, default=15,
+                       help='Video mode: sample one frame in this many (default: 15)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                       help='Video mode: frames per model call (default: 16)')
+    parser.add_argument('--cut-threshold', type=float, default=20.0,
+                       help='Video mode: thumbnail change between samples treated as a camera cut (default: 20)')
+    parser.add_argument('--min-support', type=float, default=0.5,
+                       help='Video mode: fraction of a segment\'s samples a marker must appear in (default: 0.5)')
     
     args = parser.parse_args()
     
     try:
-        # Find correspondence points
-        points = findCorrespondancePoints(args.image, args.model)
+        segments = None
+        if args.video:
+            segments = findVideoCorrespondancePoints(args.video, args.model, args.every, args.batch_size,
+                                                     args.cut_threshold, args.min_support)
+            # The segment with the most points becomes the top-level correspondences
+            points = max((s["correspondences"] for s in segments), key=len, default=[])
+        else:
+            # Find correspondence points
+            points = findCorrespondancePoints(args.image, args.model)
         
         # Validate points
-        if not validate_correspondence_points(points):
-            print("Insufficient correspondence points found. Please check your image and model.")
+        if len(points) < args.min_points or not validate_correspondence_points(points):
+            print("Insufficient correspondence points found. Please check your input and model.")
             return 1
         
         # Save points
-        save_correspondence_points(points, args.output)
+        save_correspondence_points(points, args.output, segments, args.video or args.image)
         
         # Print summary
         print("\n=== CORRESPONDENCE POINTS SUMMARY ===")
@@ -335,6 +528,8 @@ def main():
             print(f"   Image: ({point['image_point']['x']:.1f}, {point['image_point']['y']:.1f})")
             print(f"   Field: ({point['field_point']['x']:.1f}, {point['field_point']['y']:.1f}) ft")
             print(f"   Confidence: {info['confidence']:.3f}")
+            if "support" in info:
+                print(f"   Seen in {info['support']} samples, spread {info['spread_px']:.1f} px")
             print()
         
         return 0
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Batch Process Script
+Runs every clip of a folder or data sheet through the processVideo pipeline on a
+pool of worker processes. Each worker loads the detection model once and reuses it
+for all of its clips. A summary report with throughput, failures and per-clip
+timings is written at the end.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+from processVideo import process_video, DEFAULT_MODEL_PATH
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv')
+
+# Model loaded once per worker process by init_worker
+_worker_model = None
+_worker_options = {}
+
+
+def find_videos(folder):
+    """List the video files of a folder, sorted by name"""
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith(VIDEO_EXTENSIONS)]
+
+
+def read_data_sheet(csv_path, video_dir=None):
+    """
+    Read the clips listed in a data sheet CSV (e.g. testing_data/video/video_data.csv)
+
+    The video column is the first one whose values are video file names. Paths are
+    resolved relative to video_dir, which defaults to the folder of the CSV file.
+
+    Args:
+        csv_path: Path to the data sheet
+        video_dir: Folder the video files are in
+
+    Returns:
+        List of video paths, in sheet order and without duplicates
+    """
+    video_dir = video_dir or os.path.dirname(csv_path)
+    with open(csv_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return []
+
+    column = next((col for col in rows[0] if str(rows[0][col]).lower().endswith(VIDEO_EXTENSIONS)), None)
+    if column is None:
+        raise ValueError(f"No video file column found in {csv_path}")
+
+    videos = []
+    for row in rows:
+        name = (row[column] or "").strip()
+        if not name:
+            continue
+        path = os.path.join(video_dir, name)
+        if path not in videos:
+            videos.append(path)
+    return videos
+
+
+def init_worker(model_path, options):
+    """Pool initializer: load the model once for every clip this worker processes"""
+    global _worker_model, _worker_options
+    from ultralytics import YOLO
+
+    # Each worker gets an equal share of the cores
+    import torch
+    torch.set_num_threads(options.pop("threads", 1))
+
+    _worker_model = YOLO(model_path)
+    _worker_options = options
+
+
+def process_clip(video_path):
+    """
+    Process one clip in a worker
+
+    Returns:
+        Dictionary with the clip status, timing and output paths (errors are reported, not raised)
+    """
+    start = time.perf_counter()
+    report = {"video": video_path, "worker": os.getpid()}
+    try:
+        results = process_video(video_path, _worker_options["output_dir"], _worker_options["model_path"],
+                                use_cache=_worker_options["use_cache"], model=_worker_model)
+        report.update({
+            "status": "completed",
+            "detection_output": results["detection_output"],
+            "homography_output": results["homography_output"],
+            "field_video_output": results["field_video_output"],
+            "cache_hits": results["cache_hits"]
+        })
+    except Exception as e:
+        report.update({"status": "failed", "error": str(e), "traceback": traceback.format_exc()})
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def batch_process(videos, output_dir="cache/processed_videos", model_path=DEFAULT_MODEL_PATH,
+                  workers=2, use_cache=True):
+    """
+    Process a list of clips on a pool of worker processes
+
+    Args:
+        videos: List of video paths
+        output_dir: Directory for the per-clip outputs
+        model_path: Path to the player detection weights
+        workers: Number of worker processes
+        use_cache: Reuse cached stage outputs when possible
+
+    Returns:
+        Summary report dictionary
+    """
+    missing = [video for video in videos if not os.path.exists(video)]
+    videos = [video for video in videos if os.path.exists(video)]
+    workers = max(1, min(workers, len(videos))) if videos else 1
+
+    options = {
+        "output_dir": output_dir,
+        "model_path": model_path,
+        "use_cache": use_cache,
+        "threads": max(1, (os.cpu_count() or 1) // workers)
+    }
+
+    print(f"Processing {len(videos)} clips with {workers} workers")
+    started = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    clips = []
+
+    if videos:
+        # spawn keeps CUDA and the OpenCV decoder out of forked children
+        with multiprocessing.get_context("spawn").Pool(workers, initializer=init_worker,
+                                                       initargs=(model_path, options)) as pool:
+            # Clips are handed out one at a time so long clips do not hold up a whole chunk
+            for report in pool.imap_unordered(process_clip, videos, chunksize=1):
+                clips.append(report)
+                print(f"[{len(clips)}/{len(videos)}] {report['status']:<9} {report['seconds']:8.1f}s  {report['video']}")
+
+    for video in missing:
+        clips.append({"video": video, "status": "failed", "error": "Video file not found", "seconds": 0.0})
+
+    wall_seconds = time.perf_counter() - start
+    completed = [clip for clip in clips if clip["status"] == "completed"]
+    failed = [clip for clip in clips if clip["status"] == "failed"]
+
+    return {
+        "started": started,
+        "model": model_path,
+        "workers": workers,
+        "clips_total": len(clips),
+        "clips_completed": len(completed),
+        "clips_failed": len(failed),
+        "wall_seconds": round(wall_seconds, 3),
+        "clip_seconds": round(sum(clip["seconds"] for clip in clips), 3),
+        "clips_per_minute": round(len(completed) * 60 / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "failures": [{"video": clip["video"], "error": clip["error"]} for clip in failed],
+        "clips": sorted(clips, key=lambda clip: clip["video"])
+    }
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Process every clip of a folder or data sheet on a pool of workers")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--folder", help="Folder of video files to process")
+    source.add_argument("--csv", help="Data sheet CSV listing the video files (e.g. testing_data/video/video_data.csv)")
+    parser.add_argument("--video-dir", default=None, help="Folder of the videos listed in --csv (default: the CSV folder)")
+    parser.add_argument("--output-dir", default="cache/processed_videos", help="Output directory for processed files")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Path to player detection weights")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes (default: 2)")
+    parser.add_argument("--no-cache", action="store_true", help="Rerun every stage even if a cached output exists")
+    parser.add_argument("--report", default=None, help="Path to the summary report (default: <output-dir>/batch_report.json)")
+
+    args = parser.parse_args()
+
+    try:
+        videos = find_videos(args.folder) if args.folder else read_data_sheet(args.csv, args.video_dir)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if not videos:
+        print("No videos found")
+        sys.exit(1)
+
+    summary = batch_process(videos, args.output_dir, args.model, args.workers, use_cache=not args.no_cache)
+
+    report_path = args.report or os.path.join(args.output_dir, "batch_report.json")
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Completed {summary['clips_completed']}/{summary['clips_total']} clips in {summary['wall_seconds']:.1f}s "
+          f"({summary['clips_per_minute']:.2f} clips/min)")
+    for failure in summary["failures"]:
+        print(f"  failed: {failure['video']}: {failure['error']}")
+    print(f"Summary report saved to: {report_path}")
+
+    if summary["clips_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
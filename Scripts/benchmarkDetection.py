@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Detection Benchmark Script
+Runs playerDetection-style processing on a clip (or on a generated synthetic clip so it
+works without real footage) and reports where the time goes: p50/p95 latency per stage
+(decode, preprocess, inference, postprocess, serialize), overall frames/sec and peak RSS.
+Results are written as JSON so runs can be diffed across versions and machines.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+from detectionPostprocess import build_class_mask, extract_boxes, boxes_to_detections
+from detectorBackend import load_detector, BACKENDS
+from playerDetection import PLAYER_CLASSES
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is reported as unavailable
+    resource = None
+
+STAGES = ("decode", "preprocess", "inference", "postprocess", "serialize")
+
+
+def make_synthetic_clip(output_path, frames=300, width=1280, height=720, fps=30, players=22, seed=0):
+    """
+    Write a synthetic wide-angle clip: a green field with yard lines and moving player-sized boxes
+
+    Args:
+        output_path: Path to the .mp4 file to write
+        frames: Number of frames
+        width: Frame width
+        height: Frame height
+        fps: Frame rate
+        players: Number of moving players
+        seed: Random seed so every run decodes the same clip
+
+    Returns:
+        output_path
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform([0, height * 0.3], [width, height * 0.9], size=(players, 2))
+    velocities = rng.normal(0, 3, size=(players, 2))
+    colors = rng.integers(0, 255, size=(players, 3)).tolist()
+
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+    background[:] = (40, 140, 50)
+    for x in np.linspace(0, width, 12).astype(int):
+        cv2.line(background, (int(x), int(height * 0.25)), (int(x), height), (255, 255, 255), 2)
+
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        for _ in range(frames):
+            frame = background.copy()
+            positions += velocities
+            positions[:, 0] %= width
+            positions[:, 1] = np.clip(positions[:, 1], height * 0.3, height * 0.9)
+            for (x, y), color in zip(positions.astype(int).tolist(), colors):
+                cv2.rectangle(frame, (x - 8, y - 40), (x + 8, y), color, -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return output_path
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where the resource module is unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(samples_ms):
+    """p50/p95/mean of a list of per-frame latencies in milliseconds"""
+    if not samples_ms:
+        return {"p50_ms": None, "p95_ms": None, "mean_ms": None}
+    samples = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "mean_ms": round(float(samples.mean()), 3)
+    }
+
+
+def benchmark_detection(video_path, model_path, backend="torch", max_frames=None, warmup=5):
+    """
+    Time every stage of detection on one clip, one frame at a time
+
+    With the torch backend, preprocess/inference/postprocess come from the timings Ultralytics
+    records on each result; our own box extraction is added to postprocess. With the onnx
+    backend every stage is timed directly.
+
+    Args:
+        video_path: Path to the clip
+        model_path: Path to the model weights
+        backend: "torch" or "onnx"
+        max_frames: Stop after this many frames (None runs the whole clip)
+        warmup: Frames run before timing starts
+
+    Returns:
+        Report dictionary
+    """
+    model = load_detector(model_path, backend)
+    class_mask = build_class_mask(model.names, PLAYER_CLASSES)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    timings = {stage: [] for stage in STAGES}
+    frame_number = 0
+    detections = 0
+    timed_seconds = 0.0
+
+    while max_frames is None or frame_number < max_frames + warmup:
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        decoded = time.perf_counter()
+        if not ret:
+            break
+
+        if backend == "onnx":
+            batch = model.preprocess([frame])
+            preprocessed = time.perf_counter()
+            predictions = model.infer(batch)
+            inferred = time.perf_counter()
+            r = model.decode(predictions, [frame])[0]
+            preprocess_ms = (preprocessed - decoded) * 1000
+            inference_ms = (inferred - preprocessed) * 1000
+            extra_postprocess_ms = (time.perf_counter() - inferred) * 1000
+        else:
+            r = model(frame, verbose=False)[0]
+            preprocess_ms = r.speed["preprocess"]
+            inference_ms = r.speed["inference"]
+            extra_postprocess_ms = r.speed["postprocess"]
+
+        extract_start = time.perf_counter()
+        boxes = extract_boxes(r, class_mask)
+        frame_data = {
+            "frame_number": frame_number,
+            "timestamp": frame_number / fps,
+            "detections": boxes_to_detections(boxes, model.names)
+        }
+        extracted = time.perf_counter()
+        json.dumps(frame_data)
+        serialized = time.perf_counter()
+
+        if frame_number >= warmup:
+            timings["decode"].append((decoded - start) * 1000)
+            timings["preprocess"].append(preprocess_ms)
+            timings["inference"].append(inference_ms)
+            timings["postprocess"].append(extra_postprocess_ms + (extracted - extract_start) * 1000)
+            timings["serialize"].append((serialized - extracted) * 1000)
+            timed_seconds += serialized - start
+            detections += len(frame_data["detections"])
+        frame_number += 1
+
+    cap.release()
+    timed_frames = len(timings["decode"])
+    if timed_frames == 0:
+        raise ValueError(f"Not enough frames in {video_path} to benchmark (warmup is {warmup})")
+
+    return {
+        "video": video_path,
+        "model": model_path,
+        "backend": backend,
+        "frames": timed_frames,
+        "warmup_frames": warmup,
+        "detections": detections,
+        "fps": round(timed_frames / timed_seconds, 2),
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None
+    }
+
+
+def environment():
+    """Machine and library versions, so reports from different hosts can be told apart"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__
+    }
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Benchmark player detection with a per-stage latency breakdown")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--video', type=str, help='Clip to benchmark')
+    source.add_argument('--synthetic', action='store_true', help='Benchmark on a generated synthetic clip')
+    parser.add_argument('--synthetic-frames', type=int, default=300, help='Frames in the synthetic clip (default: 300)')
+    parser.add_argument('--model', type=str, default='yolo_models/bestPlayerDetectorM.pt', help='Path to model weights')
+    parser.add_argument('--backend', type=str, choices=BACKENDS, default='torch', help='Inference backend (default: torch)')
+    parser.add_argument('--max-frames', type=int, default=None, help='Timed frames (default: the whole clip)')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed warmup frames (default: 5)')
+    parser.add_argument('--output', type=str, default='cache/benchmarks/detection.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = args.video
+        if args.synthetic:
+            video_path = make_synthetic_clip(os.path.join(tmp_dir, "synthetic.mp4"), frames=args.synthetic_frames)
+
+        report = benchmark_detection(video_path, args.model, args.backend, args.max_frames, args.warmup)
+
+    if args.synthetic:
+        report["video"] = f"synthetic ({args.synthetic_frames} frames)"
+    report["created"] = datetime.now().isoformat(timespec="seconds")
+    report["environment"] = environment()
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    peak = f"{report['peak_rss_mb']:.1f} MB" if report["peak_rss_mb"] is not None else "unavailable"
+    print(f"{report['frames']} frames at {report['fps']:.2f} fps, peak RSS {peak}")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<12} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+    print(f"Benchmark report saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Homography Benchmark Script
+Compares the vectorized homography transform (all detections in one
+cv2.perspectiveTransform call) against the previous per-detection loop, and checks
+that both produce exactly the same field_coords
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from detectionStore import load_detection_data
+from homographyTransform import loadHomography, transformFrames
+
+# Wide camera on a field in feet, used when no correspondence file is given
+SYNTHETIC_PIXELS = np.array([[200, 900], [1700, 900], [1400, 300], [500, 300]], dtype=np.float32)
+SYNTHETIC_FIELD = np.array([[0, 0], [120, 0], [120, 160], [0, 160]], dtype=np.float32)
+
+
+def transformFramesLoop(frames, H):
+    """The previous implementation: one cv2.perspectiveTransform call per detection"""
+    for frame in frames:
+        for det in frame.get("detections", []):
+            bbox = det["bbox"]
+            x = (bbox["x1"] + bbox["x2"]) / 2.0
+            y = bbox["y2"]
+            pt = np.array([[x, y]], dtype=np.float32).reshape(-1, 1, 2)
+            transformed = cv2.perspectiveTransform(pt, H)[0][0]
+            det["field_coords"] = {"x": float(transformed[0]), "y": float(transformed[1])}
+    return frames
+
+
+def synthetic_frames(frame_count, detections_per_frame=22, width=1920, height=1080, seed=0):
+    """Generate detection frames with random player-sized boxes"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for frame_number in range(frame_count):
+        x1 = rng.uniform(0, width - 40, detections_per_frame)
+        y1 = rng.uniform(height * 0.25, height - 90, detections_per_frame)
+        w = rng.uniform(15, 40, detections_per_frame)
+        h = rng.uniform(40, 90, detections_per_frame)
+        detections = []
+        for bx1, by1, bw, bh in zip(x1.tolist(), y1.tolist(), w.tolist(), h.tolist()):
+            detections.append({"bbox": {"x1": bx1, "y1": by1, "x2": bx1 + bw, "y2": by1 + bh}})
+        frames.append({"frame_number": frame_number, "detections": detections})
+    return frames
+
+
+def time_transform(transform, frames, H, repeats):
+    """Best-of-N wall time of a transform on a fresh copy of the frames"""
+    best = None
+    result = None
+    for _ in range(repeats):
+        data = copy.deepcopy(frames)
+        start = time.perf_counter()
+        result = transform(data, H)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized homography transform against the per-detection loop")
+    parser.add_argument('--input', type=str, default=None, help='Detection file to transform (default: synthetic detections)')
+    parser.add_argument('--correspondence', type=str, default=None, help='Correspondence points JSON (default: synthetic homography)')
+    parser.add_argument('--frames', type=int, default=5000, help='Synthetic frames (default: 5000)')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed repetitions, the best is reported (default: 3)')
+    parser.add_argument('--output', type=str, default='cache/benchmarks/homography.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    frames = load_detection_data(args.input)["frames"] if args.input else synthetic_frames(args.frames)
+    if args.correspondence:
+        H = loadHomography(args.correspondence)
+    else:
+        H, _ = cv2.findHomography(SYNTHETIC_PIXELS, SYNTHETIC_FIELD)
+
+    detections = sum(len(frame.get("detections", [])) for frame in frames)
+    print(f"Transforming {detections} detections in {len(frames)} frames")
+
+    loop_seconds, expected = time_transform(transformFramesLoop, frames, H, args.repeats)
+    vector_seconds, actual = time_transform(transformFrames, frames, H, args.repeats)
+
+    identical = all(a.get("field_coords") == b.get("field_coords")
+                    for fa, fb in zip(expected, actual)
+                    for a, b in zip(fa.get("detections", []), fb.get("detections", [])))
+
+    report = {
+        "input": args.input or f"synthetic ({len(frames)} frames)",
+        "frames": len(frames),
+        "detections": detections,
+        "loop_seconds": round(loop_seconds, 4),
+        "vectorized_seconds": round(vector_seconds, 4),
+        "speedup": round(loop_seconds / vector_seconds, 2) if vector_seconds > 0 else None,
+        "identical": identical
+    }
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Per-detection loop: {loop_seconds:.3f}s | vectorized: {vector_seconds:.3f}s "
+          f"({report['speedup']}x) | outputs identical: {identical}")
+    print(f"Benchmark report saved to: {args.output}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Hough Yard Line Benchmark Script
+Compares the Hough yard line fallback (downscaled, field-masked, NumPy clustering, line
+reuse across near-identical frames) with the full resolution Canny + HoughLines + Python
+loop of Experimentation/detectYardMarkers_v2.py, on a clip or on a generated synthetic clip.
+Frames are decoded before timing, so only line detection is measured.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+from benchmarkDetection import make_synthetic_clip, summarize, environment
+from houghLines import HoughLineDetector
+
+
+def detect_yard_lines_full(image):
+    """The previous approach: Canny and HoughLines at full resolution, lines filtered in a Python loop"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+    lines = cv2.HoughLines(edges, 1, np.pi / 180, threshold=100)
+
+    yard_lines = []
+    if lines is not None:
+        for line in lines:
+            rho, theta = line[0]
+            if abs(theta - np.pi / 2) < 0.1 or abs(theta) < 0.1:
+                a = np.cos(theta)
+                b = np.sin(theta)
+                x0 = a * rho
+                y0 = b * rho
+                yard_lines.append(((int(x0 + 1000 * (-b)), int(y0 + 1000 * a)),
+                                   (int(x0 - 1000 * (-b)), int(y0 - 1000 * a))))
+    return yard_lines
+
+
+def read_frames(video_path, max_frames=None):
+    """Decode a clip into memory"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    frames = []
+    try:
+        while max_frames is None or len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def time_method(detect, frames):
+    """Per-frame latency and line count of one method"""
+    samples_ms = []
+    lines = []
+    for frame in frames:
+        start = time.perf_counter()
+        result = detect(frame)
+        samples_ms.append((time.perf_counter() - start) * 1000.0)
+        lines.append(len(result[0]) if isinstance(result, tuple) else len(result))
+    report = summarize(samples_ms)
+    report["fps"] = round(1000.0 * len(frames) / sum(samples_ms), 2) if samples_ms else None
+    report["lines_per_frame"] = round(float(np.mean(lines)), 2) if lines else None
+    return report
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Benchmark the Hough yard line fallback against full resolution Hough")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--video', type=str, help='Clip to benchmark')
+    source.add_argument('--synthetic', action='store_true', help='Benchmark on a generated synthetic clip')
+    parser.add_argument('--synthetic-frames', type=int, default=300, help='Frames in the synthetic clip (default: 300)')
+    parser.add_argument('--max-frames', type=int, default=None, help='Timed frames (default: the whole clip)')
+    parser.add_argument('--scale', type=float, default=0.5, help='Downscale factor of the fallback (default: 0.5)')
+    parser.add_argument('--output', type=str, default='cache/benchmarks/hough.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = args.video
+        if args.synthetic:
+            video_path = make_synthetic_clip(os.path.join(tmp_dir, "synthetic.mp4"), frames=args.synthetic_frames)
+        frames = read_frames(video_path, args.max_frames)
+
+    print(f"Benchmarking yard line detection on {len(frames)} frames")
+    reuse = HoughLineDetector(scale=args.scale)
+    methods = {
+        "full_resolution_loop": detect_yard_lines_full,
+        "fallback": HoughLineDetector(scale=args.scale, reuse_threshold=None),
+        "fallback_with_reuse": reuse
+    }
+    results = {name: time_method(detect, frames) for name, detect in methods.items()}
+    results["fallback_with_reuse"]["reuse_ratio"] = round(reuse.reuse_ratio(), 4)
+
+    baseline = results["full_resolution_loop"]["mean_ms"]
+    for name in ("fallback", "fallback_with_reuse"):
+        mean = results[name]["mean_ms"]
+        results[name]["speedup"] = round(baseline / mean, 2) if mean else None
+
+    report = {
+        "video": f"synthetic ({args.synthetic_frames} frames)" if args.synthetic else args.video,
+        "frames": len(frames),
+        "scale": args.scale,
+        "methods": results,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment()
+    }
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in results.items():
+        extra = f"  {stats['speedup']}x" if "speedup" in stats else ""
+        print(f"  {name:<22} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   "
+              f"{stats['lines_per_frame']:5.1f} lines/frame{extra}")
+    print(f"Lines reused on {results['fallback_with_reuse']['reuse_ratio']:.1%} of the frames")
+    print(f"Benchmark report saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Keyframe Benchmark Script
+Compares keyframe detection with optical-flow propagation against running the
+detector on every frame: throughput (frames/sec) and box agreement
+(IoU-matched recall and precision against the full detection)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+from ultralytics import YOLO
+from boxPropagation import keyframe_detect, SOURCE_DETECTED
+from detectionPostprocess import build_class_mask, extract_boxes, agreement
+from playerDetection import PLAYER_CLASSES
+
+
+def load_frames(video_path, max_frames=None):
+    """Decode a clip into memory so decoding is not part of the timed runs"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def benchmark_clip(video_path, model, class_mask, intervals, motion_threshold=None, iou_threshold=0.5, max_frames=None):
+    """
+    Benchmark keyframe intervals on one clip
+
+    Returns:
+        Dictionary with the full detection baseline and one entry per interval
+    """
+    frames = load_frames(video_path, max_frames)
+    if not frames:
+        raise ValueError(f"No frames decoded from {video_path}")
+
+    def detect(frame):
+        return extract_boxes(model(frame, verbose=False)[0], class_mask)
+
+    # Warm up so model initialization is not counted in the first run
+    detect(frames[0])
+
+    start = time.perf_counter()
+    reference = [detect(frame) for frame in frames]
+    full_seconds = time.perf_counter() - start
+
+    report = {
+        "video": video_path,
+        "frames": len(frames),
+        "full_detection": {
+            "seconds": round(full_seconds, 3),
+            "fps": round(len(frames) / full_seconds, 2)
+        },
+        "keyframes": []
+    }
+
+    for interval in intervals:
+        start = time.perf_counter()
+        outputs = list(keyframe_detect(enumerate(frames), detect, interval, motion_threshold))
+        seconds = time.perf_counter() - start
+
+        keyframes = sum(1 for _, _, source in outputs if source == SOURCE_DETECTED)
+        result = {
+            "interval": interval,
+            "motion_threshold": motion_threshold,
+            "seconds": round(seconds, 3),
+            "fps": round(len(frames) / seconds, 2),
+            "speedup": round(full_seconds / seconds, 2),
+            "keyframes": keyframes
+        }
+        result.update(agreement(reference, [boxes for _, boxes, _ in outputs], iou_threshold))
+        report["keyframes"].append(result)
+
+        print(f"  interval {interval:>3}: {result['fps']:7.2f} fps ({result['speedup']:.2f}x) "
+              f"| keyframes {keyframes}/{len(frames)} "
+              f"| recall {result['recall']:.3f} precision {result['precision']:.3f}")
+
+    return report
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Benchmark keyframe detection against full per-frame detection")
+    parser.add_argument('--video', type=str, nargs='+', required=True, help='One or more clips to benchmark')
+    parser.add_argument('--model', type=str, default='yolo_models/bestPlayerDetectorM.pt', help='Path to YOLO model weights')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[2, 3, 5, 10], help='Keyframe intervals to test')
+    parser.add_argument('--motion-threshold', type=float, default=None, help='Adaptive keyframe motion threshold in pixels')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU threshold for box agreement (default: 0.5)')
+    parser.add_argument('--max-frames', type=int, default=300, help='Frames per clip (default: 300)')
+    parser.add_argument('--output', type=str, default='cache/benchmarks/keyframes.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    class_mask = build_class_mask(model.names, PLAYER_CLASSES)
+
+    reports = []
+    for video_path in args.video:
+        print(f"Benchmarking {video_path}")
+        report = benchmark_clip(video_path, model, class_mask, args.intervals, args.motion_threshold,
+                                args.iou, args.max_frames)
+        print(f"  full detection: {report['full_detection']['fps']:.2f} fps")
+        reports.append(report)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({"model": args.model, "iou_threshold": args.iou, "clips": reports}, f, indent=2)
+
+    print(f"Benchmark report saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# keyframe detection with cheap motion propagation in between
+# the full detector only runs on keyframes; on the frames in between every box is moved
+# by the median sparse optical flow (Lucas-Kanade) of a small grid of points inside it.
+# a new keyframe is forced when the propagated boxes have moved too far or too many
+# of their points were lost, so drift is bounded even with a long keyframe interval.
+
+import warnings
+import cv2
+import numpy as np
+from detectionPostprocess import boxes_from_arrays, select_boxes
+
+SOURCE_DETECTED = "detected"
+SOURCE_PROPAGATED = "propagated"
+
+
+def box_grid_points(xyxy, grid=3):
+    """
+    Sample a grid of points inside the central part of every box
+
+    Args:
+        xyxy: Array of shape (N, 4)
+        grid: Points per box side
+
+    Returns:
+        Array of shape (N * grid * grid, 1, 2) ready for cv2.calcOpticalFlowPyrLK
+    """
+    t = np.linspace(0.2, 0.8, grid)
+    gx, gy = np.meshgrid(t, t)
+    x1, y1, x2, y2 = xyxy.T
+    px = x1[:, None] + (x2 - x1)[:, None] * gx.ravel()[None, :]
+    py = y1[:, None] + (y2 - y1)[:, None] * gy.ravel()[None, :]
+    return np.stack([px, py], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+
+
+class BoxPropagator:
+    """Moves the boxes of the last keyframe along the optical flow of each new frame"""
+
+    def __init__(self, scale=0.5, grid=3):
+        """
+        Args:
+            scale: Frames are downscaled by this factor before computing flow
+            grid: Points tracked per box side
+        """
+        self.scale = scale
+        self.grid = grid
+        self.prev_gray = None
+        self.boxes = None
+        self.frame_size = None
+        self.motion = 0.0
+        self.lost_fraction = 0.0
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, frame, boxes):
+        """Start propagating from a freshly detected keyframe"""
+        self.prev_gray = self._gray(frame)
+        self.boxes = boxes
+        self.frame_size = frame.shape[1], frame.shape[0]
+        self.motion = 0.0
+        self.lost_fraction = 0.0
+
+    def propagate(self, frame):
+        """
+        Move the current boxes onto a new frame
+
+        Updates self.motion (median box displacement in pixels accumulated since the
+        keyframe) and self.lost_fraction (fraction of tracked points lost on this frame).
+
+        Returns:
+            Boxes dictionary for the new frame
+        """
+        gray = self._gray(frame)
+        boxes = self.boxes
+        count = len(boxes["conf"])
+
+        if count == 0:
+            self.prev_gray = gray
+            return boxes
+
+        points = box_grid_points(boxes["xyxy"] * self.scale, self.grid)
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None,
+                                                          winSize=(15, 15), maxLevel=2)
+
+        tracked = status.reshape(count, -1).astype(bool)
+        flow = (next_points - points).reshape(count, -1, 2) / self.scale
+        flow = np.where(tracked[..., None], flow, np.nan)
+
+        # Median displacement of the points that were tracked, boxes with no tracked points stay put
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            shift = np.nanmedian(flow, axis=1)
+        lost = np.isnan(shift[:, 0])
+        shift[lost] = 0.0
+
+        width, height = self.frame_size
+        xyxy = boxes["xyxy"] + np.tile(shift, 2)
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+
+        moved = boxes_from_arrays(xyxy, boxes["conf"], boxes["cls"])
+        # Drop boxes that were pushed off the frame
+        moved = select_boxes(moved, (moved["width"] >= 1) & (moved["height"] >= 1))
+
+        if (~lost).any():
+            self.motion += float(np.median(np.hypot(shift[~lost, 0], shift[~lost, 1])))
+        self.lost_fraction = 1.0 - float(tracked.mean())
+        self.prev_gray = gray
+        self.boxes = moved
+        return moved
+
+
+def keyframe_detect(frames, detect, keyframe_interval, motion_threshold=None, drift_threshold=0.5, propagator=None):
+    """
+    Run a detector on keyframes only and propagate its boxes to the frames in between
+
+    Args:
+        frames: Iterable of (frame_number, frame)
+        detect: Callable taking a frame and returning a boxes dictionary
+        keyframe_interval: Run the detector at least every N frames
+        motion_threshold: Force a keyframe once boxes have moved this many pixels since the last one (None disables)
+        drift_threshold: Force a keyframe when more than this fraction of tracked points is lost
+        propagator: BoxPropagator to use (a default one is created if None)
+
+    Yields:
+        (frame_number, boxes, source) where source is "detected" or "propagated"
+    """
+    if keyframe_interval < 1:
+        raise ValueError(f"keyframe_interval must be at least 1, got {keyframe_interval}")
+
+    propagator = propagator or BoxPropagator()
+    since_keyframe = None
+
+    for frame_number, frame in frames:
+        source = SOURCE_DETECTED
+        if since_keyframe is not None and since_keyframe < keyframe_interval:
+            boxes = propagator.propagate(frame)
+            drifted = propagator.lost_fraction > drift_threshold
+            moved = motion_threshold is not None and propagator.motion > motion_threshold
+            if not (drifted or moved):
+                source = SOURCE_PROPAGATED
+
+        if source == SOURCE_DETECTED:
+            boxes = detect(frame)
+            propagator.reset(frame, boxes)
+            since_keyframe = 0
+
+        since_keyframe += 1
+        yield frame_number, boxes, source
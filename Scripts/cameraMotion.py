@@ -0,0 +1,350 @@
+# per-frame homography for a moving (panning / zooming) camera
+# the correspondence file gives the pixel to field homography H_ref of one reference frame.
+# for every following frame the camera motion since the previous frame is estimated from
+# sparse features on the field markings (Lucas-Kanade tracking + RANSAC homography) and
+# chained onto a running frame -> reference transform M, so each frame gets
+# H = H_ref @ M without recomputing anything from scratch.
+#
+# every step adds a little error, so the accumulated RANSAC residual is kept as a drift
+# estimate. once it exceeds a threshold (or tracking fails) the frame is re-anchored:
+# handed to an anchor that returns H outright (YardMarkerAnchor: the yard markers of the
+# cached yard marker stage around that frame, refined with the yard lines of the cached
+# yard line stage), or registered directly against the reference frame with ORB features
+# when there is no anchor or it finds too few markers.
+
+import cv2
+import numpy as np
+from autoCorrespondancePoints import samples_from_marker_data, pool_marker_detections, correspondences_from_detections
+from fieldMask import green_field_mask
+
+# Sample one frame in this many for the yard marker anchor
+MARKER_EVERY = 5
+# Yard lines are painted every 5 yards
+YARD_LINE_SPACING_FT = 15.0
+
+
+def marking_mask(frame):
+    """
+    Mask of the field markings (white lines, numbers and hashes on the turf)
+
+    Args:
+        frame: BGR frame
+
+    Returns:
+        uint8 mask, 255 on bright low-saturation pixels inside the field
+    """
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    white = cv2.inRange(hsv, (0, 0, 170), (179, 60, 255))
+    field = cv2.dilate(green_field_mask(frame), cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+    return cv2.bitwise_and(white, field)
+
+
+def _scale_matrix(scale):
+    return np.diag([scale, scale, 1.0])
+
+
+def _rms_residual(H, src, dst, inliers):
+    """Root mean square reprojection error of the RANSAC inliers"""
+    if inliers is None or not inliers.any():
+        return float("inf")
+    mask = inliers.ravel().astype(bool)
+    projected = cv2.perspectiveTransform(src[mask], H)
+    return float(np.sqrt(np.mean(np.sum((projected - dst[mask]) ** 2, axis=-1))))
+
+
+class CameraMotionTracker:
+    """Keeps the pixel to field homography of a moving camera up to date frame by frame"""
+
+    def __init__(self, H_ref, reference_frame, scale=0.5, max_features=400, min_inliers=25,
+                 drift_threshold=3.0, anchor=None, anchor_retry=30):
+        """
+        Args:
+            H_ref: 3x3 pixel to field homography of the reference frame
+            reference_frame: BGR frame the correspondences were picked on
+            scale: Frames are downscaled by this factor for feature tracking
+            max_features: Features tracked between consecutive frames
+            min_inliers: Fewer RANSAC inliers than this counts as lost tracking
+            drift_threshold: Accumulated residual (pixels at full resolution) that triggers a re-anchor
+            anchor: Optional callable taking a frame and its frame number and returning its
+                3x3 pixel to field homography (or None, then ORB registration is tried)
+            anchor_retry: Frames to wait after a failed re-anchor before trying again, the
+                incremental estimate is used meanwhile (e.g. while the reference is out of view)
+        """
+        self.H_ref = np.asarray(H_ref, dtype=np.float64)
+        self.scale = scale
+        self.max_features = max_features
+        self.min_inliers = min_inliers
+        self.drift_threshold = drift_threshold
+        self.anchor = anchor
+        self.anchor_retry = anchor_retry
+
+        self.orb = cv2.ORB_create(2000)
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        self.reference_gray = self._gray(reference_frame)
+        self.reference_features = self.orb.detectAndCompute(self.reference_gray, self._mask(reference_frame))
+
+        self.prev_gray = None
+        self.prev_mask = None
+        self.M = None
+        self.drift = 0.0
+        self.anchors = 0
+        self.failed_anchors = 0
+        self.frames = 0
+        self.frame_number = 0
+        self.retry_at = 0
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _mask(self, frame):
+        mask = marking_mask(frame)
+        if self.scale != 1.0:
+            mask = cv2.resize(mask, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_NEAREST)
+        # Markings are thin, grow them a little so corners on both sides of a line are found
+        return cv2.dilate(mask, np.ones((5, 5), np.uint8))
+
+    def _to_full(self, A):
+        """Convert a homography between downscaled frames to full resolution"""
+        S = _scale_matrix(self.scale)
+        return np.linalg.inv(S) @ A @ S
+
+    def _track(self, gray):
+        """
+        Estimate the motion from the previous frame to this one
+
+        Returns:
+            (A, residual) where A maps current full resolution pixels to previous ones,
+            or (None, inf) if tracking failed
+        """
+        points = cv2.goodFeaturesToTrack(self.prev_gray, self.max_features, 0.01, 8, mask=self.prev_mask)
+        if points is None or len(points) < self.min_inliers:
+            # Not enough markings in view, fall back to any texture in the frame
+            points = cv2.goodFeaturesToTrack(self.prev_gray, self.max_features, 0.01, 8)
+        if points is None or len(points) < self.min_inliers:
+            return None, float("inf")
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None,
+                                                          winSize=(21, 21), maxLevel=3)
+        tracked = status.ravel().astype(bool)
+        if tracked.sum() < self.min_inliers:
+            return None, float("inf")
+
+        src, dst = next_points[tracked], points[tracked]
+        A, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 2.0)
+        if A is None or inliers.sum() < self.min_inliers:
+            return None, float("inf")
+
+        return self._to_full(A), _rms_residual(A, src, dst, inliers) / self.scale
+
+    def _register(self, frame, gray):
+        """
+        Re-anchor a frame directly to the reference frame
+
+        Returns:
+            (M, residual) where M maps current pixels to reference pixels, or (None, inf)
+        """
+        if self.anchor is not None:
+            H = self.anchor(frame, self.frame_number)
+            if H is not None:
+                return np.linalg.inv(self.H_ref) @ np.asarray(H, dtype=np.float64), 0.0
+
+        ref_keypoints, ref_descriptors = self.reference_features
+        keypoints, descriptors = self.orb.detectAndCompute(gray, self._mask(frame))
+        if ref_descriptors is None or descriptors is None:
+            return None, float("inf")
+
+        matches = self.matcher.match(descriptors, ref_descriptors)
+        if len(matches) < self.min_inliers:
+            return None, float("inf")
+
+        src = np.float32([keypoints[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+        dst = np.float32([ref_keypoints[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+        A, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        if A is None or inliers.sum() < self.min_inliers:
+            return None, float("inf")
+
+        return self._to_full(A), _rms_residual(A, src, dst, inliers) / self.scale
+
+    def update(self, frame, frame_number=None):
+        """
+        Advance to the next frame
+
+        Args:
+            frame: BGR frame, frames must be passed in order
+            frame_number: Frame number in the video, passed to the anchor (default: frames
+                passed so far)
+
+        Returns:
+            3x3 pixel to field homography of this frame
+        """
+        self.frame_number = self.frames if frame_number is None else frame_number
+        gray = self._gray(frame)
+
+        A, residual = (None, float("inf")) if self.prev_gray is None else self._track(gray)
+        if A is not None:
+            self.M = self.M @ A
+            self.drift += residual
+
+        lost = A is None and self.M is None
+        if lost or (self.frames >= self.retry_at and (A is None or self.drift > self.drift_threshold)):
+            M, residual = self._register(frame, gray)
+            if M is not None:
+                self.M = M
+                self.drift = residual
+                self.anchors += 1
+            else:
+                self.failed_anchors += 1
+                self.retry_at = self.frames + self.anchor_retry
+                if self.M is None:
+                    # Nothing to go on yet, assume the camera has not moved since the reference
+                    self.M = np.eye(3)
+                    self.drift = 0.0
+
+        self.frames += 1
+        self.prev_gray = gray
+        self.prev_mask = self._mask(frame)
+        H = self.H_ref @ self.M
+        return H / H[2, 2]
+
+
+def line_correspondences(H, lines, spacing_ft=YARD_LINE_SPACING_FT, tolerance_ft=2.0):
+    """
+    Correspondences from the end points of yard lines, snapped to the nearest painted line
+
+    The lines carry no yard number, so H decides which painted line each one is. A line
+    only fixes the field x of its end points, their field y is the one H maps them to.
+
+    Args:
+        H: 3x3 pixel to field homography the lines are matched with
+        lines: Array (L, 6) of theta, rho, x1, y1, x2, y2 (see yardLineDetection.py)
+        spacing_ft: Distance between painted lines in feet
+        tolerance_ft: Lines whose end points map further than this from a painted line are dropped
+
+    Returns:
+        (pixels, field) float32 arrays of shape (N, 2)
+    """
+    pixels = np.asarray(lines, dtype=np.float32).reshape(-1, 6)[:, 2:].reshape(-1, 2)
+    if len(pixels) == 0:
+        return np.zeros((0, 2), np.float32), np.zeros((0, 2), np.float32)
+    field = cv2.perspectiveTransform(pixels.reshape(-1, 1, 2), np.asarray(H, dtype=np.float64)).reshape(-1, 2, 2)
+
+    snapped = np.round(field[:, :, 0].mean(axis=1) / spacing_ft) * spacing_ft
+    keep = np.all(np.abs(field[:, :, 0] - snapped[:, None]) <= tolerance_ft, axis=1)
+    field[:, :, 0] = snapped[:, None]
+    return pixels.reshape(-1, 2, 2)[keep].reshape(-1, 2), field[keep].reshape(-1, 2).astype(np.float32)
+
+
+class YardMarkerAnchor:
+    """Pixel to field homography of a frame from the yard markers (and yard lines) detected around it"""
+
+    def __init__(self, marker_data, line_data=None, max_gap=None, min_support=0.5, ransac_threshold=3.0):
+        """
+        Args:
+            marker_data: Detection data written by yardMarkerDetection.py
+            line_data: Optional yard line data written by yardLineDetection.py, the lines of
+                the nearest processed frame refine the marker homography
+            max_gap: Sampled frames at most this many frames away are pooled (default: the
+                sampling interval of the marker data)
+            min_support: Fraction of the pooled samples a marker must be detected in
+            ransac_threshold: Largest error (feet) of a correspondence kept by RANSAC
+        """
+        video_info = marker_data["video_info"]
+        self.width, self.height = video_info["width"], video_info["height"]
+        self.samples = samples_from_marker_data(marker_data)
+        self.frame_numbers = np.array([sample["frame_number"] for sample in self.samples], dtype=np.int64)
+        self.max_gap = max_gap if max_gap is not None else video_info.get("every", 1)
+        self.min_support = min_support
+        self.ransac_threshold = ransac_threshold
+
+        frames = line_data.get("frames", []) if line_data else []
+        self.line_frame_numbers = np.array([frame["frame_number"] for frame in frames], dtype=np.int64)
+        self.lines = [np.asarray(frame["lines"], dtype=np.float32).reshape(-1, 6) for frame in frames]
+        self.refined = 0
+
+    def frame_lines(self, frame_number):
+        """Yard lines of the processed frame nearest to a frame, empty if none is within max_gap"""
+        if len(self.line_frame_numbers) == 0:
+            return np.zeros((0, 6), np.float32)
+        row = np.searchsorted(self.line_frame_numbers, frame_number)
+        rows = [r for r in (row - 1, row) if 0 <= r < len(self.line_frame_numbers)]
+        nearest = min(rows, key=lambda r: abs(self.line_frame_numbers[r] - frame_number))
+        if abs(self.line_frame_numbers[nearest] - frame_number) > self.max_gap:
+            return np.zeros((0, 6), np.float32)
+        return self.lines[nearest]
+
+    def correspondences(self, frame_number):
+        """
+        Correspondence points of a frame, pooled over the nearby samples of its camera segment
+
+        Returns:
+            List of correspondence points (see autoCorrespondancePoints.py)
+        """
+        start = np.searchsorted(self.frame_numbers, frame_number - self.max_gap, side="left")
+        end = np.searchsorted(self.frame_numbers, frame_number + self.max_gap, side="right")
+        nearby = self.samples[start:end]
+        if not nearby:
+            return []
+
+        # Markers on the other side of a cut belong to another view
+        nearest = min(nearby, key=lambda sample: abs(sample["frame_number"] - frame_number))
+        nearby = [sample for sample in nearby if sample["segment"] == nearest["segment"]]
+        return correspondences_from_detections(pool_marker_detections(nearby, self.min_support),
+                                               self.width, self.height)
+
+    def __call__(self, frame, frame_number):
+        points = self.correspondences(frame_number)
+        # Markers of a single yard line are (nearly) collinear in the image
+        if len(points) < 4 or len({p["yard_marker_info"]["yard_line"] for p in points}) < 2:
+            return None
+
+        pixels = np.float32([[p["image_point"]["x"], p["image_point"]["y"]] for p in points])
+        field = np.float32([[p["field_point"]["x"], p["field_point"]["y"]] for p in points])
+        H, inliers = cv2.findHomography(pixels, field, cv2.RANSAC, self.ransac_threshold)
+        if H is None or inliers.sum() < 4:
+            return None
+
+        # Markers sit on few yard lines, the painted lines add points across the whole view
+        line_pixels, line_field = line_correspondences(H, self.frame_lines(frame_number))
+        if len(line_pixels):
+            refined, inliers = cv2.findHomography(np.concatenate([pixels, line_pixels]),
+                                                  np.concatenate([field, line_field]),
+                                                  cv2.RANSAC, self.ransac_threshold)
+            if refined is not None and inliers.sum() >= 4:
+                self.refined += 1
+                return refined
+        return H
+
+
+def yard_marker_anchor(video_path, model_path, every=MARKER_EVERY, use_cache=True, line_method="model", **options):
+    """
+    YardMarkerAnchor of a clip from the cached yard marker and yard line stages
+
+    Args:
+        video_path: Path to the video
+        model_path: Path to yard marker model weights
+        every: Sample one frame in this many
+        use_cache: Reuse cached yard marker and yard line detections when possible
+        line_method: Yard line method ("model" or "hough", see yardLineDetection.py), None
+            anchors on the markers alone
+        **options: Extra YardMarkerAnchor arguments
+
+    Returns:
+        YardMarkerAnchor
+    """
+    from detectionStore import load_detection_data
+    from yardMarkerDetection import cachedYardMarkerDetection
+
+    marker_path, hit = cachedYardMarkerDetection(video_path, model_path, every, use_cache=use_cache)
+    print(f"Yard markers for re-anchoring {'loaded from cache' if hit else 'detected'}: {marker_path}")
+
+    line_data = None
+    if line_method:
+        from yardLineDetection import cachedYardLineDetection, load_line_data
+        line_path, hit = cachedYardLineDetection(video_path, every=every, use_cache=use_cache, method=line_method)
+        print(f"Yard lines for re-anchoring {'loaded from cache' if hit else 'detected'}: {line_path}")
+        line_data = load_line_data(line_path)
+
+    return YardMarkerAnchor(load_detection_data(marker_path), line_data, **options)
@@ -0,0 +1,277 @@
+# camera profile registry
+# clips filmed from the same camera position at the same venue share one calibration.
+# a profile is computed once from a correspondence file and stores the pixel to field
+# homography H, its inverse and the reprojection error of the correspondences, so every
+# stage loads a ready matrix instead of each clip needing its own correspondence file.
+# clips are mapped to profiles by exact path or by a file name pattern ("Wide - *.mp4").
+#
+# registry layout (cache/cameraProfiles/registry.json):
+# {
+#     "profiles": {
+#         "<venue>/<camera>": {
+#             "venue": "...", "camera": "...",
+#             "correspondence": {"path": "...", "sha256": "..."},
+#             "points": 6,
+#             "H": [[...], [...], [...]],
+#             "H_inv": [[...], [...], [...]],  # field to pixel, e.g. for projecting the field outline
+#             "reprojection_error": 0.41,      # mean, feet
+#             "max_reprojection_error": 0.93,  # feet
+#             "lookup": {"width": 1920, "height": 1080, "path": "..."},  # optional, see fieldLookup.py
+#             "created": "2025-10-01T12:00:00"
+#         }
+#     },
+#     "clips": {"<clip path or file name pattern>": "<venue>/<camera>"}
+# }
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+from datetime import datetime
+import numpy as np
+from fileHash import file_digest
+from homographyTransform import loadHomography, loadCorrespondences, transformPoints
+
+REGISTRY_PATH = "cache/cameraProfiles/registry.json"
+
+
+def profile_key(venue, camera):
+    """Registry key of a venue and camera position"""
+    return f"{venue}/{camera}"
+
+
+def load_registry(registry_path=REGISTRY_PATH):
+    """Load the registry, an empty one if it does not exist yet"""
+    try:
+        with open(registry_path, "r") as f:
+            registry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        registry = {}
+    registry.setdefault("profiles", {})
+    registry.setdefault("clips", {})
+    return registry
+
+
+def save_registry(registry, registry_path=REGISTRY_PATH):
+    directory = os.path.dirname(registry_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so a parallel reader never sees a half written registry
+    tmp_path = f"{registry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, registry_path)
+
+
+def reprojection_errors(H, pixel_points, field_points):
+    """
+    Distance between the mapped correspondence pixels and their field points
+
+    Args:
+        H: 3x3 pixel to field homography
+        pixel_points: Array of shape (N, 2)
+        field_points: Array of shape (N, 2)
+
+    Returns:
+        float64 array of shape (N,) in field units (feet)
+    """
+    projected = transformPoints(pixel_points, H).astype(np.float64)
+    return np.linalg.norm(projected - np.asarray(field_points, dtype=np.float64), axis=1)
+
+
+def register_profile(venue, camera, correspondence_file, frame_size=None, registry_path=REGISTRY_PATH):
+    """
+    Calibrate a camera profile from a correspondence file and store it in the registry
+
+    Args:
+        venue: Venue name
+        camera: Camera position name (e.g. "wide", "endzone")
+        correspondence_file: Path to correspondence points JSON file
+        frame_size: Optional (width, height); also builds the cached pixel to field lookup table
+        registry_path: Path to the registry JSON file
+
+    Returns:
+        The stored profile dictionary
+    """
+    pixel_points, field_points = loadCorrespondences(correspondence_file)
+    H = loadHomography(correspondence_file)
+    if H is None:
+        raise ValueError(f"Could not compute a homography from {correspondence_file}")
+    H = H / H[2, 2]
+    errors = reprojection_errors(H, pixel_points, field_points)
+
+    profile = {
+        "venue": venue,
+        "camera": camera,
+        "correspondence": {"path": correspondence_file, "sha256": file_digest(correspondence_file)},
+        "points": len(pixel_points),
+        "H": H.tolist(),
+        "H_inv": np.linalg.inv(H).tolist(),
+        "reprojection_error": round(float(errors.mean()), 4),
+        "max_reprojection_error": round(float(errors.max()), 4),
+        "created": datetime.now().isoformat(timespec="seconds")
+    }
+
+    if frame_size is not None:
+        from fieldLookup import load_lookup, lookup_path
+        width, height = frame_size
+        load_lookup(H, width, height)
+        profile["lookup"] = {"width": int(width), "height": int(height), "path": lookup_path(H, width, height)}
+
+    registry = load_registry(registry_path)
+    registry["profiles"][profile_key(venue, camera)] = profile
+    save_registry(registry, registry_path)
+    return profile
+
+
+def assign_clip(clip, key, registry_path=REGISTRY_PATH):
+    """
+    Map a clip (exact path) or a file name pattern to a profile
+
+    Args:
+        clip: Video path or file name pattern such as "Wide - *.mp4"
+        key: Profile key "<venue>/<camera>"
+        registry_path: Path to the registry JSON file
+    """
+    registry = load_registry(registry_path)
+    if key not in registry["profiles"]:
+        raise KeyError(f"Unknown camera profile: {key}")
+    registry["clips"][clip] = key
+    save_registry(registry, registry_path)
+
+
+def load_profile(key, registry_path=REGISTRY_PATH):
+    """
+    Profile stored under a registry key
+
+    Args:
+        key: Profile key "<venue>/<camera>"
+        registry_path: Path to the registry JSON file
+
+    Returns:
+        Profile dictionary with its "key" added
+    """
+    profile = load_registry(registry_path)["profiles"].get(key)
+    if profile is None:
+        raise KeyError(f"Unknown camera profile: {key}")
+    return dict(profile, key=key)
+
+
+def profile_for_clip(video_path, registry_path=REGISTRY_PATH):
+    """
+    Find the profile of a clip
+
+    An exact path mapping wins over a file name pattern; among patterns the longest
+    (most specific) one wins.
+
+    Args:
+        video_path: Path to the video file
+        registry_path: Path to the registry JSON file
+
+    Returns:
+        Profile dictionary with its "key" added, or None if the clip is not mapped
+    """
+    registry = load_registry(registry_path)
+    clips = registry["clips"]
+
+    key = clips.get(video_path) or clips.get(os.path.normpath(video_path))
+    if key is None:
+        name = os.path.basename(video_path)
+        patterns = [pattern for pattern in clips if fnmatch.fnmatch(name, pattern)]
+        if patterns:
+            key = clips[max(patterns, key=len)]
+
+    profile = registry["profiles"].get(key) if key else None
+    if profile is None:
+        return None
+    return dict(profile, key=key)
+
+
+def profile_homography(profile):
+    """3x3 pixel to field homography of a profile as a float64 array"""
+    return np.array(profile["H"], dtype=np.float64)
+
+
+def profile_inverse(profile):
+    """3x3 field to pixel homography of a profile, inverted here for profiles stored without H_inv"""
+    if "H_inv" in profile:
+        return np.array(profile["H_inv"], dtype=np.float64)
+    return np.linalg.inv(profile_homography(profile))
+
+
+def is_stale(profile):
+    """
+    True if the correspondence file changed since the profile was calibrated
+
+    A correspondence file that no longer exists is not stale: the stored homography is
+    the only calibration left, so the profile keeps being used.
+    """
+    path = profile["correspondence"]["path"]
+    return os.path.exists(path) and file_digest(path) != profile["correspondence"]["sha256"]
+
+
+def main():
+    """Main function for standalone execution"""
+    parser = argparse.ArgumentParser(description='Manage calibrated camera profiles shared by clips')
+    parser.add_argument('--registry', type=str, default=REGISTRY_PATH, help='Path to the registry JSON file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register = subparsers.add_parser('register', help='Calibrate a profile from a correspondence file')
+    register.add_argument('--venue', type=str, required=True, help='Venue name')
+    register.add_argument('--camera', type=str, required=True, help='Camera position name')
+    register.add_argument('--correspondence', type=str, required=True, help='Path to correspondence points JSON file')
+    register.add_argument('--video', type=str, default=None, help='Video from the camera, also builds its lookup table')
+
+    assign = subparsers.add_parser('assign', help='Map a clip or file name pattern to a profile')
+    assign.add_argument('--profile', type=str, required=True, help='Profile key <venue>/<camera>')
+    assign.add_argument('--clip', type=str, required=True, help='Video path or pattern such as "Wide - *.mp4"')
+
+    show = subparsers.add_parser('show', help='Show the profile of a clip')
+    show.add_argument('--clip', type=str, required=True, help='Video path')
+
+    subparsers.add_parser('list', help='List profiles and clip mappings')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'register':
+            frame_size = None
+            if args.video:
+                from fieldLookup import video_frame_size
+                frame_size = video_frame_size(args.video)
+            profile = register_profile(args.venue, args.camera, args.correspondence, frame_size, args.registry)
+            print(f"Registered {profile_key(args.venue, args.camera)} from {profile['points']} points, "
+                  f"reprojection error {profile['reprojection_error']:.3f} ft "
+                  f"(max {profile['max_reprojection_error']:.3f} ft)")
+
+        elif args.command == 'assign':
+            assign_clip(args.clip, args.profile, args.registry)
+            print(f"{args.clip} -> {args.profile}")
+
+        elif args.command == 'show':
+            profile = profile_for_clip(args.clip, args.registry)
+            if profile is None:
+                print(f"No camera profile for {args.clip}")
+                return 1
+            print(json.dumps(profile, indent=2))
+            if is_stale(profile):
+                print("Warning: the correspondence file changed since calibration, register the profile again")
+
+        else:
+            registry = load_registry(args.registry)
+            for key, profile in sorted(registry["profiles"].items()):
+                stale = " (stale)" if is_stale(profile) else ""
+                print(f"{key}: {profile['points']} points, error {profile['reprojection_error']:.3f} ft{stale}")
+            for clip, key in sorted(registry["clips"].items()):
+                print(f"  {clip} -> {key}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# checkpoints for resumable detection runs
+# a checkpoint is a small sidecar next to a streaming .jsonl output
+# (e.g. playerDetection.jsonl.checkpoint.json) that records which video, model
+# weights and parameters produced the file and how far the run got.
+# the .jsonl file itself is the source of truth for which frames are complete.
+
+import json
+import os
+from fileHash import file_digest
+
+
+def checkpoint_path(output_path):
+    """Path of the checkpoint sidecar for an output file"""
+    return f"{output_path}.checkpoint.json"
+
+
+def build_run_identity(video_path, model_path, params):
+    """
+    Describe the inputs of a detection run
+
+    Args:
+        video_path: Path to input video file
+        model_path: Path to model weights
+        params: Dictionary of parameters that change the output
+
+    Returns:
+        Dictionary compared against the checkpoint before resuming
+    """
+    return {
+        "video": {
+            "path": video_path,
+            "size": os.path.getsize(video_path),
+            "sha256": file_digest(video_path)
+        },
+        "model": {
+            "path": model_path,
+            "sha256": file_digest(model_path)
+        },
+        "params": params
+    }
+
+
+def save_checkpoint(output_path, identity, frames_written, last_frame, complete=False):
+    """
+    Write the checkpoint sidecar for an output file
+
+    Args:
+        output_path: Path to the .jsonl output being checkpointed
+        identity: Dictionary from build_run_identity
+        frames_written: Number of frame records in the output
+        last_frame: Frame number of the last written frame (None if nothing written)
+        complete: Whether the run finished
+    """
+    checkpoint = {
+        "output_path": output_path,
+        "identity": identity,
+        "frames_written": frames_written,
+        "last_frame": last_frame,
+        "complete": complete
+    }
+
+    path = checkpoint_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(output_path):
+    """
+    Read the checkpoint sidecar for an output file
+
+    Returns:
+        Checkpoint dictionary, or None if there is no checkpoint
+    """
+    path = checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def verify_checkpoint(checkpoint, identity):
+    """
+    Check that a checkpoint was produced by the same video, model and parameters
+
+    Paths may differ (e.g. the project was moved), only contents and parameters are compared.
+
+    Raises:
+        ValueError: Listing every input that does not match
+    """
+    saved = checkpoint["identity"]
+    mismatches = []
+
+    if saved["video"]["sha256"] != identity["video"]["sha256"]:
+        mismatches.append(f"video ({saved['video']['path']} -> {identity['video']['path']})")
+    if saved["model"]["sha256"] != identity["model"]["sha256"]:
+        mismatches.append(f"model weights ({saved['model']['path']} -> {identity['model']['path']})")
+    if saved["params"] != identity["params"]:
+        mismatches.append(f"parameters ({saved['params']} -> {identity['params']})")
+
+    if mismatches:
+        raise ValueError("Cannot resume, checkpoint does not match this run: " + ", ".join(mismatches))
+
+
+def recover_jsonl(output_path):
+    """
+    Find the last fully written frame of a .jsonl output and drop any partial line after it
+
+    Args:
+        output_path: Path to .jsonl detection file
+
+    Returns:
+        (frames_written, last_frame) where last_frame is None if no frame was written
+    """
+    frames_written = 0
+    last_frame = None
+    good_size = 0
+    header_seen = False
+
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+            good_size += len(line)
+            if not header_seen:
+                header_seen = True
+                continue
+            frames_written += 1
+            last_frame = record["frame_number"]
+
+    if good_size < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(good_size)
+
+    return frames_written, last_frame
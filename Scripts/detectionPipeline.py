@@ -0,0 +1,290 @@
+# threaded decode / inference / post-processing pipeline for frame-by-frame detection
+# the decoder and inference stages run on their own threads and hand work to the next
+# stage through bounded queues, so a slow stage blocks the one before it (backpressure)
+# instead of letting decoded frames pile up in memory
+
+import cv2
+import queue
+import threading
+import time
+from frameIndex import read_frame_at, load_frame_index, iter_frames_at
+
+# sentinel passed down the queues once the decoder runs out of frames
+_END_OF_STREAM = object()
+
+# how often blocked stages wake up to check whether the pipeline is shutting down
+_POLL_INTERVAL = 0.1
+
+
+def read_batches(cap, batch_size=1, start_frame=0, end_frame=None, frame_index=None):
+    """
+    Read frames from an opened video capture in batches
+
+    Args:
+        cap: Opened cv2.VideoCapture
+        batch_size: Number of frames per batch
+        start_frame: Frame number to start reading from
+        end_frame: Frame number to stop before (None reads to the end of the video)
+        frame_index: FrameIndex of the video for an exact seek to start_frame (None uses
+            CAP_PROP_POS_FRAMES, which can land a few frames off)
+
+    Yields:
+        (frame_numbers, frames) tuples, the last batch may be shorter
+    """
+    first = None
+    if start_frame and frame_index is not None:
+        ret, first = read_frame_at(cap, frame_index, start_frame)
+        if not ret:
+            return
+    elif start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    frame_number = start_frame
+    frame_numbers = []
+    frames = []
+
+    while end_frame is None or frame_number < end_frame:
+        if first is not None:
+            frame, first = first, None
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+        frame_numbers.append(frame_number)
+        frames.append(frame)
+        frame_number += 1
+
+        if len(frames) == batch_size:
+            yield frame_numbers, frames
+            frame_numbers = []
+            frames = []
+
+    if frames:
+        yield frame_numbers, frames
+
+
+def read_sampled_batches(cap, video_path, every=1, batch_size=1):
+    """
+    Decode every Nth frame of a video in batches
+
+    Sampled frames are reached through the frame index; without one (no ffprobe) the
+    video is read sequentially and the frames in between are only grabbed.
+
+    Args:
+        cap: Opened cv2.VideoCapture positioned at the first frame
+        video_path: Path of the opened video, used to load its frame index
+        every: Keep one frame in this many (1 reads every frame)
+        batch_size: Number of frames per batch
+
+    Yields:
+        (frame_numbers, frames) lists of at most batch_size frames
+    """
+    if every == 1:
+        yield from read_batches(cap, batch_size)
+        return
+
+    try:
+        index = load_frame_index(video_path)
+        frames = iter_frames_at(cap, index, range(0, index.frame_count, every))
+    except (ImportError, OSError, RuntimeError) as e:
+        print(f"No frame index ({e}), reading the video sequentially")
+
+        def sequential():
+            frame_number = 0
+            while True:
+                if frame_number % every == 0:
+                    ret, frame = cap.read()
+                    if not ret:
+                        return
+                    yield frame_number, frame
+                elif not cap.grab():
+                    return
+                frame_number += 1
+
+        frames = sequential()
+
+    numbers, batch = [], []
+    for frame_number, frame in frames:
+        numbers.append(frame_number)
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield numbers, batch
+            numbers, batch = [], []
+    if batch:
+        yield numbers, batch
+
+
+class StageStats:
+    """Running counters for one pipeline stage and the queue feeding its output"""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.items = 0
+        self.busy_time = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def sample_depth(self, depth):
+        self.depth_samples += 1
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def to_dict(self):
+        mean_depth = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_time, 3),
+            "queue_max": self.maxsize,
+            "queue_mean_depth": round(mean_depth, 2),
+            "queue_peak_depth": self.depth_max
+        }
+
+
+def _put(q, item, stop_event):
+    """Put an item on a bounded queue, giving up if the pipeline is shutting down"""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop_event):
+    """Get an item from a queue, returning the end sentinel if the pipeline is shutting down"""
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
+
+
+def run_detection_pipeline(cap, infer_batch, handle_frame, batch_size=1, queue_size=8, progress_every=50, total_frames=None,
+                           start_frame=0, end_frame=None, frame_index=None):
+    """
+    Run detection over a video with decoding, inference and post-processing overlapped
+
+    The decoder thread reads batches of frames into the decode queue, the inference
+    thread turns each batch into per-frame results on the results queue, and the calling
+    thread post-processes and stores every frame in order. If any stage raises, the
+    other stages are stopped and the exception is re-raised in the caller.
+
+    Args:
+        cap: Opened cv2.VideoCapture
+        infer_batch: Callable taking a list of frames and returning one result per frame
+        handle_frame: Callable taking (frame_number, result), runs on the calling thread
+        batch_size: Number of frames per inference call
+        queue_size: Maximum number of batches waiting in each queue
+        progress_every: Print progress with queue depths every N frames (0 disables)
+        total_frames: Total frame count used in progress messages
+        start_frame: Frame number to start decoding from
+        end_frame: Frame number to stop decoding before (None decodes to the end)
+        frame_index: FrameIndex used to seek exactly to start_frame
+
+    Returns:
+        Dictionary of per-stage statistics (items, busy time, queue depths)
+    """
+    decode_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+
+    stats = {
+        "decode": StageStats("decode", queue_size),
+        "inference": StageStats("inference", queue_size),
+        "postprocess": StageStats("postprocess", 0)
+    }
+
+    def decoder():
+        try:
+            batches = read_batches(cap, batch_size, start_frame, end_frame, frame_index)
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                stats["decode"].busy_time += time.perf_counter() - start
+                if batch is None:
+                    break
+                stats["decode"].items += len(batch[0])
+                if not _put(decode_queue, batch, stop_event):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(decode_queue, _END_OF_STREAM, stop_event)
+
+    def inference():
+        try:
+            while True:
+                batch = _get(decode_queue, stop_event)
+                if batch is _END_OF_STREAM:
+                    break
+                frame_numbers, frames = batch
+                start = time.perf_counter()
+                batch_results = infer_batch(frames)
+                stats["inference"].busy_time += time.perf_counter() - start
+                stats["inference"].items += len(frames)
+                if not _put(result_queue, (frame_numbers, batch_results), stop_event):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(result_queue, _END_OF_STREAM, stop_event)
+
+    threads = [
+        threading.Thread(target=decoder, name="detection-decoder", daemon=True),
+        threading.Thread(target=inference, name="detection-inference", daemon=True)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            stats["decode"].sample_depth(decode_queue.qsize())
+            stats["inference"].sample_depth(result_queue.qsize())
+
+            item = _get(result_queue, stop_event)
+            if item is _END_OF_STREAM:
+                break
+
+            frame_numbers, batch_results = item
+            start = time.perf_counter()
+            for frame_number, r in zip(frame_numbers, batch_results):
+                handle_frame(frame_number, r)
+                stats["postprocess"].items += 1
+
+                if progress_every and frame_number % progress_every == 0:
+                    print(f"Processed frame {frame_number}/{total_frames} "
+                          f"| decode queue {decode_queue.qsize()}/{queue_size} "
+                          f"| results queue {result_queue.qsize()}/{queue_size}")
+            stats["postprocess"].busy_time += time.perf_counter() - start
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        # Wake any stage blocked on a full queue and wait for both threads to exit
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return {name: stage.to_dict() for name, stage in stats.items()}
+
+
+def print_pipeline_stats(stats):
+    """Print a per-stage summary so the slowest stage is easy to spot"""
+    print("Pipeline stage summary:")
+    for name, stage in stats.items():
+        line = f"  {name:<12} items={stage['items']:<7} busy={stage['busy_seconds']:.2f}s"
+        if stage["queue_max"]:
+            line += (f" | output queue mean {stage['queue_mean_depth']:.1f}"
+                     f" peak {stage['queue_peak_depth']}/{stage['queue_max']}")
+        print(line)
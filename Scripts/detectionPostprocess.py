@@ -0,0 +1,222 @@
+# shared post-processing for YOLO detection results
+# pulls xyxy, confidence and class id out of a result once per frame as NumPy arrays
+# instead of copying every box to the CPU one tensor at a time
+
+import numpy as np
+
+
+def build_class_mask(names, keep_classes):
+    """
+    Build a boolean lookup table of the class ids to keep
+
+    Args:
+        names: Model class names, either a {class_id: name} dict or a list
+        keep_classes: Class names to keep (case-insensitive)
+
+    Returns:
+        Boolean array where mask[class_id] is True if the class is kept
+    """
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+
+    keep = {name.lower() for name in keep_classes}
+    mask = np.zeros(max(names) + 1 if names else 0, dtype=bool)
+    for cls_id, name in names.items():
+        mask[cls_id] = name.lower() in keep
+    return mask
+
+
+def to_numpy(column):
+    """Torch tensors (Ultralytics) are copied to the host, NumPy arrays (ONNX backend) pass through"""
+    return column.cpu().numpy() if hasattr(column, "cpu") else np.asarray(column)
+
+
+def extract_boxes(r, class_mask=None):
+    """
+    Extract the boxes of one YOLO result as arrays
+
+    Args:
+        r: YOLO result for one frame
+        class_mask: Optional mask from build_class_mask, boxes of other classes are dropped
+
+    Returns:
+        Dictionary of arrays with one entry per box: xyxy (N, 4), conf, cls,
+        width, height, center_x and center_y
+    """
+    boxes = r.boxes
+    if boxes is None or len(boxes) == 0:
+        xyxy = np.zeros((0, 4), dtype=np.float64)
+        conf = np.zeros(0, dtype=np.float64)
+        cls = np.zeros(0, dtype=np.int64)
+    else:
+        # One device-to-host copy per column for the whole frame
+        xyxy = to_numpy(boxes.xyxy).astype(np.float64)
+        conf = to_numpy(boxes.conf).astype(np.float64)
+        cls = to_numpy(boxes.cls).astype(np.int64)
+
+    return boxes_from_arrays(xyxy, conf, cls, class_mask)
+
+
+def boxes_from_arrays(xyxy, conf, cls, class_mask=None):
+    """
+    Filter raw box arrays by class and derive their geometry
+
+    Args:
+        xyxy: Array of shape (N, 4) with x1, y1, x2, y2 per box
+        conf: Array of N confidences
+        cls: Array of N class ids
+        class_mask: Optional mask from build_class_mask
+
+    Returns:
+        Dictionary of arrays in the same layout as extract_boxes
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    conf = np.asarray(conf, dtype=np.float64).reshape(-1)
+    cls = np.asarray(cls, dtype=np.int64).reshape(-1)
+
+    if class_mask is not None:
+        # Ids outside the lookup table are never kept
+        in_table = cls < len(class_mask)
+        keep = np.zeros(len(cls), dtype=bool)
+        keep[in_table] = class_mask[cls[in_table]]
+        xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+
+    width = xyxy[:, 2] - xyxy[:, 0]
+    height = xyxy[:, 3] - xyxy[:, 1]
+
+    return {
+        "xyxy": xyxy,
+        "conf": conf,
+        "cls": cls,
+        "width": width,
+        "height": height,
+        "center_x": xyxy[:, 0] + width / 2,
+        "center_y": xyxy[:, 1] + height / 2
+    }
+
+
+def select_boxes(boxes, keep):
+    """Apply a boolean mask or index array to every column of a boxes dictionary"""
+    return {key: value[keep] for key, value in boxes.items()}
+
+
+def boxes_to_detections(boxes, names):
+    """
+    Convert a boxes dictionary into the detection dictionaries written to JSON
+
+    Args:
+        boxes: Dictionary returned by extract_boxes
+        names: Mapping of class id to class name
+
+    Returns:
+        List of detection dictionaries
+    """
+    # Convert each column to Python floats in one call rather than per value
+    x1, y1, x2, y2 = boxes["xyxy"].T.tolist() if len(boxes["xyxy"]) else ([], [], [], [])
+    columns = zip(boxes["cls"].tolist(), boxes["conf"].tolist(), x1, y1, x2, y2,
+                  boxes["width"].tolist(), boxes["height"].tolist(),
+                  boxes["center_x"].tolist(), boxes["center_y"].tolist())
+
+    detections = []
+    for cls_id, conf, bx1, by1, bx2, by2, width, height, center_x, center_y in columns:
+        detections.append({
+            "class": names[cls_id],
+            "class_id": cls_id,
+            "confidence": conf,
+            "bbox": {
+                "x1": bx1,
+                "y1": by1,
+                "x2": bx2,
+                "y2": by2,
+                "width": width,
+                "height": height,
+                "center_x": center_x,
+                "center_y": center_y
+            }
+        })
+    return detections
+
+
+def box_iou(a, b):
+    """
+    Pairwise intersection over union of two sets of boxes
+
+    Args:
+        a: Array of shape (N, 4) in xyxy format
+        b: Array of shape (M, 4) in xyxy format
+
+    Returns:
+        Array of shape (N, M)
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def match_boxes(a, b, iou_threshold=0.5):
+    """
+    Greedily match two sets of boxes by IoU
+
+    Args:
+        a: Array of shape (N, 4) in xyxy format
+        b: Array of shape (M, 4) in xyxy format
+        iou_threshold: Minimum IoU for a pair to count as a match
+
+    Returns:
+        List of (index_in_a, index_in_b) pairs, each box is used at most once
+    """
+    iou = box_iou(a, b)
+    if iou.size == 0:
+        return []
+
+    rows, cols = np.nonzero(iou >= iou_threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+
+    used_a = set()
+    used_b = set()
+    pairs = []
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        pairs.append((i, j))
+    return pairs
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """
+    IoU-matched recall and precision of candidate boxes against reference boxes
+
+    Args:
+        reference: List of per-frame boxes dictionaries (ground truth, e.g. full detection)
+        candidate: List of per-frame boxes dictionaries to evaluate
+        iou_threshold: Minimum IoU for a match
+
+    Returns:
+        Dictionary with matched, reference and candidate box counts, recall and precision
+    """
+    matched = reference_count = candidate_count = 0
+    for ref, cand in zip(reference, candidate):
+        matched += len(match_boxes(ref["xyxy"], cand["xyxy"], iou_threshold))
+        reference_count += len(ref["conf"])
+        candidate_count += len(cand["conf"])
+
+    return {
+        "matched": matched,
+        "reference_boxes": reference_count,
+        "candidate_boxes": candidate_count,
+        "recall": matched / reference_count if reference_count else 1.0,
+        "precision": matched / candidate_count if candidate_count else 1.0
+    }
@@ -0,0 +1,406 @@
+# columnar on-disk storage for frame-by-frame detection data
+# input: detection data in the JSON schema written by playerDetection.py
+# output: one compressed .npz per clip holding one array per column
+#
+# layout of the .npz file:
+#   frame_number   (F,)   int32    frame number of every frame, including frames without detections
+#   timestamp      (F,)   float64  timestamp of every frame in seconds
+#   frame_index    (N,)   int32    row in the frame arrays that each detection belongs to (sorted)
+#   xyxy           (N, 4) float32  x1, y1, x2, y2 of every detection
+#   conf           (N,)   float32  detection confidence
+#   class_id       (N,)   int16    class id, the name is class_names[class_id]
+#   class_names    (C,)   str      class name for each class id
+#   field_xy       (N, 2) float32  optional, field coordinates added by homographyTransform.py
+#   track_id       (N,)   int32    optional, track identity added by playerTracking.py, -1 where untracked
+#   source         (F,)   str      optional, "detected", "propagated" or "reused" (keyframe / static skip runs)
+#   homography     (F, 3, 3) float64 optional, per-frame pixel to field homography (cameraMotion.py),
+#                                  NaN for frames without one
+#   segment        (F,)   int32    optional, camera segment (cut to cut) of every frame, -1 where unknown
+#                                  (yardMarkerDetection.py)
+#   metadata       ()     str      JSON encoded "video_info" and any other top level keys
+#
+# width, height and center are not stored, they are derived from xyxy when loading
+#
+# streaming .jsonl files hold one JSON record per line: a header line {"video_info": {...}}
+# followed by one frame record per line, appended as frames are produced
+
+import json
+import os
+import sys
+import numpy as np
+
+
+def detections_to_columns(data):
+    """
+    Convert detection data in the JSON schema into columnar arrays
+
+    Args:
+        data: Detection data dictionary with "video_info" and "frames"
+
+    Returns:
+        Dictionary of NumPy arrays in the layout described at the top of this file
+    """
+    frames = data.get("frames", [])
+
+    frame_number = np.array([frame["frame_number"] for frame in frames], dtype=np.int32)
+    timestamp = np.array([frame.get("timestamp", 0.0) for frame in frames], dtype=np.float64)
+
+    frame_index = []
+    xyxy = []
+    conf = []
+    class_id = []
+    field_xy = []
+    track_id = []
+    names = {}
+
+    for row, frame in enumerate(frames):
+        for det in frame.get("detections", []):
+            bbox = det["bbox"]
+            frame_index.append(row)
+            xyxy.append((bbox["x1"], bbox["y1"], bbox["x2"], bbox["y2"]))
+            conf.append(det["confidence"])
+            class_id.append(det["class_id"])
+            names[det["class_id"]] = det["class"]
+
+            fc = det.get("field_coords")
+            field_xy.append((fc["x"], fc["y"]) if fc is not None else (np.nan, np.nan))
+            track_id.append(det.get("track_id", -1))
+
+    class_names = [""] * (max(names) + 1 if names else 0)
+    for cls_id, name in names.items():
+        class_names[cls_id] = name
+
+    columns = {
+        "frame_number": frame_number,
+        "timestamp": timestamp,
+        "frame_index": np.array(frame_index, dtype=np.int32),
+        "xyxy": np.array(xyxy, dtype=np.float32).reshape(-1, 4),
+        "conf": np.array(conf, dtype=np.float32),
+        "class_id": np.array(class_id, dtype=np.int16),
+        "class_names": np.array(class_names, dtype=str)
+    }
+
+    # Only keep the field coordinate column if the homography has been applied
+    field_xy = np.array(field_xy, dtype=np.float32).reshape(-1, 2)
+    if len(field_xy) and not np.isnan(field_xy).all():
+        columns["field_xy"] = field_xy
+
+    # Only keep the track column once the tracking stage has run
+    track_id = np.array(track_id, dtype=np.int32)
+    if (track_id >= 0).any():
+        columns["track_id"] = track_id
+
+    # Per-frame source tag written by keyframe runs
+    if any("source" in frame for frame in frames):
+        columns["source"] = np.array([frame.get("source", "") for frame in frames], dtype=str)
+
+    # Per-frame homography written by the dynamic homography transform
+    if any("homography" in frame for frame in frames):
+        nan = np.full((3, 3), np.nan)
+        columns["homography"] = np.array([frame.get("homography", nan) for frame in frames],
+                                         dtype=np.float64).reshape(-1, 3, 3)
+
+    # Per-frame camera segment written by the yard marker stage
+    if any("segment" in frame for frame in frames):
+        columns["segment"] = np.array([frame.get("segment", -1) for frame in frames], dtype=np.int32)
+
+    metadata = {key: value for key, value in data.items() if key != "frames"}
+    columns["metadata"] = np.array(json.dumps(metadata))
+
+    return columns
+
+
+def frame_offsets(columns):
+    """
+    Get the detection slice of every frame
+
+    Args:
+        columns: Columnar detection arrays
+
+    Returns:
+        Array of F + 1 offsets, detections of frame row i are [offsets[i], offsets[i + 1])
+    """
+    rows = np.arange(len(columns["frame_number"]) + 1)
+    return np.searchsorted(columns["frame_index"], rows, side="left")
+
+
+def columns_to_detections(columns):
+    """
+    Convert columnar arrays back into detection data in the JSON schema
+
+    Args:
+        columns: Columnar detection arrays
+
+    Returns:
+        Detection data dictionary with "video_info" and "frames"
+    """
+    data = json.loads(str(columns["metadata"])) if "metadata" in columns else {}
+
+    xyxy = columns["xyxy"].astype(np.float64)
+    x1, y1, x2, y2 = xyxy.T.tolist() if len(xyxy) else ([], [], [], [])
+    width = (xyxy[:, 2] - xyxy[:, 0]).tolist()
+    height = (xyxy[:, 3] - xyxy[:, 1]).tolist()
+    conf = columns["conf"].astype(np.float64).tolist()
+    class_id = columns["class_id"].tolist()
+    class_names = columns["class_names"].tolist()
+    field_xy = columns["field_xy"].astype(np.float64).tolist() if "field_xy" in columns else None
+    track_id = columns["track_id"].tolist() if "track_id" in columns else None
+    source = columns["source"].tolist() if "source" in columns else None
+    homography = columns["homography"] if "homography" in columns else None
+    segment = columns["segment"].tolist() if "segment" in columns else None
+
+    offsets = frame_offsets(columns).tolist()
+    frames = []
+
+    for row, (number, timestamp) in enumerate(zip(columns["frame_number"].tolist(), columns["timestamp"].tolist())):
+        detections = []
+        for i in range(offsets[row], offsets[row + 1]):
+            det = {
+                "class": class_names[class_id[i]],
+                "class_id": class_id[i],
+                "confidence": conf[i],
+                "bbox": {
+                    "x1": x1[i],
+                    "y1": y1[i],
+                    "x2": x2[i],
+                    "y2": y2[i],
+                    "width": width[i],
+                    "height": height[i],
+                    "center_x": x1[i] + width[i] / 2,
+                    "center_y": y1[i] + height[i] / 2
+                }
+            }
+            if field_xy is not None and not np.isnan(field_xy[i][0]):
+                det["field_coords"] = {"x": field_xy[i][0], "y": field_xy[i][1]}
+            if track_id is not None and track_id[i] >= 0:
+                det["track_id"] = track_id[i]
+            detections.append(det)
+
+        frame = {
+            "frame_number": number,
+            "timestamp": timestamp,
+            "detections": detections
+        }
+        if source is not None and source[row]:
+            frame["source"] = source[row]
+        if homography is not None and not np.isnan(homography[row, 0, 0]):
+            frame["homography"] = homography[row].tolist()
+        if segment is not None and segment[row] >= 0:
+            frame["segment"] = segment[row]
+        frames.append(frame)
+
+    data["frames"] = frames
+    return data
+
+
+def save_columns(columns, output_path):
+    """Write columnar detection arrays to a compressed .npz file"""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(output_path, **columns)
+
+
+def load_columns(input_path):
+    """
+    Read columnar detection arrays from an .npz file
+
+    Args:
+        input_path: Path to .npz detection file
+
+    Returns:
+        Dictionary of NumPy arrays
+    """
+    with np.load(input_path, allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}
+
+
+class JsonlDetectionWriter:
+    """
+    Append frame records to a .jsonl detection file one line at a time
+
+    Every record is flushed as soon as it is written, so memory use does not grow with
+    the length of the video and an interrupted run keeps every frame written so far.
+    """
+
+    def __init__(self, output_path, header=None, append=False):
+        """
+        Args:
+            output_path: Path to the .jsonl file
+            header: Top level keys other than "frames" (e.g. {"video_info": {...}})
+            append: Keep existing lines and add to the end of the file instead of truncating
+        """
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.output_path = output_path
+        self.frames_written = 0
+        self._file = open(output_path, "a" if append else "w")
+
+        if not append:
+            self._write_line(header or {})
+
+    def _write_line(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def write_frame(self, frame):
+        """Write one frame record"""
+        self._write_line(frame)
+        self.frames_written += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _iter_jsonl_records(input_path):
+    """Yield each complete JSON record, ignoring a partially written last line"""
+    with open(input_path, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # Interrupted write, the record is incomplete
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_jsonl_header(input_path):
+    """
+    Read the header record of a .jsonl detection file
+
+    Args:
+        input_path: Path to .jsonl detection file
+
+    Returns:
+        Dictionary of top level keys other than "frames" (e.g. "video_info")
+    """
+    return next(_iter_jsonl_records(input_path), {})
+
+
+def iter_jsonl_frames(input_path):
+    """
+    Stream frame records from a .jsonl detection file without loading the whole file
+
+    Args:
+        input_path: Path to .jsonl detection file
+
+    Yields:
+        Frame dictionaries in file order
+    """
+    records = _iter_jsonl_records(input_path)
+    next(records, None)  # skip header
+    yield from records
+
+
+def iter_frames(input_path):
+    """
+    Iterate over the frames of a detection file in any supported format
+
+    Only .jsonl files are streamed, .json and .npz files are loaded first.
+
+    Args:
+        input_path: Path to a .jsonl, .npz or .json detection file
+
+    Yields:
+        Frame dictionaries in file order
+    """
+    if input_path.endswith(".jsonl"):
+        yield from iter_jsonl_frames(input_path)
+    else:
+        yield from load_detection_data(input_path).get("frames", [])
+
+
+def save_detection_data(data, output_path, indent=2):
+    """
+    Save detection data, choosing the format from the file extension
+
+    Args:
+        data: Detection data dictionary in the JSON schema
+        output_path: Path ending in .npz (columnar), .jsonl (streaming) or .json
+        indent: JSON indentation, ignored for .npz and .jsonl
+    """
+    if output_path.endswith(".npz"):
+        save_columns(detections_to_columns(data), output_path)
+        return
+
+    if output_path.endswith(".jsonl"):
+        header = {key: value for key, value in data.items() if key != "frames"}
+        with JsonlDetectionWriter(output_path, header) as writer:
+            for frame in data.get("frames", []):
+                writer.write_frame(frame)
+        return
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(data, f, indent=indent)
+
+
+def load_detection_data(input_path):
+    """
+    Load detection data from either format
+
+    Args:
+        input_path: Path to a .npz, .jsonl or .json detection file
+
+    Returns:
+        Detection data dictionary in the JSON schema
+    """
+    if input_path.endswith(".npz"):
+        return columns_to_detections(load_columns(input_path))
+
+    if input_path.endswith(".jsonl"):
+        data = read_jsonl_header(input_path)
+        data["frames"] = list(iter_jsonl_frames(input_path))
+        return data
+
+    with open(input_path, "r") as f:
+        return json.load(f)
+
+
+def convertDetectionFile(input_path, output_path):
+    """
+    Convert a detection file between the JSON and columnar formats
+
+    Args:
+        input_path: Existing .json, .jsonl or .npz detection file
+        output_path: Destination .json, .jsonl or .npz file
+
+    Returns:
+        Number of frames converted
+    """
+    data = load_detection_data(input_path)
+    save_detection_data(data, output_path)
+    return len(data.get("frames", []))
+
+
+def main():
+    """Main function for standalone execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert detection files between JSON, streaming .jsonl and columnar .npz')
+    parser.add_argument('--input', type=str, required=True, help='Path to input detection file (.json, .jsonl or .npz)')
+    parser.add_argument('--output', type=str, required=True, help='Path to output detection file (.json, .jsonl or .npz)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: Input file not found: {args.input}")
+        return 1
+
+    frame_count = convertDetectionFile(args.input, args.output)
+    print(f"Converted {frame_count} frames: {args.input} ({os.path.getsize(args.input) / 1e6:.2f} MB) "
+          f"-> {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# detector backends for the YOLO player detector
+# "torch" runs the .pt weights through Ultralytics, "onnx" runs an exported .onnx model
+# through ONNX Runtime on the CPU. the ONNX path reimplements the Ultralytics pre- and
+# post-processing (letterbox, confidence filter, per-class NMS, box rescaling) with
+# OpenCV and NumPy so its results can be used anywhere an Ultralytics result is:
+# every call returns one result per frame with result.boxes.xyxy / conf / cls.
+
+import ast
+import cv2
+import numpy as np
+
+BACKENDS = ("torch", "onnx")
+
+# Ultralytics prediction defaults
+DEFAULT_CONF = 0.25
+DEFAULT_IOU = 0.7
+MAX_DETECTIONS = 300
+# Offset between classes so a single NMS pass never suppresses across classes
+MAX_WH = 7680
+
+
+def letterbox(frame, new_shape=(640, 640), color=(114, 114, 114)):
+    """
+    Resize a frame to fit new_shape keeping its aspect ratio and pad the rest
+
+    Matches Ultralytics LetterBox(auto=False, scaleup=True, center=True).
+
+    Args:
+        frame: BGR frame
+        new_shape: (height, width) of the network input
+        color: Padding color
+
+    Returns:
+        Letterboxed frame
+    """
+    height, width = frame.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    new_unpad = int(round(width * ratio)), int(round(height * ratio))
+    dw = (new_shape[1] - new_unpad[0]) / 2
+    dh = (new_shape[0] - new_unpad[1]) / 2
+
+    if (width, height) != new_unpad:
+        frame = cv2.resize(frame, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+
+
+def scale_boxes(xyxy, input_shape, frame_shape):
+    """
+    Map boxes from letterboxed input coordinates back to the original frame
+
+    Args:
+        xyxy: Array of shape (N, 4) in input coordinates
+        input_shape: (height, width) of the network input
+        frame_shape: Shape of the original frame
+
+    Returns:
+        Array of shape (N, 4) in frame coordinates, clipped to the frame
+    """
+    height, width = frame_shape[:2]
+    gain = min(input_shape[0] / height, input_shape[1] / width)
+    pad_x = round((input_shape[1] - width * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - height * gain) / 2 - 0.1)
+
+    xyxy = (xyxy - np.array([pad_x, pad_y, pad_x, pad_y], dtype=xyxy.dtype)) / gain
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+    return xyxy
+
+
+def nms(xyxy, scores, iou_threshold):
+    """
+    Greedy non-maximum suppression
+
+    Args:
+        xyxy: Array of shape (N, 4)
+        scores: Array of N scores
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = xyxy.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        intersection = w * h
+        iou = intersection / (areas[i] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(prediction, conf=DEFAULT_CONF, iou=DEFAULT_IOU, max_det=MAX_DETECTIONS):
+    """
+    Decode the raw output of a YOLOv8 detection head for one image
+
+    Args:
+        prediction: Array of shape (4 + num_classes, num_anchors) with cx, cy, w, h and class scores
+        conf: Confidence threshold
+        iou: NMS IoU threshold
+        max_det: Maximum boxes kept
+
+    Returns:
+        (xyxy, conf, cls) arrays in input coordinates
+    """
+    prediction = prediction.T
+    scores = prediction[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+
+    keep = best > conf
+    boxes, best, cls = prediction[keep, :4], best[keep], cls[keep]
+
+    xyxy = np.empty_like(boxes)
+    xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+    xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+
+    kept = nms(xyxy + cls[:, None] * MAX_WH, best, iou)[:max_det]
+    return xyxy[kept], best[kept], cls[kept]
+
+
+class ArrayBoxes:
+    """Boxes of one frame held as NumPy arrays, laid out like Ultralytics result.boxes"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class ArrayResult:
+    """Detection result of one frame, laid out like an Ultralytics result"""
+
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+
+class OnnxDetector:
+    """Runs an exported YOLO detection model with ONNX Runtime"""
+
+    def __init__(self, model_path, conf=DEFAULT_CONF, iou=DEFAULT_IOU, threads=None):
+        """
+        Args:
+            model_path: Path to the .onnx model exported by exportOnnx.py
+            conf: Default confidence threshold
+            iou: Default NMS IoU threshold
+            threads: Intra-op threads used by ONNX Runtime (None lets it decide)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+
+        # Ultralytics stores the class names and input size in the model metadata
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        if "imgsz" in metadata:
+            self.input_shape = tuple(ast.literal_eval(metadata["imgsz"]))
+        else:
+            self.input_shape = tuple(model_input.shape[2:4])
+        # A model exported without dynamic axes only accepts one image per run
+        self.max_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+        self.conf = conf
+        self.iou = iou
+
+    def preprocess(self, frames):
+        """Letterbox a list of BGR frames into one NCHW float32 RGB batch"""
+        batch = np.stack([letterbox(frame, self.input_shape) for frame in frames])
+        batch = batch[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def infer(self, batch):
+        """Run the network on a preprocessed batch"""
+        if self.max_batch is None or len(batch) <= self.max_batch:
+            return self.session.run(None, {self.input_name: batch})[0]
+        outputs = [self.session.run(None, {self.input_name: batch[i:i + self.max_batch]})[0]
+                   for i in range(0, len(batch), self.max_batch)]
+        return np.concatenate(outputs)
+
+    def __call__(self, source, verbose=False, conf=None, iou=None):
+        """
+        Detect objects in one frame or a list of frames
+
+        Args:
+            source: BGR frame or list of BGR frames
+            verbose: Accepted for compatibility with Ultralytics, ignored
+            conf: Confidence threshold (defaults to the detector's)
+            iou: NMS IoU threshold (defaults to the detector's)
+
+        Returns:
+            List with one ArrayResult per frame
+        """
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        if not frames:
+            return []
+        return self.decode(self.infer(self.preprocess(frames)), frames, conf, iou)
+
+    def decode(self, predictions, frames, conf=None, iou=None):
+        """Turn raw network outputs into one ArrayResult per frame in frame coordinates"""
+        conf = self.conf if conf is None else conf
+        iou = self.iou if iou is None else iou
+
+        results = []
+        for frame, prediction in zip(frames, predictions):
+            xyxy, scores, cls = postprocess(prediction, conf, iou)
+            xyxy = scale_boxes(xyxy, self.input_shape, frame.shape)
+            results.append(ArrayResult(ArrayBoxes(xyxy, scores, cls.astype(np.float32)), self.names))
+        return results
+
+
+def load_detector(model_path, backend="torch", **kwargs):
+    """
+    Load a detector for the chosen backend
+
+    Args:
+        model_path: Path to .pt weights (torch) or an exported .onnx model (onnx)
+        backend: "torch" or "onnx"
+        **kwargs: Extra OnnxDetector arguments
+
+    Returns:
+        Callable model: model(frames, verbose=False) returns one result per frame and
+        model.names maps class ids to names
+    """
+    if backend == "torch":
+        from ultralytics import YOLO
+        return YOLO(model_path)
+    if backend == "onnx":
+        if not model_path.endswith(".onnx"):
+            raise ValueError(f"The onnx backend needs an exported .onnx model, got {model_path} "
+                             f"(export one with Scripts/exportOnnx.py)")
+        return OnnxDetector(model_path, **kwargs)
+    raise ValueError(f"Unknown detector backend: {backend} (expected one of {', '.join(BACKENDS)})")
@@ -1,10 +1,10 @@
 # plotPlayersOnField.py
-import json
 import argparse
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from detectionStore import load_detection_data
 
 # Field constants (yards)
 FIELD_LENGTH = 120.0                # 120 yards (100 + 2 endzones)
@@ -93,7 +93,7 @@ def plot_frame(ax, frame, radius_yd=0.6, color='red', show_label=False):
 
 def main():
     parser = argparse.ArgumentParser(description="Plot homography-transformed player detections on a football field")
-    parser.add_argument('--input', '-i', required=True, help='Path to homographyTransform JSON (transformed detections)')
+    parser.add_argument('--input', '-i', required=True, help='Path to homographyTransform JSON or .npz (transformed detections)')
     parser.add_argument('--frame', '-f', type=int, default=None,
                         help='Frame index to plot (0-based). Default = last frame. Use -1 to overlay all frames.')
     parser.add_argument('--radius', type=float, default=0.6, help='Circle radius in yards (default 0.6)')
@@ -104,8 +104,7 @@ def main():
     if not os.path.exists(args.input):
         raise FileNotFoundError(args.input)
 
-    with open(args.input, 'r') as f:
-        data = json.load(f)
+    data = load_detection_data(args.input)
 
     frames = data.get('frames', [])
     if not frames:
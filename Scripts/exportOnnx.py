@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+ONNX Export Script
+Exports the YOLO player detector to ONNX and validates the ONNX Runtime backend
+against the PyTorch model on frames sampled from a clip: IoU-matched box agreement,
+confidence differences and throughput of both backends
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from detectionPostprocess import build_class_mask, extract_boxes, match_boxes, agreement
+from detectorBackend import OnnxDetector
+from playerDetection import PLAYER_CLASSES
+from frameIndex import load_frame_index, read_frame_at
+
+
+def export_onnx(model_path, imgsz=640, dynamic=True, opset=None):
+    """
+    Export .pt weights to ONNX next to the weights file
+
+    Args:
+        model_path: Path to the .pt weights
+        imgsz: Network input size
+        dynamic: Export with a dynamic batch axis so frames can be batched
+        opset: ONNX opset (None uses the Ultralytics default)
+
+    Returns:
+        Path to the .onnx file
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    return model.export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True, opset=opset)
+
+
+def sample_frames(video_path, count=20):
+    """Decode count frames spread evenly over a clip"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    try:
+        index = load_frame_index(video_path)
+    except (ImportError, OSError, RuntimeError) as e:
+        print(f"No frame index ({e}), reading the video sequentially")
+        index = None
+
+    frames = []
+    if index is not None:
+        for frame_number in np.linspace(0, max(index.frame_count - 1, 0), count).astype(int):
+            ret, frame = read_frame_at(cap, index, int(frame_number))
+            if ret:
+                frames.append(frame)
+    else:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        wanted = set(np.linspace(0, max(total_frames - 1, 0), count).astype(int).tolist())
+        frame_number = 0
+        while len(frames) < len(wanted) and frame_number <= max(wanted):
+            # Frames between the samples are only grabbed, not decoded into images
+            if frame_number in wanted:
+                ret, frame = cap.read()
+                if ret:
+                    frames.append(frame)
+            else:
+                ret = cap.grab()
+            if not ret:
+                break
+            frame_number += 1
+    cap.release()
+    return frames
+
+
+def compare_models(reference_model, candidate_model, frames, iou_threshold=0.5):
+    """
+    Run two detectors on the same frames and compare their player boxes
+
+    Args:
+        reference_model: Detector treated as ground truth
+        candidate_model: Detector to evaluate
+        frames: List of BGR frames
+        iou_threshold: Minimum IoU for two boxes to count as the same detection
+
+    Returns:
+        Report dictionary with agreement, confidence differences and fps of both models
+    """
+    def run(model):
+        class_mask = build_class_mask(model.names, PLAYER_CLASSES)
+        # Warm up so session and model initialization are not timed
+        model(frames[0], verbose=False)
+        start = time.perf_counter()
+        boxes = [extract_boxes(model(frame, verbose=False)[0], class_mask) for frame in frames]
+        return boxes, time.perf_counter() - start
+
+    reference, reference_seconds = run(reference_model)
+    candidate, candidate_seconds = run(candidate_model)
+
+    conf_diffs = []
+    for ref, cand in zip(reference, candidate):
+        for i, j in match_boxes(ref["xyxy"], cand["xyxy"], iou_threshold):
+            conf_diffs.append(abs(ref["conf"][i] - cand["conf"][j]))
+
+    report = {
+        "frames": len(frames),
+        "iou_threshold": iou_threshold,
+        "reference_fps": round(len(frames) / reference_seconds, 2),
+        "candidate_fps": round(len(frames) / candidate_seconds, 2),
+        "speedup": round(reference_seconds / candidate_seconds, 2),
+        "max_conf_diff": round(float(max(conf_diffs)), 4) if conf_diffs else 0.0,
+        "mean_conf_diff": round(float(np.mean(conf_diffs)), 4) if conf_diffs else 0.0
+    }
+    report.update(agreement(reference, candidate, iou_threshold))
+    return report
+
+
+def validate_onnx(model_path, onnx_path, frames, iou_threshold=0.5):
+    """
+    Compare the ONNX backend with the PyTorch model on the same frames
+
+    Args:
+        model_path: Path to the .pt weights
+        onnx_path: Path to the exported .onnx model
+        frames: List of BGR frames
+        iou_threshold: Minimum IoU for two boxes to count as the same detection
+
+    Returns:
+        Report dictionary from compare_models (reference is PyTorch, candidate is ONNX)
+    """
+    from ultralytics import YOLO
+
+    report = {"model": model_path, "onnx_model": onnx_path}
+    report.update(compare_models(YOLO(model_path), OnnxDetector(onnx_path), frames, iou_threshold))
+    return report
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Export the player detector to ONNX and validate it against PyTorch")
+    parser.add_argument('--model', type=str, default='yolo_models/bestPlayerDetectorM.pt', help='Path to YOLO .pt weights')
+    parser.add_argument('--onnx', type=str, default=None, help='Validate this .onnx model instead of exporting a new one')
+    parser.add_argument('--video', type=str, default=None, help='Clip to sample validation frames from')
+    parser.add_argument('--frames', type=int, default=20, help='Number of validation frames (default: 20)')
+    parser.add_argument('--imgsz', type=int, default=640, help='Network input size (default: 640)')
+    parser.add_argument('--static', action='store_true', help='Export with a fixed batch size of 1')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU threshold for box agreement (default: 0.5)')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Fail if recall or precision against PyTorch is below this (default: 0.95)')
+    parser.add_argument('--output', type=str, default='cache/benchmarks/onnx_validation.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    onnx_path = args.onnx or export_onnx(args.model, args.imgsz, dynamic=not args.static)
+    print(f"ONNX model: {onnx_path}")
+
+    if not args.video:
+        print("No --video given, skipping validation")
+        return 0
+
+    frames = sample_frames(args.video, args.frames)
+    if not frames:
+        print(f"Error: no frames decoded from {args.video}")
+        return 1
+
+    report = validate_onnx(args.model, onnx_path, frames, args.iou)
+    report["video"] = args.video
+    report["passed"] = report["recall"] >= args.min_agreement and report["precision"] >= args.min_agreement
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Recall {report['recall']:.3f} precision {report['precision']:.3f} "
+          f"| max conf diff {report['max_conf_diff']:.4f}")
+    print(f"PyTorch {report['reference_fps']:.2f} fps | ONNX Runtime {report['candidate_fps']:.2f} fps")
+    print(f"Validation {'passed' if report['passed'] else 'FAILED'}, report saved to: {args.output}")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
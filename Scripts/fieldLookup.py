@@ -0,0 +1,176 @@
+# precomputed pixel to field lookup table for fixed cameras
+# when the homography of a camera never changes, the field coordinates of every pixel can
+# be computed once and stored as a (height, width, 2) float32 array. the table is saved as
+# a plain .npy file under cache/fieldLookup/<key>.npy and opened memory-mapped read-only,
+# so worker processes share the same pages instead of each holding a copy. transforming a
+# detection is then an array lookup, with optional bilinear interpolation between pixels.
+#
+# the key is a hash of the homography and the frame size, so a recalibrated camera gets
+# a new table automatically.
+
+import os
+import sys
+import cv2
+import numpy as np
+from fileHash import params_digest
+
+LOOKUP_ROOT = "cache/fieldLookup"
+# Rows transformed per cv2.perspectiveTransform call while building a table
+BUILD_ROWS = 64
+# Points are laid out in rows of REMAP_BLOCK for cv2.remap, which caps rows and columns at SHRT_MAX
+REMAP_BLOCK = 1024
+REMAP_MAX_ROWS = 16384
+
+
+def build_lookup(H, width, height):
+    """
+    Compute the field coordinates of every pixel
+
+    Args:
+        H: 3x3 pixel to field homography
+        width: Frame width in pixels
+        height: Frame height in pixels
+
+    Returns:
+        float32 array of shape (height, width, 2), table[y, x] = field (x, y) of pixel (x, y)
+    """
+    table = np.empty((height, width, 2), dtype=np.float32)
+    xs = np.arange(width, dtype=np.float32)
+    for y0 in range(0, height, BUILD_ROWS):
+        ys = np.arange(y0, min(y0 + BUILD_ROWS, height), dtype=np.float32)
+        grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 1, 2)
+        table[y0:y0 + len(ys)] = cv2.perspectiveTransform(grid, H).reshape(len(ys), width, 2)
+    return table
+
+
+def lookup_key(H, width, height):
+    """Cache key of the table of one homography and frame size"""
+    H = np.asarray(H, dtype=np.float64)
+    return params_digest({"H": (H / H[2, 2]).round(12).tolist(), "width": int(width), "height": int(height)})
+
+
+def lookup_path(H, width, height, lookup_root=LOOKUP_ROOT):
+    return os.path.join(lookup_root, f"{lookup_key(H, width, height)}.npy")
+
+
+class FieldLookup:
+    """Pixel to field transform backed by a precomputed table"""
+
+    def __init__(self, table, H=None):
+        """
+        Args:
+            table: (height, width, 2) array from build_lookup (may be a read-only memmap)
+            H: Homography the table was built from, used for points outside the frame
+        """
+        self.table = table
+        self.H = None if H is None else np.asarray(H, dtype=np.float64)
+        self.height, self.width = table.shape[:2]
+
+    def _sample(self, x, y, interpolation):
+        """Sample the table at pixel positions with cv2.remap, REMAP_BLOCK points per row"""
+        count = len(x)
+        rows = -(-count // REMAP_BLOCK)
+        map_x = np.zeros(rows * REMAP_BLOCK, dtype=np.float32)
+        map_y = np.zeros(rows * REMAP_BLOCK, dtype=np.float32)
+        map_x[:count] = x
+        map_y[:count] = y
+        map_x = map_x.reshape(rows, REMAP_BLOCK)
+        map_y = map_y.reshape(rows, REMAP_BLOCK)
+
+        # remap output is limited to SHRT_MAX rows per call
+        chunks = [cv2.remap(self.table, map_x[i:i + REMAP_MAX_ROWS], map_y[i:i + REMAP_MAX_ROWS], interpolation)
+                  for i in range(0, rows, REMAP_MAX_ROWS)]
+        return np.concatenate(chunks).reshape(-1, 2)[:count]
+
+    def transform(self, points, interpolate=True):
+        """
+        Field coordinates of pixel points
+
+        Args:
+            points: Array of shape (N, 2) with pixel x, y
+            interpolate: Bilinear interpolation between the four surrounding pixels
+                (False uses the nearest pixel)
+
+        Returns:
+            float32 array of shape (N, 2)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        inside = (x >= 0) & (y >= 0) & (x <= self.width - 1) & (y <= self.height - 1)
+        result = np.empty((len(points), 2), dtype=np.float32)
+
+        if inside.any():
+            result[inside] = self._sample(x[inside], y[inside], cv2.INTER_LINEAR if interpolate else cv2.INTER_NEAREST)
+
+        outside = ~inside
+        if outside.any():
+            if self.H is None:
+                raise ValueError("Points outside the lookup table and no homography to fall back on")
+            # Boxes touching the bottom or right edge end exactly on the frame border
+            result[outside] = cv2.perspectiveTransform(points[outside].reshape(-1, 1, 2).astype(np.float32),
+                                                       self.H).reshape(-1, 2)
+        return result
+
+
+def load_lookup(H, width, height, lookup_root=LOOKUP_ROOT):
+    """
+    Open the lookup table of a camera, building and caching it the first time
+
+    Args:
+        H: 3x3 pixel to field homography
+        width: Frame width in pixels
+        height: Frame height in pixels
+        lookup_root: Directory of cached tables
+
+    Returns:
+        FieldLookup over a read-only memory-mapped table
+    """
+    path = lookup_path(H, width, height, lookup_root)
+    if not os.path.exists(path):
+        os.makedirs(lookup_root, exist_ok=True)
+        # Save under a temporary name so parallel workers never map a half written table
+        tmp_path = f"{path}.tmp.{os.getpid()}.npy"
+        np.save(tmp_path, build_lookup(H, width, height))
+        os.replace(tmp_path, path)
+    return FieldLookup(np.load(path, mmap_mode="r"), H)
+
+
+def video_frame_size(video_path):
+    """(width, height) of a video"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    size = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    return size
+
+
+def main():
+    """Main function for standalone execution"""
+    import argparse
+    from homographyTransform import loadHomography
+
+    parser = argparse.ArgumentParser(description='Precompute the pixel to field lookup table of a fixed camera')
+    parser.add_argument('--correspondence', type=str, required=True, help='Path to correspondence points JSON file')
+    parser.add_argument('--video', type=str, default=None, help='Video from the camera, used for the frame size')
+    parser.add_argument('--size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), default=None, help='Frame size')
+    parser.add_argument('--lookup-root', type=str, default=LOOKUP_ROOT, help='Directory of cached tables')
+    args = parser.parse_args()
+
+    if args.size:
+        width, height = args.size
+    elif args.video:
+        width, height = video_frame_size(args.video)
+    else:
+        print("Error: give --video or --size")
+        return 1
+
+    H = loadHomography(args.correspondence)
+    lookup = load_lookup(H, width, height, args.lookup_root)
+    print(f"Lookup table {width}x{height} ({lookup.table.nbytes / 1e6:.1f} MB): "
+          f"{lookup_path(H, width, height, args.lookup_root)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
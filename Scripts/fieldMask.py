@@ -0,0 +1,180 @@
+# field region of interest for detection
+# builds a mask of the playing field, either by segmenting the green turf or by
+# projecting the field outline through the homography, and crops every frame to the
+# bounding rectangle of the field before inference. boxes whose feet (bottom-center)
+# fall outside the field are dropped, which removes sideline and stand false positives.
+# the mask is recomputed only when the camera moves.
+
+import cv2
+import numpy as np
+from detectionPostprocess import boxes_from_arrays, select_boxes
+from staticFrames import frame_signature, signature_distance
+
+# HSV range of the turf (OpenCV hue is 0-179)
+GREEN_LOWER = (35, 40, 40)
+GREEN_UPPER = (85, 255, 255)
+
+# Field outline in feet including both endzones, in the coordinate system used by the
+# correspondence files (goal line at x = 0, so the left endzone is at negative x)
+FIELD_OUTLINE_FT = np.array([[-30.0, 0.0], [330.0, 0.0], [330.0, 160.0], [-30.0, 160.0]], dtype=np.float32)
+
+
+def green_field_mask(frame, downscale=4):
+    """
+    Segment the turf by color
+
+    Args:
+        frame: BGR frame
+        downscale: Segmentation runs at 1/downscale resolution
+
+    Returns:
+        uint8 mask (255 on the field) at full frame resolution
+    """
+    height, width = frame.shape[:2]
+    small = cv2.resize(frame, (max(1, width // downscale), max(1, height // downscale)), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER)
+
+    # Close the gaps left by yard lines, numbers and players
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9, 9))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    # Keep the largest green region and fill it to its convex hull
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    filled = np.zeros_like(mask)
+    if contours:
+        largest = max(contours, key=cv2.contourArea)
+        cv2.fillPoly(filled, [cv2.convexHull(largest)], 255)
+
+    return cv2.resize(filled, (width, height), interpolation=cv2.INTER_NEAREST)
+
+
+def homography_field_mask(H, frame_shape, margin_ft=15.0, H_inv=None):
+    """
+    Project the field outline into the image
+
+    Args:
+        H: 3x3 pixel to field homography
+        frame_shape: Shape of the frame (height, width, ...)
+        margin_ft: Extra border around the field in feet
+        H_inv: Field to pixel homography if already known (e.g. from a camera profile)
+
+    Returns:
+        uint8 mask (255 on the field) at frame resolution
+    """
+    height, width = frame_shape[:2]
+    outline = FIELD_OUTLINE_FT + np.array([[-margin_ft, -margin_ft], [margin_ft, -margin_ft],
+                                           [margin_ft, margin_ft], [-margin_ft, margin_ft]], dtype=np.float32)
+    if H_inv is None:
+        H_inv = np.linalg.inv(H)
+    pixels = cv2.perspectiveTransform(outline.reshape(-1, 1, 2), H_inv).reshape(-1, 2)
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    # Corners far outside the image are clipped so fillPoly stays in integer range
+    pixels = np.clip(pixels, -4 * width, 4 * width)
+    cv2.fillPoly(mask, [np.round(pixels).astype(np.int32)], 255)
+    return mask
+
+
+class FieldRegion:
+    """Field mask of one camera setup and the crop rectangle derived from it"""
+
+    def __init__(self, mask, top_pad=0.15, pad=16):
+        """
+        Args:
+            mask: uint8 field mask at frame resolution
+            top_pad: Extra space above the field as a fraction of its height, so players
+                standing on the far sideline keep their heads inside the crop
+            pad: Extra pixels on every side of the crop
+        """
+        height, width = mask.shape
+        self.mask = mask
+
+        ys, xs = np.nonzero(mask)
+        if len(xs) == 0:
+            # Nothing looked like a field, fall back to the whole frame
+            self.rect = (0, 0, width, height)
+            self.empty = True
+            return
+
+        x1, x2 = int(xs.min()), int(xs.max()) + 1
+        y1, y2 = int(ys.min()), int(ys.max()) + 1
+        y1 -= int((y2 - y1) * top_pad)
+        self.rect = (max(0, x1 - pad), max(0, y1 - pad), min(width, x2 + pad), min(height, y2 + pad))
+        self.empty = False
+
+    def crop(self, frame):
+        x1, y1, x2, y2 = self.rect
+        return frame[y1:y2, x1:x2]
+
+    def pixel_fraction(self):
+        """Fraction of the frame that is sent to the detector"""
+        x1, y1, x2, y2 = self.rect
+        height, width = self.mask.shape
+        return (x2 - x1) * (y2 - y1) / float(width * height)
+
+    def restore_boxes(self, boxes):
+        """
+        Move boxes detected on the crop back to frame coordinates and drop off-field boxes
+
+        Args:
+            boxes: Boxes dictionary detected on self.crop(frame)
+
+        Returns:
+            Boxes dictionary in frame coordinates
+        """
+        x1, y1 = self.rect[:2]
+        xyxy = boxes["xyxy"] + np.array([x1, y1, x1, y1], dtype=np.float64)
+        restored = boxes_from_arrays(xyxy, boxes["conf"], boxes["cls"])
+
+        if self.empty:
+            return restored
+
+        # Keep boxes whose bottom-center is on the field
+        height, width = self.mask.shape
+        foot_x = np.clip(restored["center_x"].astype(np.int64), 0, width - 1)
+        foot_y = np.clip(restored["xyxy"][:, 3].astype(np.int64), 0, height - 1)
+        return select_boxes(restored, self.mask[foot_y, foot_x] > 0)
+
+
+class FieldRegionTracker:
+    """Keeps the field region up to date, recomputing the mask only when the camera moves"""
+
+    def __init__(self, method="green", H=None, change_threshold=12.0, H_inv=None):
+        """
+        Args:
+            method: "green" (turf segmentation) or "homography" (projected field outline)
+            H: Pixel to field homography, required for the homography method
+            change_threshold: Mean absolute difference (0-255) of a small grayscale thumbnail
+                above which the camera is considered to have moved
+            H_inv: Field to pixel homography if already known (e.g. from a camera profile)
+        """
+        if method not in ("green", "homography"):
+            raise ValueError(f"Unknown field mask method: {method}")
+        if method == "homography" and H is None:
+            raise ValueError("The homography field mask needs a homography matrix")
+
+        self.method = method
+        self.H = H
+        self.H_inv = H_inv
+        self.change_threshold = change_threshold
+        self.region = None
+        self.signature = None
+        self.updates = 0
+
+    def region_for(self, frame):
+        """Get the field region for a frame"""
+        if self.method == "homography":
+            # A single homography describes a fixed camera, one mask is enough
+            if self.region is None:
+                self.region = FieldRegion(homography_field_mask(self.H, frame.shape, H_inv=self.H_inv))
+                self.updates += 1
+            return self.region
+
+        signature = frame_signature(frame)
+        if self.region is None or signature_distance(signature, self.signature) > self.change_threshold:
+            self.region = FieldRegion(green_field_mask(frame))
+            self.signature = signature
+            self.updates += 1
+        return self.region
@@ -0,0 +1,80 @@
+# content hashing for videos, model weights and other pipeline inputs
+# hashing a full game video takes a while, so digests are remembered in
+# cache/fileDigests.json keyed by path, size and modification time and only
+# recomputed when the file changes
+
+import hashlib
+import json
+import os
+
+DIGEST_CACHE_PATH = "cache/fileDigests.json"
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _load_digest_cache(cache_path):
+    try:
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def file_digest(path, cache_path=DIGEST_CACHE_PATH):
+    """
+    Get the SHA-256 digest of a file's contents
+
+    Args:
+        path: Path to the file
+        cache_path: JSON file used to remember digests (None disables the cache)
+
+    Returns:
+        Hex digest string
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File not found: {path}")
+
+    if cache_path is None:
+        return _hash_file(path)
+
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cache = _load_digest_cache(cache_path)
+    entry = cache.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = _hash_file(path)
+    cache[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so parallel runs never see a half written cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+    return digest
+
+
+def params_digest(params):
+    """
+    Get a stable digest of a JSON-serializable parameter dictionary
+
+    Args:
+        params: Dictionary of parameters
+
+    Returns:
+        Hex digest string
+    """
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,276 @@
+# per-video frame index for exact, constant-time seeking
+# setting CAP_PROP_POS_FRAMES makes OpenCV guess a timestamp from the frame rate, which
+# is slow on long clips and lands on the wrong frame when the timestamps are irregular.
+# the first time a clip is seen ffprobe lists its video packets once; the presentation
+# timestamps (in display order) and keyframe positions are stored as a small .npz under
+# cache/frameIndex/<sha256 of the video>.npz. seeking then jumps to the keyframe before
+# the target, checks where the decoder really landed from the frame timestamp and decodes
+# forward to the exact frame, so the cost is bounded by one GOP instead of the clip length.
+#
+# index layout (.npz):
+#   pts_ms      float64 (F,)  presentation time of every frame in display order, relative
+#                             to the stream start (the same clock as CAP_PROP_POS_MSEC)
+#   keyframes   int64 (K,)    display-order indices of the keyframes, ascending
+#   fps         float64       average frame rate
+#   video_sha256 str
+
+import argparse
+import os
+import cv2
+import sys
+import numpy as np
+from fileHash import file_digest
+
+INDEX_ROOT = "cache/frameIndex"
+
+
+class FrameIndex:
+    """Frame timestamps and keyframe positions of one video"""
+
+    def __init__(self, pts_ms, keyframes, fps, video_sha256=None):
+        self.pts_ms = np.asarray(pts_ms, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.fps = float(fps)
+        self.video_sha256 = video_sha256
+
+    @property
+    def frame_count(self):
+        return len(self.pts_ms)
+
+    def keyframe_before(self, frame_number):
+        """Display index of the last keyframe at or before frame_number"""
+        position = int(np.searchsorted(self.keyframes, frame_number, side="right")) - 1
+        return int(self.keyframes[max(position, 0)])
+
+    def frame_at_msec(self, msec):
+        """Display index of the frame whose timestamp is closest to msec"""
+        position = int(np.searchsorted(self.pts_ms, msec))
+        if position >= self.frame_count:
+            return self.frame_count - 1
+        if position > 0 and msec - self.pts_ms[position - 1] < self.pts_ms[position] - msec:
+            return position - 1
+        return position
+
+    def timestamp(self, frame_number):
+        """Presentation time of a frame in seconds"""
+        return float(self.pts_ms[frame_number]) / 1000.0
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write under a temporary name so a parallel reader never sees a partial file
+        tmp_path = f"{path}.tmp.{os.getpid()}.npz"
+        np.savez(tmp_path, pts_ms=self.pts_ms, keyframes=self.keyframes, fps=np.float64(self.fps),
+                 video_sha256=np.array(self.video_sha256 or ""))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["pts_ms"], data["keyframes"], float(data["fps"]), str(data["video_sha256"]) or None)
+
+
+def _parse_rate(rate):
+    numerator, _, denominator = str(rate).partition("/")
+    denominator = float(denominator or 1)
+    return float(numerator) / denominator if denominator else 0.0
+
+
+def build_frame_index(video_path):
+    """
+    List the video packets of a clip with ffprobe and build its frame index
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        FrameIndex
+    """
+    import ffmpeg
+
+    try:
+        probe = ffmpeg.probe(video_path, select_streams="v:0",
+                             show_entries="packet=pts,dts,flags:stream=time_base,avg_frame_rate,start_time")
+    except ffmpeg.Error as e:
+        raise RuntimeError(f"ffprobe failed on {video_path}: {e.stderr.decode(errors='replace').strip()}")
+
+    stream = probe["streams"][0]
+    time_base = _parse_rate(stream["time_base"])
+    packets = probe.get("packets", [])
+    if not packets:
+        raise RuntimeError(f"No video packets found in {video_path}")
+
+    # Packets come in decode order; sorting by pts gives display order
+    pts = np.array([int(p.get("pts", p.get("dts"))) for p in packets], dtype=np.int64)
+    keyframe = np.array(["K" in p.get("flags", "") for p in packets], dtype=bool)
+    order = np.argsort(pts, kind="stable")
+    pts, keyframe = pts[order], keyframe[order]
+
+    start_pts = pts[0]
+    if "start_time" in stream and stream["start_time"] not in ("N/A", None):
+        start_pts = round(float(stream["start_time"]) / time_base)
+
+    pts_ms = (pts - start_pts) * time_base * 1000.0
+    keyframes = np.flatnonzero(keyframe)
+    if len(keyframes) == 0 or keyframes[0] != 0:
+        keyframes = np.concatenate([[0], keyframes])
+
+    fps = _parse_rate(stream.get("avg_frame_rate", "0/1"))
+    return FrameIndex(pts_ms, keyframes, fps)
+
+
+def index_path(video_path, index_root=INDEX_ROOT):
+    """Path of the cached index of a video (keyed by its content hash)"""
+    return os.path.join(index_root, f"{file_digest(video_path)}.npz")
+
+
+def load_frame_index(video_path, index_root=INDEX_ROOT):
+    """
+    Load the frame index of a video, building and caching it the first time
+
+    Args:
+        video_path: Path to the video file
+        index_root: Directory of cached indexes
+
+    Returns:
+        FrameIndex
+    """
+    path = index_path(video_path, index_root)
+    if os.path.exists(path):
+        return FrameIndex.load(path)
+
+    index = build_frame_index(video_path)
+    index.video_sha256 = file_digest(video_path)
+    index.save(path)
+    return index
+
+
+def read_frame_at(cap, index, frame_number):
+    """
+    Decode exactly one frame of an opened video
+
+    Seeks to the keyframe before the target and decodes forward, using the frame timestamp
+    to check where the decoder actually is. If the seek lands past the target, the previous
+    keyframe is tried. Afterwards cap.read() continues with frame_number + 1.
+
+    Args:
+        cap: Opened cv2.VideoCapture of the indexed video
+        index: FrameIndex of the video
+        frame_number: Display index of the frame to read
+
+    Returns:
+        (ret, frame) like cap.read()
+    """
+    if not 0 <= frame_number < index.frame_count:
+        return False, None
+
+    keyframes = index.keyframes[index.keyframes <= frame_number][::-1]
+    for keyframe in keyframes.tolist():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+
+        current = -1
+        while current < frame_number:
+            if not cap.grab():
+                return False, None
+            current = index.frame_at_msec(cap.get(cv2.CAP_PROP_POS_MSEC))
+
+        if current == frame_number:
+            return cap.retrieve()
+        # The decoder landed after the target, start again from an earlier keyframe
+
+    return False, None
+
+
+def iter_frames_at(cap, index, frame_numbers):
+    """
+    Decode selected frames of an opened video in ascending order
+
+    A frame less than one GOP ahead of the decoder is reached by decoding forward,
+    anything further away is seeked to with read_frame_at.
+
+    Args:
+        cap: Opened cv2.VideoCapture of the indexed video
+        index: FrameIndex of the video
+        frame_numbers: Display indices of the frames to read
+
+    Yields:
+        (frame_number, frame) for every frame that could be decoded
+    """
+    position = None  # Frame the next cap.read() returns
+    for frame_number in sorted(set(frame_numbers)):
+        if position is not None and index.keyframe_before(frame_number) <= position <= frame_number:
+            ret = True
+            while ret and position < frame_number:
+                ret = cap.grab()
+                position += 1
+            ret, frame = cap.read() if ret else (False, None)
+        else:
+            ret, frame = read_frame_at(cap, index, frame_number)
+
+        if not ret:
+            print(f"Could not read frame {frame_number}")
+            position = None
+            continue
+        position = frame_number + 1
+        yield frame_number, frame
+
+
+def extract_frames(video_path, frame_numbers, output_dir, index_root=INDEX_ROOT):
+    """
+    Save selected frames of a video as JPEG images
+
+    Args:
+        video_path: Path to the video file
+        frame_numbers: Frames to save
+        output_dir: Folder for the images (frame_<number>.jpg)
+        index_root: Directory of cached indexes
+
+    Returns:
+        List of written image paths
+    """
+    index = load_frame_index(video_path, index_root)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    try:
+        for frame_number, frame in iter_frames_at(cap, index, frame_numbers):
+            path = os.path.join(output_dir, f"frame_{frame_number:06d}.jpg")
+            cv2.imwrite(path, frame)
+            written.append(path)
+    finally:
+        cap.release()
+    return written
+
+
+def main():
+    """Main function for standalone execution"""
+    parser = argparse.ArgumentParser(description='Build the frame index of a video and extract exact frames')
+    parser.add_argument('--video', type=str, required=True, help='Path to input video file')
+    parser.add_argument('--extract', type=int, nargs='*', default=None, help='Frame numbers to save as images')
+    parser.add_argument('--output-dir', type=str, default='cache/frames', help='Folder for extracted frames')
+    parser.add_argument('--index-root', type=str, default=INDEX_ROOT, help='Directory of cached frame indexes')
+    args = parser.parse_args()
+
+    try:
+        index = load_frame_index(args.video, args.index_root)
+        gop = np.diff(np.append(index.keyframes, index.frame_count))
+        print(f"{args.video}: {index.frame_count} frames at {index.fps:.3f} fps, "
+              f"{len(index.keyframes)} keyframes (longest GOP {int(gop.max())} frames)")
+        print(f"Index: {index_path(args.video, args.index_root)}")
+
+        if args.extract:
+            written = extract_frames(args.video, args.extract, args.output_dir, args.index_root)
+            print(f"Saved {len(written)} frames to: {args.output_dir}")
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,82 +1,458 @@
 # script to perform homography transformation on data
 # input: json file with correspondence points, detection JSON file
-# output: json file with homography transformed data
+# output: json (or columnar .npz / streaming .jsonl) file with homography transformed data
 # saved as homographyTransform.json in the cache folder
+# with --video the camera is assumed to move: every frame gets its own homography
+# (see cameraMotion.py), stored in the frame record as "homography", and drift is corrected
+# on the yard markers of the cached yard marker stage when the marker weights exist
+# with --lut a fixed camera uses a precomputed pixel to field table (see fieldLookup.py)
+# without --correspondence the homography comes from the camera profile of the clip
+# (or the one named with --profile, see cameraProfiles.py)
 
 import cv2
 import json
 import os
 import numpy as np
+from detectionStore import (load_detection_data, save_detection_data, JsonlDetectionWriter,
+                            read_jsonl_header, iter_jsonl_frames, load_columns, save_columns)
 
-def homographyTransform(correspondence_file, detection_data):
+# Points per cv2.perspectiveTransform call, keeps the temporary arrays small on full games
+POINT_CHUNK_SIZE = 1_000_000
+# Frames buffered per transform when streaming .jsonl
+STREAM_CHUNK_FRAMES = 1000
+
+def _point(point):
+    """Correspondence point as [x, y], written either as a list or as {"x", "y"}"""
+    if isinstance(point, dict):
+        return [point["x"], point["y"]]
+    return point
+
+
+def loadCorrespondences(correspondence_file):
     """
-    Perform homography transformation on detection data
-    
+    Read the pixel and field points of a correspondence points file
+
+    Accepts both the manual ([x, y] lists) and the automatic ({"x", "y"} dicts) formats.
+
     Args:
         correspondence_file: Path to correspondence points JSON file
-        detection_data: Detection data dictionary
-    
+
     Returns:
-        Transformed detection data dictionary
+        (pixel_points, field_points), float32 arrays of shape (N, 2)
     """
-    # Load correspondence points
     with open(correspondence_file, "r") as f:
         corr = json.load(f)
 
     pixel_points = []
     field_points = []
     for c in corr["correspondences"]:
-        pixel_points.append(c["image_point"])
-        field_points.append(c["field_point"])
+        pixel_points.append(_point(c["image_point"]))
+        field_points.append(_point(c["field_point"]))
+
+    return np.array(pixel_points, dtype=np.float32), np.array(field_points, dtype=np.float32)
+
+
+def loadHomography(correspondence_file):
+    """
+    Compute the pixel to field homography from a correspondence points file
+
+    Args:
+        correspondence_file: Path to correspondence points JSON file
 
-    pixel_points = np.array(pixel_points, dtype=np.float32)
-    field_points = np.array(field_points, dtype=np.float32)
+    Returns:
+        3x3 homography matrix
+    """
+    pixel_points, field_points = loadCorrespondences(correspondence_file)
 
     # Compute homography matrix
     H, _ = cv2.findHomography(pixel_points, field_points)
+    return H
+
+
+def transformPoints(points, H, chunk_size=POINT_CHUNK_SIZE):
+    """
+    Apply a homography to many points with as few OpenCV calls as possible
+
+    Args:
+        points: Array of shape (N, 2)
+        H: 3x3 homography matrix
+        chunk_size: Maximum points per cv2.perspectiveTransform call
+
+    Returns:
+        float32 array of shape (N, 2)
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if len(points) == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+
+    chunks = [cv2.perspectiveTransform(points[i:i + chunk_size], H)
+              for i in range(0, len(points), chunk_size)]
+    return np.concatenate(chunks).reshape(-1, 2)
+
+
+def bottomCenters(xyxy):
+    """
+    Bottom-center point of every box, the point where a player touches the field
+
+    Args:
+        xyxy: Array of shape (N, 4)
+
+    Returns:
+        float32 array of shape (N, 2)
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2.0, xyxy[:, 3]], axis=1).astype(np.float32)
+
+
+def _open_lookup(H, video_info):
+    """Lookup table of a fixed camera for the frame size of the detected video"""
+    from fieldLookup import load_lookup, video_frame_size
+
+    if "width" in video_info and "height" in video_info:
+        width, height = video_info["width"], video_info["height"]
+    else:
+        width, height = video_frame_size(video_info["path"])
+    return load_lookup(H, width, height)
+
+
+def transformFrames(frames, H, lookup=None):
+    """
+    Add field coordinates to every detection of a list of frames
+
+    The bottom-center points of all detections are gathered into one array, transformed
+    together and written back, instead of one OpenCV call per detection.
+
+    Args:
+        frames: List of frame dictionaries with "detections"
+        H: 3x3 homography matrix
+        lookup: Optional FieldLookup of the same homography, used instead of the matrix
+
+    Returns:
+        The same frames, updated in place
+    """
+    detections = [det for frame in frames for det in frame.get("detections", [])]
+    if not detections:
+        return frames
+
+    xyxy = [(det["bbox"]["x1"], det["bbox"]["y1"], det["bbox"]["x2"], det["bbox"]["y2"]) for det in detections]
+    points = bottomCenters(xyxy)
+    field = lookup.transform(points) if lookup is not None else transformPoints(points, H)
+    field_x, field_y = field.astype(np.float64).T.tolist()
+
+    for det, x, y in zip(detections, field_x, field_y):
+        det["field_coords"] = {"x": x, "y": y}
+
+    return frames
+
+
+def transformFrame(frame, H):
+    """
+    Add field coordinates to every detection of a single frame
+
+    Args:
+        frame: Frame dictionary with "detections"
+        H: 3x3 homography matrix
+
+    Returns:
+        The same frame dictionary, updated in place
+    """
+    transformFrames([frame], H)
+    return frame
+
+
+def homographyTransform(correspondence_file, detection_data, use_lookup=False, H=None):
+    """
+    Perform homography transformation on detection data
+    
+    Args:
+        correspondence_file: Path to correspondence points JSON file
+        detection_data: Detection data dictionary
+        use_lookup: Transform through the cached pixel to field table of this camera
+        H: Precomputed homography (e.g. from a camera profile), skips the correspondence file
+    
+    Returns:
+        Transformed detection data dictionary
+    """
+    if H is None:
+        H = loadHomography(correspondence_file)
+    lookup = _open_lookup(H, detection_data["video_info"]) if use_lookup else None
+
+    # Transform the detections of the whole video in one pass
+    transformFrames(detection_data.get("frames", []), H, lookup)
+
+    return detection_data
+
+
+def _read_reference_frame(video_path, reference_frame):
+    """Decode the frame the correspondence points were picked on"""
+    from frameIndex import load_frame_index, read_frame_at
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    try:
+        if reference_frame:
+            ret, frame = read_frame_at(cap, load_frame_index(video_path), reference_frame)
+        else:
+            ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        raise ValueError(f"Could not read reference frame {reference_frame} of {video_path}")
+    return frame
+
+
+def _marker_anchor(video_path, model_path=None, every=None, line_method="model"):
+    """Yard marker anchor of a clip, None (ORB re-anchoring) if the default weights are missing"""
+    from autoCorrespondancePoints import EXPECTED_MODEL_PATH
+    from cameraMotion import MARKER_EVERY, yard_marker_anchor
 
-    # Transform detections
-    for frame in detection_data.get("frames", []):
-        for det in frame.get("detections", []):
-            bbox = det["bbox"]
+    if model_path is None:
+        if not os.path.exists(EXPECTED_MODEL_PATH):
+            print(f"No yard marker model at {EXPECTED_MODEL_PATH}, re-anchoring on the reference frame")
+            return None
+        model_path = EXPECTED_MODEL_PATH
+    return yard_marker_anchor(video_path, model_path, every or MARKER_EVERY, line_method=line_method)
 
-            # bottom-center of the bbox
-            x = (bbox["x1"] + bbox["x2"]) / 2.0
-            y = bbox["y2"]
 
-            # apply homography
-            pt = np.array([[x, y]], dtype=np.float32).reshape(-1, 1, 2)
-            transformed = cv2.perspectiveTransform(pt, H)[0][0]
+def homographyTransformDynamic(correspondence_file, detection_data, video_path, reference_frame=0, H=None,
+                               use_markers=True, marker_model=None, marker_every=None, line_method="model",
+                               **tracker_options):
+    """
+    Perform homography transformation with a per-frame homography for a moving camera
+
+    The correspondence points define the homography of the reference frame. The camera
+    motion of every other frame is tracked from the video and composed with it. Drift is
+    corrected on the yard markers detected around the frame (pooled per camera segment
+    from the cached yard marker stage) refined with the detected yard lines, or on the
+    reference frame when there are too few markers.
+
+    Args:
+        correspondence_file: Path to correspondence points JSON file
+        detection_data: Detection data dictionary
+        video_path: Video the detections were made on
+        reference_frame: Frame number the correspondence points were picked on
+        H: Precomputed homography of the reference frame (e.g. from a camera profile), skips
+            the correspondence file
+        use_markers: Re-anchor on yard markers (False re-anchors on the reference frame only)
+        marker_model: Yard marker weights (default: autoCorrespondancePoints.EXPECTED_MODEL_PATH
+            if it exists)
+        marker_every: Sample one frame in this many for yard markers (default: cameraMotion.MARKER_EVERY)
+        line_method: Yard line method that refines the marker homography ("model" or "hough",
+            None uses the markers alone)
+        **tracker_options: Extra CameraMotionTracker arguments (drift_threshold, scale, ...)
+
+    Returns:
+        Transformed detection data dictionary, every frame also gets a "homography" entry
+    """
+    from cameraMotion import CameraMotionTracker
+
+    H_ref = loadHomography(correspondence_file) if H is None else H
+    if use_markers and "anchor" not in tracker_options:
+        tracker_options["anchor"] = _marker_anchor(video_path, marker_model, marker_every, line_method)
+    tracker = CameraMotionTracker(H_ref, _read_reference_frame(video_path, reference_frame), **tracker_options)
+
+    frames = {frame["frame_number"]: frame for frame in detection_data.get("frames", [])}
+    last_frame = max(frames) if frames else -1
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
 
-            det["field_coords"] = {
-                "x": float(transformed[0]),
-                "y": float(transformed[1])
-            }
+    # Camera motion is chained frame to frame, so every frame up to the last detection is decoded
+    frame_number = 0
+    try:
+        while frame_number <= last_frame:
+            ret, image = cap.read()
+            if not ret:
+                break
+            H = tracker.update(image, frame_number)
+            frame = frames.get(frame_number)
+            if frame is not None:
+                frame["homography"] = H.tolist()
+                transformFrame(frame, H)
+            frame_number += 1
+    finally:
+        cap.release()
 
+    print(f"Tracked camera motion over {frame_number} frames, re-anchored {tracker.anchors} times "
+          f"({tracker.failed_anchors} failed re-anchors)")
     return detection_data
 
 
+def homographyTransformColumns(correspondence_file, columns, use_lookup=False, H=None):
+    """
+    Add the field_xy column to columnar (.npz) detection data without building dictionaries
+
+    Args:
+        correspondence_file: Path to correspondence points JSON file
+        columns: Columns from detectionStore.load_columns
+        use_lookup: Transform through the cached pixel to field table of this camera
+        H: Precomputed homography (e.g. from a camera profile), skips the correspondence file
+
+    Returns:
+        The same columns dictionary with field_xy set
+    """
+    if H is None:
+        H = loadHomography(correspondence_file)
+    points = bottomCenters(columns["xyxy"])
+    if use_lookup:
+        video_info = json.loads(str(columns["metadata"]))["video_info"]
+        columns["field_xy"] = _open_lookup(H, video_info).transform(points)
+    else:
+        columns["field_xy"] = transformPoints(points, H)
+    return columns
+
+
+def homographyTransformStream(correspondence_file, input_path, output_path, chunk_frames=STREAM_CHUNK_FRAMES,
+                              use_lookup=False, H=None):
+    """
+    Transform a streaming .jsonl detection file in chunks of frames
+
+    Only chunk_frames frames are held in memory at a time, so this works for videos of any length.
+
+    Args:
+        correspondence_file: Path to correspondence points JSON file
+        input_path: Path to input .jsonl detection file
+        output_path: Path to output .jsonl file
+        chunk_frames: Frames transformed together
+        use_lookup: Transform through the cached pixel to field table of this camera
+        H: Precomputed homography (e.g. from a camera profile), skips the correspondence file
+
+    Returns:
+        Number of frames transformed
+    """
+    if H is None:
+        H = loadHomography(correspondence_file)
+    header = read_jsonl_header(input_path)
+    lookup = _open_lookup(H, header["video_info"]) if use_lookup else None
+
+    with JsonlDetectionWriter(output_path, header) as writer:
+        chunk = []
+        for frame in iter_jsonl_frames(input_path):
+            chunk.append(frame)
+            if len(chunk) == chunk_frames:
+                for transformed in transformFrames(chunk, H, lookup):
+                    writer.write_frame(transformed)
+                chunk = []
+        for transformed in transformFrames(chunk, H, lookup):
+            writer.write_frame(transformed)
+
+    return writer.frames_written
+
+
+def _detection_video_path(input_path):
+    """Video path recorded in the header of a detection file"""
+    if input_path.endswith(".jsonl"):
+        header = read_jsonl_header(input_path)
+    elif input_path.endswith(".npz"):
+        header = json.loads(str(load_columns(input_path)["metadata"]))
+    else:
+        header = load_detection_data(input_path)
+    return header.get("video_info", {}).get("path")
+
+
+def _profile_homography(input_path, video_path=None, key=None, registry_path=None):
+    """
+    Homography from a camera profile, the named one or the one of the clip
+
+    Returns:
+        (H, correspondence_file): H is None when the profile is older than its correspondence
+        file, which is then used instead
+    """
+    from cameraProfiles import REGISTRY_PATH, load_profile, profile_for_clip, profile_homography, is_stale
+
+    registry_path = registry_path or REGISTRY_PATH
+    if key:
+        profile = load_profile(key, registry_path)
+    else:
+        clip = video_path or _detection_video_path(input_path)
+        profile = profile_for_clip(clip, registry_path) if clip else None
+        if profile is None:
+            raise ValueError(f"No --correspondence given and no camera profile for {clip or input_path}")
+
+    if is_stale(profile):
+        print(f"Warning: camera profile {profile['key']} is older than its correspondence file")
+        return None, profile["correspondence"]["path"]
+    print(f"Using camera profile {profile['key']} (reprojection error {profile['reprojection_error']:.2f} ft)")
+    return profile_homography(profile), None
+
+
 def main():
     """Main function for standalone execution"""
     import argparse
     
     parser = argparse.ArgumentParser(description='Homography Transform Module')
-    parser.add_argument('--input', type=str, required=True, help='Path to input detection JSON file')
-    parser.add_argument('--correspondence', type=str, required=True, 
-                       help='Path to correspondence points JSON file')
+    parser.add_argument('--input', type=str, required=True, help='Path to input detection file (.json, .jsonl or .npz)')
+    parser.add_argument('--correspondence', type=str, default=None,
+                       help='Path to correspondence points JSON file (default: the camera profile of the clip)')
+    parser.add_argument('--profile', type=str, default=None,
+                       help='Camera profile <venue>/<camera> to use instead of a correspondence file')
+    parser.add_argument('--registry', type=str, default=None,
+                       help='Camera profile registry (default: cache/cameraProfiles/registry.json)')
     parser.add_argument('--output', type=str, default='cache/homography/homographyTransform.json', 
-                       help='Path to output transformed JSON file')
+                       help='Path to output transformed file (.json, .jsonl or .npz)')
+    parser.add_argument('--video', type=str, default=None,
+                       help='Video of the detections, enables a per-frame homography that follows camera motion')
+    parser.add_argument('--reference-frame', type=int, default=0,
+                       help='Frame the correspondence points were picked on (default: 0)')
+    parser.add_argument('--drift-threshold', type=float, default=3.0,
+                       help='Accumulated tracking residual in pixels before re-anchoring (default: 3.0)')
+    parser.add_argument('--marker-model', type=str, default=None,
+                       help='Yard marker weights used to correct camera motion drift with --video '
+                            '(default: yolo_models/bestYardMarkerDetector.pt if it exists)')
+    parser.add_argument('--marker-every', type=int, default=None,
+                       help='Sample one frame in this many for yard markers (default: 5)')
+    parser.add_argument('--line-method', type=str, choices=['model', 'hough', 'none'], default='model',
+                       help='Yard lines that refine the yard marker homography (default: model)')
+    parser.add_argument('--no-markers', action='store_true',
+                       help='Correct drift on the reference frame only, without yard markers')
+    parser.add_argument('--lut', action='store_true',
+                       help='Fixed camera: transform through a cached, memory-mapped pixel to field lookup table')
     
     args = parser.parse_args()
+
+    if args.video and args.lut:
+        print("Error: --lut is for fixed cameras and cannot be combined with --video")
+        return
+
+    correspondence, H = args.correspondence, None
+    if not correspondence:
+        try:
+            H, correspondence = _profile_homography(args.input, args.video, args.profile, args.registry)
+        except (KeyError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+
+    if args.video:
+        detection_data = load_detection_data(args.input)
+        transformed = homographyTransformDynamic(correspondence, detection_data, args.video, args.reference_frame,
+                                                 H=H, use_markers=not args.no_markers,
+                                                 marker_model=args.marker_model, marker_every=args.marker_every,
+                                                 line_method=None if args.line_method == 'none' else args.line_method,
+                                                 drift_threshold=args.drift_threshold)
+        save_detection_data(transformed, args.output, indent=4)
+        print(f"Transformed detections saved to {args.output}")
+        return
     
-    with open(args.input, "r") as f:
-        detection_data = json.load(f)
+    # Stream .jsonl to .jsonl without loading the whole file
+    if args.input.endswith(".jsonl") and args.output.endswith(".jsonl"):
+        frame_count = homographyTransformStream(correspondence, args.input, args.output, use_lookup=args.lut, H=H)
+        print(f"Transformed {frame_count} frames, saved to {args.output}")
+        return
+
+    # Columnar .npz to .npz never builds per-detection dictionaries
+    if args.input.endswith(".npz") and args.output.endswith(".npz"):
+        columns = homographyTransformColumns(correspondence, load_columns(args.input), args.lut, H)
+        save_columns(columns, args.output)
+        print(f"Transformed {len(columns['xyxy'])} detections, saved to {args.output}")
+        return
+
+    detection_data = load_detection_data(args.input)
 
-    transformed = homographyTransform(args.correspondence, detection_data)
+    transformed = homographyTransform(correspondence, detection_data, use_lookup=args.lut, H=H)
 
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, "w") as f:
-        json.dump(transformed, f, indent=4)
+    save_detection_data(transformed, args.output, indent=4)
 
     print(f"Transformed detections saved to {args.output}")
 
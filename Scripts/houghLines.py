@@ -0,0 +1,148 @@
+# hough transform fallback for yard line detection
+# for footage the line model does not handle (old archive film, other fields) the painted
+# lines are found with classic image processing instead, kept cheap enough for the CPU:
+#   - the frame is downscaled and only white, unsaturated pixels on the turf are kept
+#     (the field mask removes the stands, scoreboard and sideline clutter)
+#   - cv2.HoughLinesP returns the segments as one array; filtering by length and angle
+#     and merging segments into lines are NumPy operations shared with the model path
+#     (cluster_segments / fit_lines in yardLineDetection.py)
+#   - frames that look the same as the last processed frame reuse its lines, using the
+#     same thumbnail test as the static frame skip of the player detector
+
+import cv2
+import numpy as np
+from cameraMotion import marking_mask
+from staticFrames import StaticFrameFilter
+from yardLineDetection import cluster_segments, fit_lines
+
+# Frames are processed at this fraction of their size
+HOUGH_SCALE = 0.5
+# Accumulator votes for a segment (pixels at the downscaled size)
+HOUGH_THRESHOLD = 40
+# Shortest segment, as a fraction of the downscaled frame height
+MIN_LENGTH_FRACTION = 0.08
+# Largest gap bridged inside one segment (pixels at the downscaled size)
+MAX_LINE_GAP = 10
+# Segments flatter than this (degrees from the image horizontal) are sidelines or hash rows
+MIN_ANGLE_DEG = 20.0
+
+
+def line_coverage(segments, length, labels):
+    """
+    Length of each line that is covered by at least one of its segments
+
+    Overlapping segments (both edges of a painted line, repeated Hough hits) are counted
+    once, so a continuous line scores more than one broken up by players, and no line can
+    score more than its visible extent.
+
+    Args:
+        segments: Array (N, 4) of x1, y1, x2, y2
+        length: Segment lengths (N,)
+        labels: Cluster label of every segment from cluster_segments
+
+    Returns:
+        Covered length (C,) of every cluster in pixels
+    """
+    clusters = labels.max() + 1 if len(labels) else 0
+    coverage = np.zeros(clusters)
+    for cluster in range(clusters):
+        members = segments[labels == cluster]
+        # Project the end points onto the direction of the longest segment of the line
+        longest = members[np.argmax(length[labels == cluster])]
+        direction = longest[2:] - longest[:2]
+        direction = direction / np.linalg.norm(direction)
+        start = members[:, :2] @ direction
+        end = members[:, 2:] @ direction
+        low, high = np.minimum(start, end), np.maximum(start, end)
+
+        # Union of the intervals: sort by start and only count what extends past the reach so far
+        order = np.argsort(low)
+        low, high = low[order], high[order]
+        reach = np.maximum.accumulate(high)
+        previous = np.concatenate([[low[0]], reach[:-1]])
+        coverage[cluster] = np.sum(np.clip(high, previous, None) - np.clip(low, previous, None))
+    return coverage
+
+
+class HoughLineDetector:
+    """Finds yard lines with a downscaled, field-masked probabilistic Hough transform"""
+
+    def __init__(self, scale=HOUGH_SCALE, threshold=HOUGH_THRESHOLD, min_length_fraction=MIN_LENGTH_FRACTION,
+                 max_line_gap=MAX_LINE_GAP, min_angle=MIN_ANGLE_DEG, reuse_threshold=6.0):
+        """
+        Args:
+            scale: Frames are processed at this fraction of their size
+            threshold: Accumulator votes needed for a segment
+            min_length_fraction: Shortest segment as a fraction of the downscaled frame height
+            max_line_gap: Largest gap bridged inside one segment (downscaled pixels)
+            min_angle: Segments flatter than this many degrees from horizontal are dropped
+                (sideline film; use 0 to keep every direction, e.g. for end zone cameras)
+            reuse_threshold: Largest thumbnail cell change (0-255) for which the lines of the
+                last processed frame are reused (None processes every frame)
+        """
+        self.scale = scale
+        self.threshold = threshold
+        self.min_length_fraction = min_length_fraction
+        self.max_line_gap = max_line_gap
+        self.min_slope = np.tan(np.deg2rad(min_angle))
+        self.static_filter = StaticFrameFilter(reuse_threshold) if reuse_threshold is not None else None
+        self.last = None
+
+    def downscale(self, frame):
+        return cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def segments(self, small):
+        """
+        Line segments on the field markings of a frame
+
+        Args:
+            small: BGR frame already passed through downscale()
+
+        Returns:
+            (segments, length): segments (N, 4) as x1, y1, x2, y2 at full resolution and
+            their lengths (N,)
+        """
+        markings = marking_mask(small)
+        min_length = self.min_length_fraction * small.shape[0]
+
+        found = cv2.HoughLinesP(markings, 1, np.pi / 180, self.threshold,
+                                minLineLength=min_length, maxLineGap=self.max_line_gap)
+        if found is None:
+            return np.zeros((0, 4)), np.zeros(0)
+
+        segments = found.reshape(-1, 4).astype(np.float64) / self.scale
+        dx = segments[:, 2] - segments[:, 0]
+        dy = segments[:, 3] - segments[:, 1]
+        keep = np.abs(dy) >= self.min_slope * np.abs(dx)
+        return segments[keep], np.hypot(dx, dy)[keep]
+
+    def __call__(self, frame):
+        """
+        Yard lines of one frame
+
+        Args:
+            frame: BGR frame, frames should be passed in order for the reuse test
+
+        Returns:
+            (lines, confidence, support) as returned by yardLineDetection.fit_lines, the
+            confidence of a line is the length of the line covered by its segments as a
+            fraction of the frame diagonal (0-1)
+        """
+        # The reuse test runs on the downscaled frame too, so a reused frame costs one resize
+        small = self.downscale(frame)
+        if self.static_filter is not None and self.static_filter.is_static(small) and self.last is not None:
+            return self.last
+
+        segments, length = self.segments(small)
+        labels = cluster_segments(segments)
+        coverage = line_coverage(segments, length, labels) / np.hypot(frame.shape[0], frame.shape[1])
+        # Every segment carries the coverage of its line, so the mean fit_lines takes per
+        # line is that coverage
+        lines, confidence, support = fit_lines(segments, coverage[labels], labels)
+
+        self.last = (lines, confidence, support)
+        return self.last
+
+    def reuse_ratio(self):
+        """Fraction of the frames whose lines were reused"""
+        return self.static_filter.skip_ratio() if self.static_filter is not None else 0.0
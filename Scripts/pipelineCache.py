@@ -0,0 +1,303 @@
+# content-addressed cache for pipeline stage outputs
+# every entry is stored under cache/pipeline/<stage>/<key>/ where the key is a hash of
+# the stage name, the contents of every input file (video, model weights, correspondence
+# file, upstream outputs) and the stage parameters. a stage whose inputs and parameters
+# have not changed is looked up instead of being run again.
+#
+# each entry directory holds the output files and a manifest.json:
+# {
+#     "stage": "playerDetection",
+#     "key": "3f1c...",
+#     "inputs": {"video": {"path": "...", "sha256": "..."}, ...},
+#     "params": {...},
+#     "outputs": {"output": "output.json"},
+#     "created": "2025-10-01T12:00:00"
+# }
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from fileHash import file_digest, params_digest
+
+CACHE_ROOT = "cache/pipeline"
+MANIFEST_NAME = "manifest.json"
+
+
+def describe_inputs(inputs):
+    """
+    Hash every input file of a stage
+
+    Args:
+        inputs: Dictionary of input name to file path (None for optional inputs that are absent)
+
+    Returns:
+        Dictionary of input name to {"path", "sha256"}
+    """
+    described = {}
+    for name, path in sorted(inputs.items()):
+        described[name] = {
+            "path": path,
+            "sha256": file_digest(path) if path is not None else None
+        }
+    return described
+
+
+def cache_key(stage, inputs, params):
+    """
+    Compute the cache key of a stage run
+
+    Args:
+        stage: Stage name
+        inputs: Dictionary of input name to file path
+        params: JSON-serializable stage parameters
+
+    Returns:
+        Hex key string
+    """
+    described = describe_inputs(inputs)
+    return params_digest({
+        "stage": stage,
+        "inputs": {name: value["sha256"] for name, value in described.items()},
+        "params": params
+    })
+
+
+def entry_dir(stage, key, cache_root=CACHE_ROOT):
+    """Directory of a cache entry"""
+    return os.path.join(cache_root, stage, key)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _with_paths(manifest, directory):
+    """Add absolute output paths and the entry directory to a manifest"""
+    manifest = dict(manifest)
+    manifest["dir"] = directory
+    manifest["paths"] = {name: os.path.join(directory, filename) for name, filename in manifest["outputs"].items()}
+    return manifest
+
+
+def lookup(stage, inputs, params, cache_root=CACHE_ROOT):
+    """
+    Find the cached outputs of a stage run
+
+    Args:
+        stage: Stage name
+        inputs: Dictionary of input name to file path
+        params: JSON-serializable stage parameters
+        cache_root: Root directory of the cache
+
+    Returns:
+        Manifest dictionary with a "paths" mapping of output name to file path, or None on a miss
+    """
+    directory = entry_dir(stage, cache_key(stage, inputs, params), cache_root)
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        return None
+
+    entry = _with_paths(manifest, directory)
+    if not all(os.path.exists(path) for path in entry["paths"].values()):
+        return None
+    return entry
+
+
+def store(stage, inputs, params, outputs, cache_root=CACHE_ROOT, move=False):
+    """
+    Add the outputs of a stage run to the cache
+
+    Args:
+        stage: Stage name
+        inputs: Dictionary of input name to file path
+        params: JSON-serializable stage parameters
+        outputs: Dictionary of output name to the file produced by the stage
+        cache_root: Root directory of the cache
+        move: Move the output files into the cache instead of copying them
+
+    Returns:
+        Manifest dictionary of the new entry
+    """
+    described = describe_inputs(inputs)
+    key = cache_key(stage, inputs, params)
+    directory = entry_dir(stage, key, cache_root)
+
+    # Build the entry in a temporary directory and rename it into place so a
+    # half written entry is never visible to lookup()
+    stage_root = os.path.join(cache_root, stage)
+    os.makedirs(stage_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=stage_root)
+
+    filenames = {}
+    for name, path in outputs.items():
+        filename = f"{name}{os.path.splitext(path)[1]}"
+        if move:
+            shutil.move(path, os.path.join(tmp_dir, filename))
+        else:
+            shutil.copy2(path, os.path.join(tmp_dir, filename))
+        filenames[name] = filename
+
+    manifest = {
+        "stage": stage,
+        "key": key,
+        "inputs": described,
+        "params": params,
+        "outputs": filenames,
+        "created": datetime.now().isoformat(timespec="seconds")
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp_dir, directory)
+
+    return _with_paths(manifest, directory)
+
+
+def run_cached(stage, inputs, params, output_ext, produce, cache_root=CACHE_ROOT, use_cache=True):
+    """
+    Return the cached output of a single-output stage, running it only on a miss
+
+    Args:
+        stage: Stage name
+        inputs: Dictionary of input name to file path
+        params: JSON-serializable stage parameters
+        output_ext: Extension of the output file (e.g. ".json")
+        produce: Callable taking an output path and writing the stage output there
+        cache_root: Root directory of the cache
+        use_cache: Skip the lookup and always run the stage (the result is still stored)
+
+    Returns:
+        (output_path, hit) where hit is True if the stage was not run
+    """
+    if use_cache:
+        entry = lookup(stage, inputs, params, cache_root)
+        if entry is not None:
+            return entry["paths"]["output"], True
+
+    os.makedirs(cache_root, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=output_ext, dir=cache_root)
+    os.close(fd)
+    try:
+        produce(tmp_path)
+        entry = store(stage, inputs, params, {"output": tmp_path}, cache_root, move=True)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return entry["paths"]["output"], False
+
+
+def export_output(cached_path, output_path):
+    """
+    Copy a cached output to a user-facing path
+
+    The file is copied rather than linked so that editing or overwriting the exported
+    file can never change the cache entry.
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    shutil.copy2(cached_path, output_path)
+    return output_path
+
+
+def list_entries(stage=None, cache_root=CACHE_ROOT):
+    """
+    List cache entries
+
+    Args:
+        stage: Only list entries of this stage (None lists every stage)
+        cache_root: Root directory of the cache
+
+    Returns:
+        List of manifest dictionaries, oldest first
+    """
+    if not os.path.isdir(cache_root):
+        return []
+
+    stages = [stage] if stage else sorted(os.listdir(cache_root))
+    entries = []
+    for stage_name in stages:
+        stage_root = os.path.join(cache_root, stage_name)
+        if not os.path.isdir(stage_root):
+            continue
+        for key in os.listdir(stage_root):
+            if key.startswith("."):
+                # Entry still being written by store()
+                continue
+            directory = os.path.join(stage_root, key)
+            manifest = _read_manifest(directory)
+            if manifest is not None:
+                entries.append(_with_paths(manifest, directory))
+
+    return sorted(entries, key=lambda entry: entry["created"])
+
+
+def invalidate(stage=None, key=None, input_path=None, cache_root=CACHE_ROOT):
+    """
+    Remove cache entries
+
+    With no filters every entry is removed.
+
+    Args:
+        stage: Only remove entries of this stage
+        key: Only remove the entry with this key (or key prefix)
+        input_path: Only remove entries that used this file as an input
+        cache_root: Root directory of the cache
+
+    Returns:
+        Number of entries removed
+    """
+    input_abspath = os.path.abspath(input_path) if input_path else None
+    removed = 0
+
+    for entry in list_entries(stage, cache_root):
+        if key and not entry["key"].startswith(key):
+            continue
+        if input_abspath:
+            used = [value["path"] for value in entry["inputs"].values() if value["path"]]
+            if input_abspath not in (os.path.abspath(path) for path in used):
+                continue
+        shutil.rmtree(entry["dir"])
+        removed += 1
+
+    return removed
+
+
+def main():
+    """Main function for standalone execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect and invalidate the pipeline output cache')
+    parser.add_argument('command', choices=['list', 'invalidate'], help='Action to perform')
+    parser.add_argument('--stage', type=str, default=None, help='Only entries of this stage')
+    parser.add_argument('--key', type=str, default=None, help='Only the entry with this key (prefix allowed)')
+    parser.add_argument('--input', type=str, default=None, help='Only entries that used this input file')
+    parser.add_argument('--cache-root', type=str, default=CACHE_ROOT, help='Cache directory')
+
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        entries = list_entries(args.stage, args.cache_root)
+        for entry in entries:
+            inputs = ", ".join(f"{name}={value['path']}" for name, value in entry["inputs"].items())
+            print(f"{entry['stage']:<20} {entry['key'][:12]}  {entry['created']}  {inputs}")
+        print(f"{len(entries)} cache entries")
+    else:
+        removed = invalidate(args.stage, args.key, args.input, args.cache_root)
+        print(f"Removed {removed} cache entries")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
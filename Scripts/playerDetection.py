@@ -2,22 +2,118 @@ import cv2
 import json
 import os
 import numpy as np
-from ultralytics import YOLO
+from detectionPostprocess import build_class_mask, extract_boxes, boxes_to_detections
+from detectionPipeline import read_batches, run_detection_pipeline, print_pipeline_stats
+from detectionStore import save_detection_data, JsonlDetectionWriter
+from detectorBackend import load_detector, BACKENDS
+from boxPropagation import keyframe_detect, SOURCE_DETECTED
+from cameraProfiles import profile_for_clip, profile_homography, profile_inverse, is_stale
+from fieldMask import FieldRegionTracker
+from staticFrames import StaticFrameFilter, SOURCE_REUSED
+from fileHash import file_digest
+from frameIndex import load_frame_index
+from homographyTransform import loadHomography
+from detectionCheckpoint import (build_run_identity, save_checkpoint, load_checkpoint,
+                                 verify_checkpoint, recover_jsonl)
 
-def playerDetection(video_path, model_path="yolo_models/bestPlayerDetectorM.pt", output_path="cache/playerDetection/playerDetection.json"):
+# Class names kept in the output
+PLAYER_CLASSES = ["player"]
+
+
+def _field_roi_homography(video_path, correspondence_file=None):
+    """
+    Homography of the field mask, from the correspondence file if one is given and
+    otherwise from the camera profile of the clip
+
+    Returns:
+        (H, H_inv, params): H_inv is None when it has to be inverted from H, params
+        identify the calibration in the run parameters
+    """
+    if not correspondence_file:
+        profile = profile_for_clip(video_path)
+        if profile is None:
+            raise ValueError("The homography field mask needs --correspondence or a camera profile for the clip "
+                             "(see cameraProfiles.py)")
+        if not is_stale(profile):
+            print(f"Field mask from camera profile {profile['key']}")
+            return profile_homography(profile), profile_inverse(profile), {"H": profile["H"]}
+        # Recompute from the edited correspondence file until the profile is registered again
+        print(f"Warning: camera profile {profile['key']} is older than its correspondence file")
+        correspondence_file = profile["correspondence"]["path"]
+    return loadHomography(correspondence_file), None, {"correspondence_sha256": file_digest(correspondence_file)}
+
+
+def playerDetection(video_path, model_path="yolo_models/bestPlayerDetectorM.pt", output_path="cache/playerDetection/playerDetection.json",
+                    batch_size=1, pipeline=False, queue_size=8, resume=False, checkpoint_every=100,
+                    keyframe_interval=None, motion_threshold=None, drift_threshold=0.5,
+                    field_roi=None, correspondence_file=None, start_frame=0, end_frame=None,
+                    model=None, backend="torch", static_threshold=None):
     """
     Detect players in a video file
     
     Args:
         video_path: Path to input video file
-        model_path: Path to YOLO model weights
-        output_path: Path to output JSON file
+        model_path: Path to YOLO model weights (.pt, or an exported .onnx for the onnx backend)
+        output_path: Path to output .json, columnar .npz or streaming .jsonl file
+        batch_size: Number of frames grouped into one inference call
+        pipeline: Overlap decoding, inference and post-processing on separate threads
+        queue_size: Maximum number of batches buffered between pipeline stages
+        resume: Continue an interrupted .jsonl run from its last fully written frame
+        checkpoint_every: Update the checkpoint sidecar every N frames (.jsonl output only, 0 disables checkpoints)
+        keyframe_interval: Run the detector every N frames and propagate boxes with optical flow
+            in between (None runs the detector on every frame)
+        motion_threshold: Also force a keyframe once propagated boxes moved this many pixels
+        drift_threshold: Also force a keyframe when this fraction of tracked points is lost
+        field_roi: Crop frames to the field before inference and drop off-field boxes,
+            "green" (turf segmentation) or "homography" (projected field outline)
+        correspondence_file: Correspondence points used by the homography field mask
+            (default: the camera profile of the clip, see cameraProfiles.py)
+        start_frame: First frame to process
+        end_frame: Frame to stop before (None processes to the end of the video)
+        model: Already loaded YOLO model to reuse across calls (model_path is still recorded)
+        backend: "torch" (Ultralytics) or "onnx" (ONNX Runtime on the CPU)
+        static_threshold: Reuse the detections of the last detected frame when no cell of a
+            frame's thumbnail differs from it by more than this (0-255, None runs every frame)
     
     Returns:
-        Dictionary with detection results for all frames
+        Dictionary with detection results for all frames. When streaming to .jsonl the
+        frames are written as they are produced and are not kept in the returned dictionary.
     """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+    streaming = output_path.endswith(".jsonl")
+    if resume and not (streaming and checkpoint_every):
+        raise ValueError("--resume requires a streaming .jsonl output file with checkpoints enabled")
+    if keyframe_interval and pipeline:
+        raise ValueError("Keyframe mode decides frame by frame whether to run the detector and cannot use --pipeline")
+    if keyframe_interval and batch_size > 1:
+        raise ValueError("Keyframe mode decides frame by frame whether to run the detector and cannot batch frames "
+                         f"(--batch-size {batch_size})")
+
+    # Parameters that change the output, a checkpoint is only resumed if they match
+    run_params = {"classes": PLAYER_CLASSES}
+    if keyframe_interval:
+        run_params["keyframes"] = {
+            "interval": keyframe_interval,
+            "motion_threshold": motion_threshold,
+            "drift_threshold": drift_threshold
+        }
+
+    field_H, field_H_inv = None, None
+    if field_roi:
+        run_params["field_roi"] = {"method": field_roi}
+        if field_roi == "homography":
+            field_H, field_H_inv, calibration = _field_roi_homography(video_path, correspondence_file)
+            run_params["field_roi"].update(calibration)
+
+    if static_threshold is not None:
+        run_params["static_skip"] = {"threshold": static_threshold}
+
     # Load YOLO model
-    model = YOLO(model_path)
+    if model is None:
+        model = load_detector(model_path, backend)
+    player_mask = build_class_mask(model.names, PLAYER_CLASSES)
 
     # Open video
     cap = cv2.VideoCapture(video_path)
@@ -27,7 +123,7 @@ def playerDetection(video_path, model_path="yolo_models/bestPlayerDetectorM.pt",
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     print(f"Processing video: {video_path}")
-    print(f"FPS: {fps}, Total frames: {total_frames}")
+    print(f"FPS: {fps}, Total frames: {total_frames}, Batch size: {batch_size}")
 
     # Initialize results structure
     results = {
@@ -39,83 +135,310 @@ def playerDetection(video_path, model_path="yolo_models/bestPlayerDetectorM.pt",
         "frames": []
     }
 
-    frame_number = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Run YOLO detection
-        yolo_results = model(frame, verbose=False)
-        detections = []
-
-        for r in yolo_results:
-            for box in r.boxes:
-                cls_id = int(box.cls.cpu().item())
-                conf = float(box.conf.cpu().item())
-                label = model.names[cls_id]
-
-                if label.lower() != "player":
-                    continue
-
-                x1, y1, x2, y2 = box.xyxy[0].cpu().tolist()
-                width = x2 - x1
-                height = y2 - y1
-                center_x = x1 + width / 2
-                center_y = y1 + height / 2
-
-                detections.append({
-                    "class": label,
-                    "class_id": cls_id,
-                    "confidence": conf,
-                    "bbox": {
-                        "x1": float(x1),
-                        "y1": float(y1),
-                        "x2": float(x2),
-                        "y2": float(y2),
-                        "width": float(width),
-                        "height": float(height),
-                        "center_x": float(center_x),
-                        "center_y": float(center_y)
-                    }
-                })
+    # .jsonl output is appended one frame per line instead of being held in memory
+    writer = None
+    identity = None
+    resumed = False
+    progress = {"frames_written": 0, "last_frame": None}
 
-        # Add detection data to results
-        results["frames"].append({
+    if streaming:
+        run_params["frame_range"] = [start_frame, end_frame]
+        identity = build_run_identity(video_path, model_path, run_params) if checkpoint_every else None
+        checkpoint = load_checkpoint(output_path) if resume else None
+
+        if resume and checkpoint is None:
+            print(f"No checkpoint found for {output_path}, starting from frame 0")
+
+        if checkpoint is not None and os.path.exists(output_path):
+            verify_checkpoint(checkpoint, identity)
+            frames_written, last_frame = recover_jsonl(output_path)
+
+            if checkpoint["complete"] and frames_written == checkpoint["frames_written"]:
+                cap.release()
+                print(f"Checkpoint is complete, nothing to resume: {output_path}")
+                return results
+
+            if last_frame is not None:
+                start_frame = last_frame + 1
+                resumed = True
+                progress = {"frames_written": frames_written, "last_frame": last_frame}
+                print(f"Resuming from frame {start_frame} ({frames_written} frames already written)")
+
+        # Keep the existing lines (header included) when resuming
+        writer = JsonlDetectionWriter(output_path, {"video_info": results["video_info"]}, append=resumed)
+        if identity is not None:
+            save_checkpoint(output_path, identity, **progress)
+
+    counts = {"frames": 0, "detections": 0}
+
+    def add_frame(frame_number, boxes, source=None):
+        frame = {
             "frame_number": frame_number,
             "timestamp": frame_number / fps,
-            "detections": detections
-        })
+            "detections": boxes_to_detections(boxes, model.names)
+        }
+        if source is not None:
+            # Keyframe and static-skip modes tag whether the boxes came from the detector
+            frame["source"] = source
+            counts[source] = counts.get(source, 0) + 1
+        counts["frames"] += 1
+        counts["detections"] += len(frame["detections"])
 
-        if frame_number % 50 == 0:
-            print(f"Processed frame {frame_number}/{total_frames}")
+        # Add detection data to results
+        if writer is not None:
+            writer.write_frame(frame)
+            progress["frames_written"] += 1
+            progress["last_frame"] = frame_number
+            if identity is not None and progress["frames_written"] % checkpoint_every == 0:
+                save_checkpoint(output_path, identity, **progress)
+        else:
+            results["frames"].append(frame)
 
-        frame_number += 1
+    region_tracker = None
+    if field_roi:
+        region_tracker = FieldRegionTracker(field_roi, field_H, H_inv=field_H_inv)
 
-    cap.release()
+    def run_model(frames):
+        # One result is returned per frame, in the order the frames were passed
+        if region_tracker is None:
+            return [(r, None) for r in model(frames, verbose=False)]
+
+        # Only the field part of each frame is sent to the detector
+        regions = [region_tracker.region_for(frame) for frame in frames]
+        crops = [region.crop(frame) for region, frame in zip(regions, frames)]
+        return list(zip(model(crops, verbose=False), regions))
+
+    static_filter = StaticFrameFilter(static_threshold) if static_threshold is not None else None
+    reference = {"item": None}
+
+    def infer_batch(frames):
+        # Each item is (result, field region, source), source is None unless frames can be skipped
+        if static_filter is None:
+            return [item + (None,) for item in run_model(frames)]
+
+        # Frames unchanged since the last detected frame reuse its result, only the rest reach the model
+        static = [static_filter.is_static(frame) for frame in frames]
+        changed = [frame for frame, is_static in zip(frames, static) if not is_static]
+        detected = iter(run_model(changed) if changed else [])
+
+        items = []
+        for is_static in static:
+            if is_static:
+                items.append(reference["item"] + (SOURCE_REUSED,))
+            else:
+                reference["item"] = next(detected)
+                items.append(reference["item"] + (SOURCE_DETECTED,))
+        return items
+
+    def to_boxes(item):
+        r, region = item[:2]
+        boxes = extract_boxes(r, player_mask)
+        if region is not None:
+            boxes = region.restore_boxes(boxes)
+        return boxes
+
+    def add_result(frame_number, item):
+        add_frame(frame_number, to_boxes(item), item[2])
+
+    # Seeking into the middle of a clip (shards, resumed runs) goes through the frame index
+    frame_index = None
+    if start_frame:
+        try:
+            frame_index = load_frame_index(video_path)
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"No frame index ({e}), seeking by frame position instead")
+
+    try:
+        if pipeline:
+            stats = run_detection_pipeline(cap, infer_batch, add_result, batch_size=batch_size,
+                                           queue_size=queue_size, total_frames=total_frames,
+                                           start_frame=start_frame, end_frame=end_frame,
+                                           frame_index=frame_index)
+            print_pipeline_stats(stats)
+        elif keyframe_interval:
+            frames = ((numbers[0], batch[0]) for numbers, batch in read_batches(cap, 1, start_frame, end_frame, frame_index))
+            detect = lambda frame: to_boxes(infer_batch([frame])[0])
+            for frame_number, boxes, source in keyframe_detect(frames, detect, keyframe_interval,
+                                                               motion_threshold, drift_threshold):
+                add_frame(frame_number, boxes, source)
+
+                if frame_number % 50 == 0:
+                    print(f"Processed frame {frame_number}/{total_frames} ({source})")
+        else:
+            for frame_numbers, frames in read_batches(cap, batch_size, start_frame, end_frame, frame_index):
+                for frame_number, r in zip(frame_numbers, infer_batch(frames)):
+                    add_result(frame_number, r)
 
-    # Save results
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(results, f, indent=2)
+                    if frame_number % 50 == 0:
+                        print(f"Processed frame {frame_number}/{total_frames}")
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
+        if identity is not None:
+            save_checkpoint(output_path, identity, **progress)
+
+    if identity is not None:
+        save_checkpoint(output_path, identity, complete=True, **progress)
+
+    # Save results (.npz output is written in the columnar format)
+    if writer is None:
+        save_detection_data(results, output_path)
 
     print(f"Player detection complete. Results saved to: {output_path}")
+    print(f"Detected {counts['detections']} player objects across {counts['frames']} frames")
+    if region_tracker is not None and region_tracker.region is not None:
+        print(f"Field mask computed {region_tracker.updates} times, last crop covered "
+              f"{region_tracker.region.pixel_fraction():.0%} of the frame")
+    if static_filter is not None:
+        print(f"Reused detections on {static_filter.reused} of {static_filter.frames} frames "
+              f"(skip ratio {static_filter.skip_ratio():.1%})")
+    if keyframe_interval:
+        print(f"Detector ran on {counts.get('detected', 0)} keyframes, "
+              f"{counts.get('propagated', 0)} frames were propagated")
     return results
 
 
+def _detect_shard(args):
+    """Run one frame range in a worker process (module level so it can be pickled)"""
+    video_path, model_path, shard_path, start_frame, end_frame, threads, options = args
+
+    # Split the cores between the shards instead of every process using all of them
+    if options.get("backend", "torch") == "onnx":
+        options = dict(options, model=load_detector(model_path, "onnx", threads=threads))
+    else:
+        import torch
+        torch.set_num_threads(threads)
+
+    playerDetection(video_path, model_path, shard_path, checkpoint_every=0,
+                    start_frame=start_frame, end_frame=end_frame, **options)
+    return shard_path
+
+
+def playerDetectionSharded(video_path, model_path="yolo_models/bestPlayerDetectorM.pt",
+                           output_path="cache/playerDetection/playerDetection.json", shards=2, **options):
+    """
+    Split one video into contiguous frame ranges and detect each range in its own process
+
+    Every worker loads its own copy of the model, seeks to the start of its range and writes
+    a temporary .jsonl shard. The shards are concatenated in frame order into the final output,
+    which is identical to a single-process run.
+
+    Args:
+        video_path: Path to input video file
+        model_path: Path to YOLO model weights
+        output_path: Path to output file (.json, .npz or .jsonl)
+        shards: Number of worker processes
+        **options: Other playerDetection arguments (batch_size, pipeline, keyframe_interval, ...)
+
+    Returns:
+        Number of frames written
+    """
+    import multiprocessing
+    from detectionStore import iter_jsonl_frames
+
+    if options.get("resume"):
+        raise ValueError("--resume cannot be combined with --shards")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    # Build the frame index once here so every worker finds it cached and seeks exactly
+    try:
+        total_frames = load_frame_index(video_path).frame_count
+    except (ImportError, OSError, RuntimeError) as e:
+        print(f"No frame index ({e}), shard boundaries use the container frame count")
+
+    # The frame count can still be off by a few frames, so the last shard runs to the end
+    shards = max(1, min(shards, total_frames))
+    bounds = np.linspace(0, total_frames, shards + 1).astype(int).tolist()
+    bounds[-1] = None
+    threads = max(1, (os.cpu_count() or 1) // shards)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    jobs = []
+    for index in range(shards):
+        shard_path = f"{output_path}.shard{index}.jsonl"
+        jobs.append((video_path, model_path, shard_path, bounds[index], bounds[index + 1], threads, options))
+        print(f"Shard {index}: frames {bounds[index]} to {bounds[index + 1] if bounds[index + 1] is not None else 'end'}")
+
+    try:
+        # spawn keeps CUDA and the OpenCV decoder out of forked children
+        with multiprocessing.get_context("spawn").Pool(shards) as pool:
+            shard_paths = pool.map(_detect_shard, jobs)
+
+        video_info = {"path": video_path, "fps": fps, "total_frames": total_frames}
+        frames_written = 0
+        if output_path.endswith(".jsonl"):
+            with JsonlDetectionWriter(output_path, {"video_info": video_info}) as writer:
+                for shard_path in shard_paths:
+                    for frame in iter_jsonl_frames(shard_path):
+                        writer.write_frame(frame)
+                frames_written = writer.frames_written
+        else:
+            frames = [frame for shard_path in shard_paths for frame in iter_jsonl_frames(shard_path)]
+            save_detection_data({"video_info": video_info, "frames": frames}, output_path)
+            frames_written = len(frames)
+    finally:
+        for _, _, shard_path, _, _, _, _ in jobs:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+
+    print(f"Merged {shards} shards ({frames_written} frames) into: {output_path}")
+    return frames_written
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='Player Detection Module (Video)')
     parser.add_argument('--video', type=str, required=True, help='Path to input video file')
-    parser.add_argument('--output', type=str, default='cache/playerDetection/playerDetection.json', help='Path to output JSON file')
+    parser.add_argument('--output', type=str, default='cache/playerDetection/playerDetection.json', help='Path to output file (.json, columnar .npz or streaming .jsonl)')
     parser.add_argument('--model', type=str, default='yolo_models/bestPlayerDetectorM.pt', help='Path to YOLO model weights')
+    parser.add_argument('--batch-size', type=int, default=1, help='Number of frames per inference call (default: 1)')
+    parser.add_argument('--pipeline', action='store_true', help='Run decoding, inference and post-processing on separate threads')
+    parser.add_argument('--queue-size', type=int, default=8, help='Batches buffered between pipeline stages (default: 8)')
+    parser.add_argument('--resume', action='store_true', help='Resume an interrupted .jsonl run from its checkpoint')
+    parser.add_argument('--checkpoint-every', type=int, default=100, help='Frames between checkpoint updates (default: 100)')
+    parser.add_argument('--keyframe-interval', type=int, default=None,
+                        help='Run the detector every N frames and propagate boxes with optical flow in between')
+    parser.add_argument('--motion-threshold', type=float, default=None,
+                        help='Force a keyframe once propagated boxes have moved this many pixels')
+    parser.add_argument('--drift-threshold', type=float, default=0.5,
+                        help='Force a keyframe when this fraction of tracked points is lost (default: 0.5)')
+    parser.add_argument('--field-roi', type=str, choices=['green', 'homography'], default=None,
+                        help='Only run the detector on the field region (turf segmentation or projected field outline)')
+    parser.add_argument('--correspondence', type=str, default=None,
+                        help='Correspondence points JSON used by --field-roi homography '
+                             '(default: the camera profile of the clip)')
+    parser.add_argument('--backend', type=str, choices=BACKENDS, default='torch',
+                        help='Inference backend, onnx runs an exported .onnx model with ONNX Runtime (default: torch)')
+    parser.add_argument('--static-threshold', type=float, default=None,
+                        help='Reuse detections of frames whose thumbnail cells differ from the last detected '
+                             'frame by at most this much (0-255, e.g. 6)')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Split the video into N frame ranges detected by separate processes (default: 1)')
     args = parser.parse_args()
 
+    options = dict(batch_size=args.batch_size, pipeline=args.pipeline, queue_size=args.queue_size,
+                   keyframe_interval=args.keyframe_interval, motion_threshold=args.motion_threshold,
+                   drift_threshold=args.drift_threshold, field_roi=args.field_roi,
+                   correspondence_file=args.correspondence, backend=args.backend,
+                   static_threshold=args.static_threshold)
+
     try:
-        results = playerDetection(args.video, args.model, args.output)
-        total_detections = sum(len(frame['detections']) for frame in results['frames'])
-        print(f"Detected {total_detections} player objects across {len(results['frames'])} frames")
+        if args.shards > 1:
+            playerDetectionSharded(args.video, args.model, args.output, shards=args.shards,
+                                   resume=args.resume, **options)
+        else:
+            playerDetection(args.video, args.model, args.output, resume=args.resume,
+                            checkpoint_every=args.checkpoint_every, **options)
     except Exception as e:
         print(f"Error: {e}")
         return 1
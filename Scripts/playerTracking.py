@@ -0,0 +1,189 @@
+# script to track players across frames
+# input: video file and its cached player detection file
+# output: the same detection data with a "track_id" on every tracked detection
+# (.json, columnar .npz with a track_id column, or streaming .jsonl, see detectionStore.py)
+#
+# the detector does not run again: the boxes come from the detection file and the video
+# is only decoded so DeepSORT can compute the appearance embedding of each box. every box
+# is passed to the tracker with its index in the frame, and a confirmed track that was
+# matched in this frame hands that index back, so track ids land on exactly the detection
+# they came from instead of being matched to boxes again by overlap.
+
+import sys
+import cv2
+import numpy as np
+from detectionStore import (iter_jsonl_frames, read_jsonl_header, load_detection_data, save_detection_data,
+                            JsonlDetectionWriter)
+
+# DeepSORT settings tuned on wide game film (also used by testPlayerTracking.py)
+TRACKER_CONFIG = {
+    "max_age": 10,             # Shorter max age for faster track termination
+    "n_init": 2,               # Fewer frames needed to confirm track
+    "max_iou_distance": 0.3,   # Stricter IoU threshold for football
+    "max_cosine_distance": 0.1,  # Stricter appearance threshold
+    "nn_budget": 50            # Limit appearance features for speed
+}
+# Boxes smaller than this (pixels) are likely false positives and are not tracked
+MIN_BOX_SIZE = 20
+# At most this many detections per frame are tracked, the most confident ones
+MAX_DETECTIONS = 30
+
+
+def _open_detections(detection_path):
+    """Header and frame iterator of a detection file, .jsonl files are streamed"""
+    if detection_path.endswith(".jsonl"):
+        return read_jsonl_header(detection_path), iter_jsonl_frames(detection_path)
+    data = load_detection_data(detection_path)
+    frames = data.pop("frames", [])
+    return data, iter(frames)
+
+
+def track_frame(tracker, frame, detections, min_box_size=MIN_BOX_SIZE, max_detections=MAX_DETECTIONS):
+    """
+    Update the tracker with the detections of one frame and label them with track ids
+
+    Args:
+        tracker: deep_sort_realtime DeepSort instance
+        frame: Decoded BGR frame the detections belong to
+        detections: Detection dictionaries of the frame, "track_id" is set on the tracked ones
+        min_box_size: Smaller boxes are not passed to the tracker
+        max_detections: Most confident boxes passed to the tracker
+
+    Returns:
+        Number of detections that received a track id
+    """
+    if not detections:
+        # Still advance the tracker so tracks age out during empty frames
+        tracker.update_tracks([], frame=frame)
+        return 0
+
+    bbox = np.array([[d["bbox"]["x1"], d["bbox"]["y1"], d["bbox"]["x2"], d["bbox"]["y2"]] for d in detections],
+                    dtype=np.float64)
+    conf = np.array([d["confidence"] for d in detections])
+    width, height = bbox[:, 2] - bbox[:, 0], bbox[:, 3] - bbox[:, 1]
+
+    # deep_sort_realtime silently drops boxes without area from its detections but not from
+    # others, which would shift every later index, so they never reach the tracker
+    keep = np.flatnonzero((width >= min_box_size) & (height >= min_box_size) & (width > 0) & (height > 0))
+    keep = keep[np.argsort(-conf[keep], kind="stable")[:max_detections]]
+
+    # deep_sort_realtime expects ([left, top, w, h], confidence, class)
+    tlwh = np.stack([bbox[keep, 0], bbox[keep, 1], width[keep], height[keep]], axis=1)
+    raw = [(box, c, detections[i]["class"]) for box, c, i in zip(tlwh.tolist(), conf[keep].tolist(), keep.tolist())]
+
+    tracked = 0
+    for track in tracker.update_tracks(raw, frame=frame, others=keep.tolist()):
+        index = track.get_det_supplementary()
+        if track.is_confirmed() and track.time_since_update == 0 and index is not None:
+            detections[index]["track_id"] = int(track.track_id)
+            tracked += 1
+    return tracked
+
+
+def playerTracking(video_path, detection_path, output_path="cache/playerTracking/playerTracking.json",
+                   tracker_config=None, min_box_size=MIN_BOX_SIZE, max_detections=MAX_DETECTIONS):
+    """
+    Assign track ids to cached player detections
+
+    Args:
+        video_path: Path to the video the detections were made on
+        detection_path: Player detection file (.json, .jsonl or .npz)
+        output_path: Path to output .json, columnar .npz or streaming .jsonl file
+        tracker_config: DeepSORT arguments (default TRACKER_CONFIG)
+        min_box_size: Boxes smaller than this are not tracked
+        max_detections: Most confident boxes per frame that are tracked
+
+    Returns:
+        Dictionary with the tracked detection data. When streaming to .jsonl the frames are
+        written as they are produced and are not kept in the returned dictionary.
+    """
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+
+    tracker = DeepSort(**(tracker_config or TRACKER_CONFIG))
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    header, frames = _open_detections(detection_path)
+    results = dict(header, frames=[])
+    print(f"Tracking players: {detection_path} on {video_path}")
+
+    writer = None
+    if output_path.endswith(".jsonl"):
+        writer = JsonlDetectionWriter(output_path, header)
+
+    position = 0  # Frame the next cap.read() returns
+    counts = {"frames": 0, "tracked": 0}
+    track_ids = set()
+
+    try:
+        for record in frames:
+            frame_number = record["frame_number"]
+            if frame_number < position:
+                raise ValueError(f"Detection frames are not in order at frame {frame_number}")
+
+            # Frames without a record (e.g. outside a sharded range) are skipped without decoding
+            while position < frame_number and cap.grab():
+                position += 1
+            ret, frame = cap.read()
+            if not ret:
+                print(f"Video ended before frame {frame_number}")
+                break
+            position += 1
+
+            detections = record.get("detections", [])
+            counts["tracked"] += track_frame(tracker, frame, detections, min_box_size, max_detections)
+            track_ids.update(d["track_id"] for d in detections if "track_id" in d)
+            counts["frames"] += 1
+
+            if writer is not None:
+                writer.write_frame(record)
+            else:
+                results["frames"].append(record)
+
+            if frame_number % 50 == 0:
+                print(f"Tracked frame {frame_number}/{total_frames} - Unique tracks so far: {len(track_ids)}")
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        save_detection_data(results, output_path)
+
+    print(f"Player tracking complete. Results saved to: {output_path}")
+    print(f"Assigned {counts['tracked']} track ids across {counts['frames']} frames, {len(track_ids)} unique tracks")
+    return results
+
+
+def main():
+    """Main function for standalone execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Assign DeepSORT track ids to cached player detections')
+    parser.add_argument('--video', type=str, required=True, help='Path to input video file')
+    parser.add_argument('--detections', type=str, required=True,
+                       help='Player detection file of the video (.json, .jsonl or .npz)')
+    parser.add_argument('--output', type=str, default='cache/playerTracking/playerTracking.json',
+                       help='Path to output file (.json, streaming .jsonl or columnar .npz)')
+    parser.add_argument('--min-box-size', type=int, default=MIN_BOX_SIZE,
+                       help=f'Smaller boxes are not tracked (default: {MIN_BOX_SIZE})')
+    parser.add_argument('--max-detections', type=int, default=MAX_DETECTIONS,
+                       help=f'Most confident boxes tracked per frame (default: {MAX_DETECTIONS})')
+
+    args = parser.parse_args()
+
+    try:
+        playerTracking(args.video, args.detections, args.output,
+                       min_box_size=args.min_box_size, max_detections=args.max_detections)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
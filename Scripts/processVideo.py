@@ -2,6 +2,7 @@
 """
 Process Video Script
 Processes a selected video file through the detection and tracking pipeline
+(detection -> tracking -> homography -> field video)
 """
 
 import argparse
@@ -9,14 +10,34 @@ import json
 import os
 import sys
 from pathlib import Path
+from playerDetection import playerDetection, PLAYER_CLASSES
+from playerTracking import playerTracking, TRACKER_CONFIG, MIN_BOX_SIZE, MAX_DETECTIONS
+from homographyTransform import homographyTransform
+from renderFieldVideo import create_field_video
+from detectionStore import load_detection_data, save_detection_data
+from pipelineCache import run_cached, export_output
+from cameraProfiles import profile_for_clip, profile_homography, is_stale
 
-def process_video(video_path, output_dir="cache/processed_videos"):
+DEFAULT_MODEL_PATH = "yolo_models/bestPlayerDetectorM.pt"
+CORRESPONDENCE_FILE = "cache/correspondence/correspondences.json"
+FIELD_VIDEO_FPS = 30
+
+def process_video(video_path, output_dir="cache/processed_videos", model_path=DEFAULT_MODEL_PATH, use_cache=True, model=None):
     """
     Process a video file through the detection and tracking pipeline
+
+    Each stage is looked up in the pipeline cache first and only runs when its
+    inputs (video, model weights, correspondence file, upstream output) or
+    parameters have changed. The homography comes from the camera profile the
+    clip is mapped to (see cameraProfiles.py), falling back to the shared
+    correspondence file when the clip has no profile.
     
     Args:
         video_path (str): Path to the video file to process
         output_dir (str): Directory to save processed outputs
+        model_path (str): Path to the player detection weights
+        use_cache (bool): Reuse cached stage outputs when possible
+        model: Already loaded detection model to reuse (loaded from model_path if None)
     
     Returns:
         dict: Processing results and output paths
@@ -28,34 +49,90 @@ def process_video(video_path, output_dir="cache/processed_videos"):
     
     # Get video filename without extension
     video_name = Path(video_path).stem
+    cache_hits = {}
     
     # Step 1: Player Detection
     print("Step 1: Running player detection...")
     detection_output = f"{output_dir}/{video_name}_detection.json"
-    detection_cmd = f"python3 Scripts/playerDetection.py --video '{video_path}' --output '{detection_output}'"
-    print(f"Running: {detection_cmd}")
-    # TODO: Execute detection command
+    detection_cached, cache_hits["playerDetection"] = run_cached(
+        "playerDetection",
+        {"video": video_path, "model": model_path},
+        {"classes": PLAYER_CLASSES},
+        ".json",
+        lambda out: playerDetection(video_path, model_path, out, model=model),
+        use_cache=use_cache
+    )
+    export_output(detection_cached, detection_output)
+    print(f"Player detection {'loaded from cache' if cache_hits['playerDetection'] else 'complete'}: {detection_output}")
+    
+    # Step 2: Player Tracking (reads the cached detections, the detector does not run again)
+    print("Step 2: Running player tracking...")
+    tracking_output = f"{output_dir}/{video_name}_tracking.json"
+    tracking_cached, cache_hits["playerTracking"] = run_cached(
+        "playerTracking",
+        {"video": video_path, "detections": detection_cached},
+        {"tracker": TRACKER_CONFIG, "min_box_size": MIN_BOX_SIZE, "max_detections": MAX_DETECTIONS},
+        ".json",
+        lambda out: playerTracking(video_path, detection_cached, out),
+        use_cache=use_cache
+    )
+    export_output(tracking_cached, tracking_output)
+    print(f"Player tracking {'loaded from cache' if cache_hits['playerTracking'] else 'complete'}: {tracking_output}")
     
-    # Step 2: Homography Transformation (if correspondence points exist)
-    print("Step 2: Checking for homography transformation...")
-    correspondence_file = "cache/correspondence/correspondencePoints.json"
-    if os.path.exists(correspondence_file):
-        print("Correspondence points found, running homography transformation...")
+    # Step 3: Homography Transformation (if the clip has a camera profile or correspondence points exist)
+    print("Step 3: Checking for homography transformation...")
+    profile = profile_for_clip(video_path)
+    correspondence_file = profile["correspondence"]["path"] if profile else CORRESPONDENCE_FILE
+    H = None
+    if profile and is_stale(profile):
+        # Recompute from the edited correspondence file until the profile is registered again
+        print(f"Warning: camera profile {profile['key']} is older than its correspondence file")
+    elif profile:
+        H = profile_homography(profile)
+    homography_cached = None
+    if H is not None or os.path.exists(correspondence_file):
+        if H is not None:
+            print(f"Camera profile {profile['key']} found "
+                  f"(reprojection error {profile['reprojection_error']:.2f} ft), running homography transformation...")
+            # The profile matrix is the input, its correspondence file may no longer exist
+            homography_inputs = {"detections": tracking_cached}
+            homography_params = {"H": profile["H"]}
+        else:
+            print("Correspondence points found, running homography transformation...")
+            homography_inputs = {"detections": tracking_cached, "correspondence": correspondence_file}
+            homography_params = {}
         homography_output = f"{output_dir}/{video_name}_homography.json"
-        homography_cmd = f"python3 Scripts/homographyTransform.py --input '{detection_output}' --correspondence '{correspondence_file}' --output '{homography_output}'"
-        print(f"Running: {homography_cmd}")
-        # TODO: Execute homography command
+
+        def run_homography(out):
+            transformed = homographyTransform(correspondence_file, load_detection_data(tracking_cached), H=H)
+            save_detection_data(transformed, out, indent=4)
+
+        homography_cached, cache_hits["homographyTransform"] = run_cached(
+            "homographyTransform",
+            homography_inputs,
+            homography_params,
+            ".json",
+            run_homography,
+            use_cache=use_cache
+        )
+        export_output(homography_cached, homography_output)
     else:
         print("No correspondence points found, skipping homography transformation")
         homography_output = None
     
-    # Step 3: Render Field Video (if homography was successful)
-    if homography_output and os.path.exists(homography_output):
-        print("Step 3: Rendering field video...")
+    # Step 4: Render Field Video (if homography was successful)
+    if homography_cached:
+        print("Step 4: Rendering field video...")
         field_video_output = f"{output_dir}/{video_name}_field.mp4"
-        render_cmd = f"python3 Scripts/renderFieldVideo.py --input '{homography_output}' --output '{field_video_output}'"
-        print(f"Running: {render_cmd}")
-        # TODO: Execute render command
+        field_video_cached, cache_hits["renderFieldVideo"] = run_cached(
+            "renderFieldVideo",
+            {"homography": homography_cached},
+            {"fps": FIELD_VIDEO_FPS},
+            ".mp4",
+            lambda out: create_field_video(homography_cached, out, fps=FIELD_VIDEO_FPS),
+            use_cache=use_cache
+        )
+        export_output(field_video_cached, field_video_output)
     else:
         print("Skipping field video rendering (no homography data)")
         field_video_output = None
@@ -64,9 +141,12 @@ def process_video(video_path, output_dir="cache/processed_videos"):
     results = {
         "video_path": video_path,
         "video_name": video_name,
+        "camera_profile": profile["key"] if profile else None,
         "detection_output": detection_output,
+        "tracking_output": tracking_output,
         "homography_output": homography_output,
         "field_video_output": field_video_output,
+        "cache_hits": cache_hits,
         "status": "completed"
     }
     
@@ -78,6 +158,8 @@ def main():
     parser = argparse.ArgumentParser(description="Process a video file through the detection and tracking pipeline")
     parser.add_argument("--video", required=True, help="Path to the video file to process")
     parser.add_argument("--output-dir", default="cache/processed_videos", help="Output directory for processed files")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Path to player detection weights")
+    parser.add_argument("--no-cache", action="store_true", help="Rerun every stage even if a cached output exists")
     
     args = parser.parse_args()
     
@@ -88,7 +170,7 @@ def main():
     
     # Process the video
     try:
-        results = process_video(args.video, args.output_dir)
+        results = process_video(args.video, args.output_dir, model_path=args.model, use_cache=not args.no_cache)
         
         # Save results to JSON
         results_file = f"{args.output_dir}/{Path(args.video).stem}_results.json"
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+INT8 Quantization Script
+Quantizes the exported ONNX player detector to INT8 with static calibration on frames
+sampled from our own clips, then reports detection agreement (IoU-matched recall and
+precision) and frames/sec of the INT8 model against the FP32 model on the same clips.
+The INT8 model loads like any other ONNX model: playerDetection.py --backend onnx --model <int8.onnx>
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from detectorBackend import OnnxDetector
+from exportOnnx import sample_frames, compare_models
+
+try:
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+except ImportError as e:
+    raise ImportError(f"INT8 quantization needs onnx and onnxruntime ({e}), "
+                      f"install them with: pip install onnx onnxruntime (both are in requirements.txt)") from e
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Feeds letterboxed calibration frames to the quantizer one image at a time"""
+
+    def __init__(self, detector, frames):
+        """
+        Args:
+            detector: OnnxDetector of the FP32 model, used for its input name and preprocessing
+            frames: List of BGR calibration frames
+        """
+        self.input_name = detector.input_name
+        self.batches = iter([detector.preprocess([frame]) for frame in frames])
+
+    def get_next(self):
+        batch = next(self.batches, None)
+        return None if batch is None else {self.input_name: batch}
+
+
+def quantize_detector(fp32_path, int8_path, calibration_frames, per_channel=True,
+                      method=CalibrationMethod.MinMax):
+    """
+    Statically quantize an ONNX detector to INT8
+
+    Args:
+        fp32_path: Path to the FP32 .onnx model
+        int8_path: Path to write the INT8 .onnx model
+        calibration_frames: List of BGR frames used to calibrate activation ranges
+        per_channel: Quantize convolution weights per output channel
+        method: Calibration method for activation ranges
+
+    Returns:
+        Path to the INT8 model
+    """
+    detector = OnnxDetector(fp32_path)
+    reader = FrameCalibrationReader(detector, calibration_frames)
+
+    quantize_static(fp32_path, int8_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=per_channel,
+                    calibrate_method=method)
+
+    # Keep the Ultralytics metadata (class names, input size) so OnnxDetector can load the result
+    fp32_model = onnx.load(fp32_path, load_external_data=False)
+    int8_model = onnx.load(int8_path)
+    present = {prop.key for prop in int8_model.metadata_props}
+    for prop in fp32_model.metadata_props:
+        if prop.key not in present:
+            int8_model.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(int8_model, int8_path)
+
+    return int8_path
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Quantize the ONNX player detector to INT8 and compare it with FP32")
+    parser.add_argument('--onnx', type=str, default='yolo_models/bestPlayerDetectorM.onnx', help='Path to the FP32 .onnx model')
+    parser.add_argument('--output', type=str, default=None, help='Path to the INT8 model (default: <onnx>.int8.onnx)')
+    parser.add_argument('--calibration-video', type=str, nargs='+', required=True,
+                        help='Clips to sample calibration frames from')
+    parser.add_argument('--calibration-frames', type=int, default=100,
+                        help='Calibration frames in total, spread over the clips (default: 100)')
+    parser.add_argument('--method', type=str, choices=['minmax', 'entropy', 'percentile'], default='minmax',
+                        help='Activation range calibration method (default: minmax)')
+    parser.add_argument('--per-tensor', action='store_true', help='Quantize weights per tensor instead of per channel')
+    parser.add_argument('--eval-video', type=str, nargs='*', default=None,
+                        help='Clips to compare INT8 against FP32 on (default: the calibration clips)')
+    parser.add_argument('--eval-frames', type=int, default=50, help='Evaluation frames per clip (default: 50)')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU threshold for box agreement (default: 0.5)')
+    parser.add_argument('--report', type=str, default='cache/benchmarks/int8_report.json', help='Path to JSON report')
+    args = parser.parse_args()
+
+    int8_path = args.output or f"{os.path.splitext(args.onnx)[0]}.int8.onnx"
+    methods = {
+        'minmax': CalibrationMethod.MinMax,
+        'entropy': CalibrationMethod.Entropy,
+        'percentile': CalibrationMethod.Percentile
+    }
+
+    per_clip = max(1, args.calibration_frames // len(args.calibration_video))
+    calibration = [frame for video in args.calibration_video for frame in sample_frames(video, per_clip)]
+    if not calibration:
+        print("Error: no calibration frames decoded")
+        return 1
+
+    print(f"Calibrating on {len(calibration)} frames from {len(args.calibration_video)} clips")
+    quantize_detector(args.onnx, int8_path, calibration, per_channel=not args.per_tensor, method=methods[args.method])
+    print(f"INT8 model saved to: {int8_path}")
+
+    fp32_model = OnnxDetector(args.onnx)
+    int8_model = OnnxDetector(int8_path)
+
+    clips = []
+    for video in args.eval_video or args.calibration_video:
+        frames = sample_frames(video, args.eval_frames)
+        if not frames:
+            print(f"  skipping {video}: no frames decoded")
+            continue
+        result = {"video": video}
+        result.update(compare_models(fp32_model, int8_model, frames, args.iou))
+        clips.append(result)
+        print(f"  {video}: recall {result['recall']:.3f} precision {result['precision']:.3f} "
+              f"| FP32 {result['reference_fps']:.2f} fps, INT8 {result['candidate_fps']:.2f} fps "
+              f"({result['speedup']:.2f}x)")
+
+    matched = sum(clip["matched"] for clip in clips)
+    reference_boxes = sum(clip["reference_boxes"] for clip in clips)
+    candidate_boxes = sum(clip["candidate_boxes"] for clip in clips)
+    report = {
+        "fp32_model": args.onnx,
+        "int8_model": int8_path,
+        "fp32_size_mb": round(os.path.getsize(args.onnx) / 1e6, 2),
+        "int8_size_mb": round(os.path.getsize(int8_path) / 1e6, 2),
+        "calibration": {
+            "videos": args.calibration_video,
+            "frames": len(calibration),
+            "method": args.method,
+            "per_channel": not args.per_tensor
+        },
+        "recall": matched / reference_boxes if reference_boxes else 1.0,
+        "precision": matched / candidate_boxes if candidate_boxes else 1.0,
+        "mean_speedup": round(float(np.mean([clip["speedup"] for clip in clips])), 2) if clips else None,
+        "clips": clips
+    }
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Overall recall {report['recall']:.3f} precision {report['precision']:.3f}, "
+          f"mean speedup {report['mean_speedup']}x")
+    print(f"Report saved to: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
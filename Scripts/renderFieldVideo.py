@@ -10,8 +10,10 @@ import os
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
+import matplotlib.animation
 import cv2
+from itertools import chain, islice
+from detectionStore import iter_frames
 
 # Field constants (yards) - same as drawPlayers.py
 FIELD_LENGTH = 120.0                # 120 yards (100 + 2 endzones)
@@ -107,17 +109,19 @@ def plot_frame(ax, frame, radius_yd=0.6, show_labels=False):
         # Correct for endzone offset
         x_yd += 10.0   # shift everything forward 10 yards
         
-        # Use a single color for all players to avoid flashing
-        color = 'red'  # or 'blue', 'yellow', etc.
+        # Tracked players keep their color, untracked detections use a single color to avoid flashing
+        track_id = detection.get('track_id')
+        color = get_track_color(track_id) if track_id is not None else 'red'
         
         # Create player circle
         circ = plt.Circle((x_yd, y_yd), radius_yd, color=color, alpha=0.8, zorder=5)
         circ._is_player = True  # Mark for removal
         ax.add_patch(circ)
         
-        # Add detection ID label
+        # Add track ID label (detection index for untracked detections)
         if show_labels:
-            text = ax.text(x_yd + 0.5, y_yd + 0.2, str(i), color='white', fontsize=6, zorder=6)
+            label = str(track_id) if track_id is not None else str(i)
+            text = ax.text(x_yd + 0.5, y_yd + 0.2, label, color='white', fontsize=6, zorder=6)
             text._is_player_label = True  # Mark for removal
         
         count += 1
@@ -128,41 +132,40 @@ def create_field_video(input_json, output_video, fps=30, radius_yd=0.6, show_lab
                       frame_skip=1, max_frames=None):
     """
     Create a video showing players moving on the digital field
+
+    Frames are read and rendered one at a time, so a streaming .jsonl input is never
+    loaded into memory as a whole.
     
     Args:
-        input_json: Path to tracked players JSON file
+        input_json: Path to tracked players JSON, streaming .jsonl or columnar .npz file
         output_video: Path to output video file
         fps: Frames per second for output video
         radius_yd: Radius of player circles in yards
-        show_labels: Whether to show detection ID labels
+        show_labels: Whether to show track ID labels (detection index when untracked)
         frame_skip: Process every Nth frame (1 = all frames)
         max_frames: Maximum number of frames to process (None = all)
+
+    Returns:
+        Number of frames rendered
     """
     
-    # Load data
-    with open(input_json, 'r') as f:
-        data = json.load(f)
-    
-    frames = data.get('frames', [])
-    if not frames:
-        raise ValueError("No frames found in JSON input.")
-    
-    # Apply frame skipping and max frames
-    if frame_skip > 1:
-        frames = frames[::frame_skip]
-    
-    if max_frames and len(frames) > max_frames:
-        frames = frames[:max_frames]
+    # Apply frame skipping and max frames while streaming the input
+    frames = islice(iter_frames(input_json), 0, None, frame_skip)
+    if max_frames:
+        frames = islice(frames, max_frames)
     
-    print(f"Processing {len(frames)} frames for field video creation")
+    # Fail before the figure and the output file are created if there is nothing to render
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames found in input.")
+    frames = chain([first], frames)
     
     # Set up the plot
     fig, ax = plt.subplots(figsize=(16, 8))
     draw_field(ax)
     
-    # Animation function
-    def animate(frame_idx):
-        frame = frames[frame_idx]
+    # Draw a single frame
+    def animate(frame_idx, frame):
         player_count = plot_frame(ax, frame, radius_yd=radius_yd, 
                                 show_labels=show_labels)
         
@@ -170,32 +173,36 @@ def create_field_video(input_json, output_video, fps=30, radius_yd=0.6, show_lab
         timestamp = frame.get('timestamp', frame_idx / fps)
         ax.set_title(f"Frame {frame_idx} | Time: {timestamp:.2f}s | Tracked Players: {player_count}", 
                     fontsize=14, color='white', pad=20)
-        
-        return ax.patches + ax.texts
-    
-    # Create animation
-    print("Creating field animation...")
-    anim = FuncAnimation(fig, animate, frames=len(frames), 
-                        interval=1000/fps, blit=False, repeat=True)
     
     # Save as video
     print(f"Saving video to {output_video}...")
     os.makedirs(os.path.dirname(output_video), exist_ok=True)
     
-    # Use matplotlib's animation writer
+    # Use matplotlib's animation writer, grabbing each frame as soon as it is drawn
     Writer = plt.matplotlib.animation.writers['ffmpeg']
     writer = Writer(fps=fps, metadata=dict(artist='AI Football Analysis'), bitrate=1800)
     
-    anim.save(output_video, writer=writer, dpi=100)
-    print(f"Field video saved successfully to {output_video}")
+    frame_count = 0
+    with writer.saving(fig, output_video, dpi=100):
+        for frame_idx, frame in enumerate(frames):
+            animate(frame_idx, frame)
+            writer.grab_frame()
+            frame_count += 1
+
+            if frame_idx % 50 == 0:
+                print(f"Rendered frame {frame_idx}")
+
+    plt.close(fig)
+
+    print(f"Field video saved successfully to {output_video} ({frame_count} frames)")
     
-    return anim
+    return frame_count
 
 def main():
     """Main function for standalone execution"""
     parser = argparse.ArgumentParser(description="Create video of players moving on digital football field")
     parser.add_argument('--input', '-i', required=True, 
-                       help='Path to tracked players JSON file')
+                       help='Path to tracked players JSON, .jsonl or .npz file')
     parser.add_argument('--output', '-o', default='cache/videos/field_animation.mp4',
                        help='Path to output video file')
     parser.add_argument('--fps', type=int, default=30, 
@@ -215,7 +222,7 @@ def main():
         raise FileNotFoundError(f"Input file not found: {args.input}")
     
     try:
-        anim = create_field_video(
+        create_field_video(
             input_json=args.input,
             output_video=args.output,
             fps=args.fps,
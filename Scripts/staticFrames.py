@@ -0,0 +1,87 @@
+# static frame skipping
+# game film has long stretches where nothing moves: pre-snap huddles, replays held on a
+# still, padded starts and ends. every frame gets a cheap signature (a small downscaled
+# grayscale thumbnail); when it is effectively unchanged from the last frame the detector
+# ran on, that frame's detections are reused instead of running the model again.
+# the comparison uses the largest per-cell change rather than the mean, so a single
+# player moving a few pixels is enough to run the detector again.
+
+import cv2
+import numpy as np
+
+SOURCE_REUSED = "reused"
+
+# Thumbnail size (width, height), about 16:9
+SIGNATURE_SIZE = (32, 18)
+# Finer thumbnail for static detection, a cell is about one player wide on 1080p film
+STATIC_SIGNATURE_SIZE = (64, 36)
+
+
+def frame_signature(frame, size=SIGNATURE_SIZE):
+    """
+    Downscaled grayscale thumbnail of a frame
+
+    Area interpolation averages away compression noise, so two decodes of the same
+    picture give nearly identical signatures.
+
+    Args:
+        frame: BGR frame
+        size: (width, height) of the thumbnail
+
+    Returns:
+        float32 array of shape (height, width) with values 0-255
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def signature_distance(a, b):
+    """Mean absolute difference of two signatures (0-255), a measure of global change"""
+    return float(np.abs(a - b).mean())
+
+
+def signature_change(a, b):
+    """Largest absolute difference of any thumbnail cell (0-255), a measure of local change"""
+    return float(np.abs(a - b).max())
+
+
+class StaticFrameFilter:
+    """Decides which frames can reuse the detections of the last detected frame"""
+
+    def __init__(self, threshold=6.0, max_reuse=150):
+        """
+        Args:
+            threshold: Largest change of any thumbnail cell (0-255) still treated as the same picture
+            max_reuse: Run the detector after this many reused frames in a row even if
+                nothing changed, so slow drift can never accumulate unbounded
+        """
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.reference = None
+        self.run_length = 0
+        self.frames = 0
+        self.reused = 0
+
+    def is_static(self, frame):
+        """
+        Check a frame against the last detected frame
+
+        Returns True if its detections can be reused. Otherwise the frame becomes the new
+        reference, so the caller must run the detector on it.
+        """
+        signature = frame_signature(frame, STATIC_SIGNATURE_SIZE)
+        self.frames += 1
+
+        static = (self.reference is not None and self.run_length < self.max_reuse
+                  and signature_change(signature, self.reference) <= self.threshold)
+        if static:
+            self.run_length += 1
+            self.reused += 1
+        else:
+            self.reference = signature
+            self.run_length = 0
+        return static
+
+    def skip_ratio(self):
+        """Fraction of the frames seen so far whose detections were reused"""
+        return self.reused / self.frames if self.frames else 0.0
@@ -6,10 +6,12 @@ Detects and tracks players using YOLO + DeepSORT, outputs video with bounding bo
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from deep_sort_realtime.deepsort_tracker import DeepSort
+from detectionPostprocess import build_class_mask, extract_boxes, select_boxes
+from detectorBackend import load_detector, BACKENDS
+from playerTracking import TRACKER_CONFIG
 
-def test_player_tracking(video_path, model_path="yolo_models/bestPlayerDetectorM.pt", output_path="cache/videos/test_tracking_output.mp4"):
+def test_player_tracking(video_path, model_path="yolo_models/bestPlayerDetectorM.pt", output_path="cache/videos/test_tracking_output.mp4", backend="torch"):
     """
     Test player detection and tracking with video output
     
@@ -17,9 +19,11 @@ def test_player_tracking(video_path, model_path="yolo_models/bestPlayerDetectorM
         video_path: Path to input video file
         model_path: Path to YOLO model weights
         output_path: Path to output video file
+        backend: "torch" (Ultralytics) or "onnx" (exported .onnx model on ONNX Runtime)
     """
     # Load YOLO model
-    model = YOLO(model_path)
+    model = load_detector(model_path, backend)
+    track_mask = build_class_mask(model.names, ["player", "referee"])  # Include both players and refs
 
     # Open video
     cap = cv2.VideoCapture(video_path)
@@ -37,13 +41,7 @@ def test_player_tracking(video_path, model_path="yolo_models/bestPlayerDetectorM
     print(f"Processing every frame with optimizations for speed")
 
     # Initialize DeepSORT tracker with football-optimized parameters
-    tracker = DeepSort(
-        max_age=10,           # Shorter max age for faster track termination
-        n_init=2,             # Fewer frames needed to confirm track
-        max_iou_distance=0.3, # Stricter IoU threshold for football
-        max_cosine_distance=0.1, # Stricter appearance threshold
-        nn_budget=50          # Limit appearance features for speed
-    )
+    tracker = DeepSort(**TRACKER_CONFIG)
 
     # Setup video writer
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -62,53 +60,26 @@ def test_player_tracking(video_path, model_path="yolo_models/bestPlayerDetectorM
 
         # Run YOLO detection with optimizations
         yolo_results = model(frame, verbose=False, conf=0.3)  # Higher confidence threshold
-        detections_xywh = []
-        confs = []
-        detection_classes = []
+        boxes = extract_boxes(yolo_results[0], track_mask)
 
-        for r in yolo_results:
-            for box in r.boxes:
-                cls_id = int(box.cls.cpu().item())
-                conf = float(box.conf.cpu().item())
-                label = model.names[cls_id]
-
-                if label.lower() not in ["player", "referee"]:  # Include both players and refs
-                    continue
-
-                # Skip very small detections (likely false positives)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().tolist()
-                width_box = x2 - x1
-                height_box = y2 - y1
-                
-                if width_box < 20 or height_box < 20:  # Skip tiny detections
-                    continue
-
-                center_x = x1 + width_box / 2
-                center_y = y1 + height_box / 2
-
-                # Prepare for tracker
-                detections_xywh.append([center_x, center_y, width_box, height_box])
-                confs.append(conf)
-                detection_classes.append(label)
+        # Skip very small detections (likely false positives)
+        boxes = select_boxes(boxes, (boxes["width"] >= 20) & (boxes["height"] >= 20))
 
         # Update tracker
         tracked_objects = []
-        if detections_xywh:
+        if len(boxes["conf"]):
             # Limit detections per frame for performance (keep top detections by confidence)
             max_detections = 30  # Limit to top 30 detections per frame
-            if len(detections_xywh) > max_detections:
+            if len(boxes["conf"]) > max_detections:
                 # Sort by confidence and keep only top detections
-                sorted_indices = sorted(range(len(confs)), key=lambda i: confs[i], reverse=True)
-                detections_xywh = [detections_xywh[i] for i in sorted_indices[:max_detections]]
-                confs = [confs[i] for i in sorted_indices[:max_detections]]
-                detection_classes = [detection_classes[i] for i in sorted_indices[:max_detections]]
-            
+                top = np.argsort(-boxes["conf"], kind="stable")[:max_detections]
+                boxes = select_boxes(boxes, top)
+
             # Convert to format expected by deep_sort_realtime
-            detections_list = []
-            for i, (xywh, conf, cls) in enumerate(zip(detections_xywh, confs, detection_classes)):
-                # deep_sort_realtime expects ([left, top, w, h], confidence, class)
-                bbox = [xywh[0] - xywh[2]/2, xywh[1] - xywh[3]/2, xywh[2], xywh[3]]
-                detections_list.append((bbox, conf, cls))
+            # deep_sort_realtime expects ([left, top, w, h], confidence, class)
+            tlwh = np.stack([boxes["xyxy"][:, 0], boxes["xyxy"][:, 1], boxes["width"], boxes["height"]], axis=1)
+            labels = [model.names[cls_id] for cls_id in boxes["cls"].tolist()]
+            detections_list = list(zip(tlwh.tolist(), boxes["conf"].tolist(), labels))
             
             tracks = tracker.update_tracks(detections_list, frame=frame)
             for track in tracks:
@@ -182,10 +153,11 @@ def main():
     parser.add_argument('--video', type=str, required=True, help='Path to input video file')
     parser.add_argument('--output', type=str, default='cache/videos/test_tracking_output.mp4', help='Path to output video file')
     parser.add_argument('--model', type=str, default='yolo_models/bestPlayerDetectorM.pt', help='Path to YOLO model weights')
+    parser.add_argument('--backend', type=str, choices=BACKENDS, default='torch', help='Inference backend (default: torch)')
     args = parser.parse_args()
 
     try:
-        test_player_tracking(args.video, args.model, args.output)
+        test_player_tracking(args.video, args.model, args.output, args.backend)
     except Exception as e:
         print(f"Error: {e}")
         return 1
@@ -1,68 +1,494 @@
-#MAY NOT BE NEEDED
-
 # script to detect yard lines in a video file
 #input: video file
-#output: json file with frame by frame yard line detection data
-#saved as yardLineDetection.json in the cache folder
+#output: json file with frame by frame yard line data
+#saved as yardLineDetection.json in the cache folder (or columnar .npz / streaming .jsonl)
+#
+#the line model (bestLineDetector.pt) is a keypoint model: every detection is a piece
+#of painted line with its keypoints along it. the keypoints of a whole batch are copied
+#off the device as arrays, each detection becomes a segment between its first and last
+#visible keypoint, and segments that lie on the same line (similar angle, each one's
+#midpoint close to the other's line) are clustered and fitted into one line per yard
+#line. lines are written in Hesse normal form, x * cos(theta) + y * sin(theta) = rho,
+#with theta in (-pi/2, pi/2], plus the end points of the visible part of the line. the
+#wrap-around of theta is at horizontal lines, so a near-vertical yard line keeps theta
+#near 0 and rho near its x position from frame to frame instead of flipping to theta
+#near pi and a negative rho.
+#
+#the lines refine the yard marker homography that re-anchors a moving camera
+#(cameraMotion.YardMarkerAnchor): the markers decide which painted line each one is, and
+#the end points add correspondences across the whole view.
+#
+#with --method hough no model is used: lines come from a downscaled, field-masked
+#Hough transform (houghLines.py), the fallback for footage the line model fails on.
 
 #sample json output:
-# Example of the expected JSON output format for yard line detections:
 # {
+#     "video_info": {"path": "...", "fps": 30.0, "total_frames": 900, "width": 1280, "height": 720, "every": 1, "method": "model"},
 #     "frames": [
 #         {
 #             "frame_number": 0,
 #             "timestamp": 0.0,
-#             "detections": [
-#                 {
-#                     "class": "yard_line",
-#                     "class_id": 0,
-#                     "confidence": 0.852,
-#                     "bbox": {
-#                         "x1": 592.7,
-#                         "y1": 381.6,
-#                         "x2": 617.7,
-#                         "y2": 444.4,
-#                         "width": 25.0,
-#                         "height": 62.7,
-#                         "center_x": 605.2,
-#                         "center_y": 413.0
-#                     }
-#                 }
-#             ]
+#             "lines": [[theta, rho, x1, y1, x2, y2], ...],
+#             "confidence": [0.81, ...],
+#             "support": [3, ...]
 #         }
 #     ]
 # }
+#
+#layout of the .npz file:
+#   frame_number   (F,)   int32    frame number of every processed frame
+#   timestamp      (F,)   float64  timestamp of every processed frame in seconds
+#   frame_index    (L,)   int32    row in the frame arrays that each line belongs to (sorted)
+#   lines          (L, 6) float32  theta, rho, x1, y1, x2, y2 of every line
+#   confidence     (L,)   float32  mean confidence of the detections on the line
+#   support        (L,)   int16    number of detections merged into the line
+#   metadata       ()     str      JSON encoded "video_info"
 
 import cv2
 import json
 import os
+import sys
+import numpy as np
+from detectionPipeline import read_sampled_batches
+from detectionPostprocess import to_numpy
+from detectionStore import save_detection_data, load_detection_data, save_columns, load_columns, JsonlDetectionWriter
+from pipelineCache import run_cached, export_output
+
+DEFAULT_MODEL_PATH = "yolo_models/bestLineDetector.pt"
+LINE_CONFIDENCE = 0.25
+# Keypoints below this confidence (or at 0, 0, Ultralytics' marker for invisible) are ignored
+KEYPOINT_CONFIDENCE = 0.5
+# Segments shorter than this (pixels) are too short to give a direction
+MIN_SEGMENT_LENGTH = 8.0
+# Segments on the same yard line differ by at most this angle and distance
+ANGLE_TOLERANCE = np.deg2rad(3.0)
+DISTANCE_TOLERANCE = 12.0
+METHODS = ("model", "hough")
+# Part of the cache key, bumped when the line parameters change meaning
+LINE_FORMAT = 2
+
+
+def extract_keypoints(r, keypoint_conf=KEYPOINT_CONFIDENCE):
+    """
+    Extract the keypoints of one keypoint-model result as arrays
+
+    Args:
+        r: YOLO pose result for one frame
+        keypoint_conf: Minimum keypoint confidence
+
+    Returns:
+        (xy, visible, conf): keypoints (N, K, 2), visibility mask (N, K) and the
+        detection confidences (N,)
+    """
+    keypoints = getattr(r, "keypoints", None)
+    if keypoints is None or r.boxes is None or len(r.boxes) == 0:
+        return np.zeros((0, 0, 2)), np.zeros((0, 0), dtype=bool), np.zeros(0)
+
+    # One device-to-host copy per array for the whole frame
+    xy = to_numpy(keypoints.xy).astype(np.float64)
+    conf = to_numpy(r.boxes.conf).astype(np.float64)
+    visible = (xy != 0).any(axis=-1)
+    if keypoints.conf is not None:
+        visible &= to_numpy(keypoints.conf) >= keypoint_conf
+    return xy, visible, conf
+
+
+def keypoint_segments(xy, visible, min_length=MIN_SEGMENT_LENGTH):
+    """
+    Turn every detection into the segment between its first and last visible keypoint
+
+    Args:
+        xy: Keypoints (N, K, 2)
+        visible: Visibility mask (N, K)
+        min_length: Shorter segments are dropped
+
+    Returns:
+        (segments, keep): segments (M, 4) as x1, y1, x2, y2 and the indices of the
+        detections they came from
+    """
+    if len(xy) == 0:
+        return np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+
+    rows = np.arange(len(xy))
+    first = visible.argmax(axis=1)
+    last = visible.shape[1] - 1 - visible[:, ::-1].argmax(axis=1)
+    segments = np.concatenate([xy[rows, first], xy[rows, last]], axis=1)
+
+    length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    keep = np.flatnonzero((visible.sum(axis=1) >= 2) & (length >= min_length))
+    return segments[keep], keep
+
+
+def hesse_normal(segments):
+    """
+    Line through each segment in Hesse normal form
+
+    Args:
+        segments: Array (N, 4) of x1, y1, x2, y2
+
+    Returns:
+        (theta, rho) arrays of shape (N,), theta in (-pi/2, pi/2]
+    """
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    theta = np.mod(np.arctan2(dy, dx) + np.pi / 2, np.pi)
+    # Near-vertical lines get a normal near theta = 0 whichever way the segment points
+    theta = np.where(theta > np.pi / 2, theta - np.pi, theta)
+    rho = segments[:, 0] * np.cos(theta) + segments[:, 1] * np.sin(theta)
+    return theta, rho
+
+
+def cluster_segments(segments, angle_tolerance=ANGLE_TOLERANCE, distance_tolerance=DISTANCE_TOLERANCE):
+    """
+    Group segments that lie on the same line
+
+    Two segments are linked when their angles differ by at most angle_tolerance and each
+    one's midpoint lies within distance_tolerance of the other's line; clusters are the
+    connected components of these links.
+
+    Args:
+        segments: Array (N, 4) of x1, y1, x2, y2
+        angle_tolerance: Largest angle difference in radians
+        distance_tolerance: Largest midpoint to line distance in pixels
+
+    Returns:
+        int array (N,) with the cluster label of every segment, labels 0..C-1
+    """
+    count = len(segments)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    theta, rho = hesse_normal(segments)
+    mid_x = (segments[:, 0] + segments[:, 2]) / 2
+    mid_y = (segments[:, 1] + segments[:, 3]) / 2
+
+    # angle[i, j] wraps around pi, a line at 179 degrees is next to one at 1 degree
+    angle = np.abs(theta[:, None] - theta[None, :])
+    angle = np.minimum(angle, np.pi - angle)
+    # distance[i, j] is the distance of the midpoint of j from the line of i
+    distance = np.abs(mid_x[None, :] * np.cos(theta)[:, None] + mid_y[None, :] * np.sin(theta)[:, None] - rho[:, None])
+    linked = (angle <= angle_tolerance) & (distance <= distance_tolerance) & (distance.T <= distance_tolerance)
+
+    # Propagate the smallest index through the links until every component agrees
+    labels = np.arange(count)
+    while True:
+        updated = np.where(linked, labels[None, :], count).min(axis=1)
+        updated = np.minimum(updated, labels)
+        if np.array_equal(updated, labels):
+            break
+        labels = updated[updated]
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def fit_lines(segments, weights, labels):
+    """
+    Fit one line through the end points of every cluster
+
+    Args:
+        segments: Array (N, 4) of x1, y1, x2, y2
+        weights: Confidence of every segment (N,)
+        labels: Cluster label of every segment from cluster_segments
+
+    Returns:
+        (lines, confidence, support): lines (C, 6) as theta, rho, x1, y1, x2, y2 sorted
+        left to right by their midpoint, mean confidence (C,) and segment count (C,) of each line
+    """
+    clusters = labels.max() + 1 if len(labels) else 0
+    lines = np.zeros((clusters, 6))
+    confidence = np.zeros(clusters)
+    support = np.bincount(labels, minlength=clusters)
+
+    points = segments.reshape(-1, 2)
+    point_weights = np.repeat(weights, 2)
+    point_labels = np.repeat(labels, 2)
+
+    for cluster in range(clusters):
+        members = point_labels == cluster
+        p, w = points[members], point_weights[members]
+        center = np.average(p, axis=0, weights=w)
+        # Total least squares: the line runs along the main axis of the end points
+        covariance = np.cov((p - center).T, aweights=w) if len(p) > 2 else np.outer(p[1] - p[0], p[1] - p[0])
+        direction = np.linalg.eigh(covariance)[1][:, -1]
+        along = (p - center) @ direction
+        start, end = center + along.min() * direction, center + along.max() * direction
+
+        theta, rho = hesse_normal(np.array([[start[0], start[1], end[0], end[1]]]))
+        lines[cluster] = [theta[0], rho[0], start[0], start[1], end[0], end[1]]
+        confidence[cluster] = w.mean()
+
+    order = np.lexsort((lines[:, 3] + lines[:, 5], lines[:, 2] + lines[:, 4]))
+    return lines[order], confidence[order], support[order]
+
 
-def yardLineDetection(video_path):
+def detect_frame_lines(r, keypoint_conf=KEYPOINT_CONFIDENCE, angle_tolerance=ANGLE_TOLERANCE,
+                       distance_tolerance=DISTANCE_TOLERANCE):
+    """
+    Yard lines of one frame from the line model result
+
+    Returns:
+        (lines, confidence, support) as returned by fit_lines
+    """
+    xy, visible, conf = extract_keypoints(r, keypoint_conf)
+    segments, keep = keypoint_segments(xy, visible)
+    labels = cluster_segments(segments, angle_tolerance, distance_tolerance)
+    return fit_lines(segments, conf[keep], labels)
+
+
+def line_record(frame_number, fps, lines, confidence, support):
+    """Compact frame record of the JSON schema at the top of this file"""
+    return {
+        "frame_number": frame_number,
+        "timestamp": frame_number / fps if fps else 0.0,
+        "lines": np.round(lines, 4).tolist(),
+        "confidence": np.round(confidence, 4).tolist(),
+        "support": support.tolist()
+    }
+
+
+def lines_to_columns(data):
+    """Convert yard line data in the JSON schema into columnar arrays"""
+    frames = data.get("frames", [])
+    counts = [len(frame["lines"]) for frame in frames]
+    lines = [line for frame in frames for line in frame["lines"]]
+
+    metadata = {key: value for key, value in data.items() if key != "frames"}
+    return {
+        "frame_number": np.array([frame["frame_number"] for frame in frames], dtype=np.int32),
+        "timestamp": np.array([frame.get("timestamp", 0.0) for frame in frames], dtype=np.float64),
+        "frame_index": np.repeat(np.arange(len(frames)), counts).astype(np.int32),
+        "lines": np.array(lines, dtype=np.float32).reshape(-1, 6),
+        "confidence": np.array([c for frame in frames for c in frame["confidence"]], dtype=np.float32),
+        "support": np.array([s for frame in frames for s in frame["support"]], dtype=np.int16),
+        "metadata": np.array(json.dumps(metadata))
+    }
+
+
+def iter_frame_lines(columns):
+    """
+    Iterate over the lines of every frame of columnar yard line data
+
+    Yields:
+        (frame_number, lines) with lines a (L, 6) float32 array of theta, rho, x1, y1, x2, y2
+    """
+    offsets = np.searchsorted(columns["frame_index"], np.arange(len(columns["frame_number"]) + 1))
+    for row, frame_number in enumerate(columns["frame_number"].tolist()):
+        yield frame_number, columns["lines"][offsets[row]:offsets[row + 1]]
+
+
+def save_line_data(data, output_path):
+    """Save yard line data as .npz (columnar), .jsonl or .json depending on the extension"""
+    if output_path.endswith(".npz"):
+        save_columns(lines_to_columns(data), output_path)
+    else:
+        save_detection_data(data, output_path)
+
+
+def load_line_data(input_path):
+    """
+    Load yard line data from any supported format
+
+    Returns:
+        Dictionary with "video_info" and "frames" in the JSON schema
+    """
+    if not input_path.endswith(".npz"):
+        return load_detection_data(input_path)
+
+    columns = load_columns(input_path)
+    data = json.loads(str(columns["metadata"]))
+    offsets = np.searchsorted(columns["frame_index"], np.arange(len(columns["frame_number"]) + 1))
+    data["frames"] = [
+        {
+            "frame_number": number,
+            "timestamp": timestamp,
+            "lines": columns["lines"][offsets[row]:offsets[row + 1]].astype(np.float64).tolist(),
+            "confidence": columns["confidence"][offsets[row]:offsets[row + 1]].astype(np.float64).tolist(),
+            "support": columns["support"][offsets[row]:offsets[row + 1]].tolist()
+        }
+        for row, (number, timestamp) in enumerate(zip(columns["frame_number"].tolist(), columns["timestamp"].tolist()))
+    ]
+    return data
+
+
+def yardLineDetection(video_path, model_path=DEFAULT_MODEL_PATH,
+                      output_path="cache/yardLineDetection/yardLineDetection.json",
+                      every=1, batch_size=16, conf=LINE_CONFIDENCE, keypoint_conf=KEYPOINT_CONFIDENCE,
+                      model=None, method="model", hough_options=None):
     """
     Detect yard lines in video frames
-    
+
     Args:
         video_path: Path to input video file
-    
+        model_path: Path to the line keypoint model weights
+        output_path: Path to output .json, columnar .npz or streaming .jsonl file
+        every: Process one frame in this many (1 processes every frame)
+        batch_size: Number of frames grouped into one inference call
+        conf: Minimum detection confidence
+        keypoint_conf: Minimum keypoint confidence
+        model: Already loaded YOLO model to reuse across calls
+        method: "model" (line keypoint model) or "hough" (Hough transform fallback, no model)
+        hough_options: Extra HoughLineDetector arguments for the hough method
+
     Returns:
-        Dictionary with detection results
+        Dictionary with line results. When streaming to .jsonl the frames are written as
+        they are produced and are not kept in the returned dictionary.
     """
-    # TODO: Implement yard line detection logic
-    pass
+    if every < 1 or batch_size < 1:
+        raise ValueError(f"every and batch_size must be at least 1, got {every} and {batch_size}")
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown yard line method: {method} (expected one of {', '.join(METHODS)})")
+
+    hough = None
+    if method == "hough":
+        from houghLines import HoughLineDetector
+        hough = HoughLineDetector(**(hough_options or {}))
+    elif model is None:
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+
+    def detect_batch(frames):
+        if hough is not None:
+            return [hough(frame) for frame in frames]
+        return [detect_frame_lines(r, keypoint_conf) for r in model(frames, verbose=False, conf=conf)]
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    print(f"Detecting yard lines: {video_path}")
+    print(f"FPS: {fps}, Total frames: {total_frames}, every {every} frame(s), Batch size: {batch_size}, "
+          f"method: {method}")
+
+    results = {
+        "video_info": {
+            "path": video_path,
+            "fps": fps,
+            "total_frames": total_frames,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "every": every,
+            "method": method
+        },
+        "frames": []
+    }
+
+    # .npz is columnar and written at the end, .jsonl is streamed frame by frame
+    writer = None
+    if output_path.endswith(".jsonl"):
+        writer = JsonlDetectionWriter(output_path, {"video_info": results["video_info"]})
+
+    counts = {"frames": 0, "lines": 0}
+    try:
+        for frame_numbers, frames in read_sampled_batches(cap, video_path, every, batch_size):
+            for frame_number, frame_lines in zip(frame_numbers, detect_batch(frames)):
+                record = line_record(frame_number, fps, *frame_lines)
+                counts["frames"] += 1
+                counts["lines"] += len(record["lines"])
+                if counts["frames"] % 50 == 0:
+                    print(f"Processed frame {frame_number}/{total_frames}")
+
+                if writer is not None:
+                    writer.write_frame(record)
+                else:
+                    results["frames"].append(record)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        save_line_data(results, output_path)
+
+    print(f"Yard line detection complete. Results saved to: {output_path}")
+    print(f"Found {counts['lines']} yard lines across {counts['frames']} frames")
+    if hough is not None:
+        print(f"Reused the lines of the previous frame on {hough.reuse_ratio():.1%} of the frames")
+    return results
+
+
+def cachedYardLineDetection(video_path, model_path=DEFAULT_MODEL_PATH, every=1, output_ext=".npz",
+                            use_cache=True, **options):
+    """
+    Run the yard line stage through the pipeline cache
+
+    Args:
+        video_path: Path to input video file
+        model_path: Path to the line keypoint model weights
+        every: Process one frame in this many
+        output_ext: Output format, ".npz", ".jsonl" or ".json"
+        use_cache: Reuse a cached output when possible
+        **options: conf, keypoint_conf, batch_size, model, method, hough_options (see yardLineDetection)
+
+    Returns:
+        (path, hit) of the cached output file
+    """
+    method = options.get("method", "model")
+    params = {"every": every, "method": method, "format": output_ext, "line_format": LINE_FORMAT}
+    if method == "hough":
+        # The weights are not used, so a missing or changed model file must not matter
+        params["hough"] = options.get("hough_options") or {}
+        inputs = {"video": video_path}
+    else:
+        params["conf"] = options.get("conf", LINE_CONFIDENCE)
+        params["keypoint_conf"] = options.get("keypoint_conf", KEYPOINT_CONFIDENCE)
+        inputs = {"video": video_path, "model": model_path}
+
+    return run_cached(
+        "yardLineDetection",
+        inputs,
+        params,
+        output_ext,
+        lambda out: yardLineDetection(video_path, model_path, out, every=every, **options),
+        use_cache=use_cache
+    )
+
 
 def main():
     """Main function for standalone execution"""
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Yard Line Detection Module')
     parser.add_argument('--video', type=str, required=True, help='Path to input video file')
-    parser.add_argument('--output', type=str, default='cache/yardLineDetection.json', 
-                       help='Path to output JSON file')
-    
+    parser.add_argument('--output', type=str, default='cache/yardLineDetection/yardLineDetection.json',
+                       help='Path to output file (.json, streaming .jsonl or columnar .npz)')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL_PATH,
+                       help='Path to the line keypoint model weights')
+    parser.add_argument('--every', type=int, default=1,
+                       help='Process one frame in this many (default: 1)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                       help='Number of frames per inference call (default: 16)')
+    parser.add_argument('--conf', type=float, default=LINE_CONFIDENCE,
+                       help=f'Minimum detection confidence (default: {LINE_CONFIDENCE})')
+    parser.add_argument('--keypoint-conf', type=float, default=KEYPOINT_CONFIDENCE,
+                       help=f'Minimum keypoint confidence (default: {KEYPOINT_CONFIDENCE})')
+    parser.add_argument('--method', type=str, choices=METHODS, default='model',
+                       help='Line keypoint model, or the Hough transform fallback for footage the model fails on (default: model)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Rerun the detector even if a cached output exists')
+
     args = parser.parse_args()
-    
-    # TODO: Call yardLineDetection function and save results
-    pass
+
+    if not os.path.exists(args.video):
+        print(f"Error: Video file not found: {args.video}")
+        return 1
+
+    try:
+        cached, hit = cachedYardLineDetection(args.video, args.model, args.every,
+                                              os.path.splitext(args.output)[1] or ".json",
+                                              use_cache=not args.no_cache, batch_size=args.batch_size,
+                                              conf=args.conf, keypoint_conf=args.keypoint_conf,
+                                              method=args.method)
+        export_output(cached, args.output)
+        print(f"Yard lines {'loaded from cache' if hit else 'detected'}: {args.output}")
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    return 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
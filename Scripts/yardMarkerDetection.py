@@ -1,21 +1,28 @@
-#MAY NOT BE NEEDED
-
 # script to detect yard markers in a video file
 #input: video file
 #output: json file with frame by frame yard marker detection data,
 #saved as yardMarkerDetection.json in the cache folder
+#(or columnar .npz / streaming .jsonl, see detectionStore.py)
+#
+#every frame, or one frame in --every, is decoded and the frames are sent to the
+#detector in batches. a thumbnail signature of each processed frame is compared to
+#the previous one and a large change starts a new camera segment, so consumers
+#(correspondence generation, homography re-anchoring) can pool markers per segment
+#straight from the cached output without running the model again.
 
 #sample json output:
 # Example of the expected JSON output format for yard marker detections:
 # {
+#     "video_info": {"path": "...", "fps": 30.0, "total_frames": 900, "every": 1},
 #     "frames": [
 #         {
 #             "frame_number": 0,
 #             "timestamp": 0.0,
+#             "segment": 0,
 #             "detections": [
 #                 {
-#                     "class": "yard_marker",
-#                     "class_id": 0,
+#                     "class": "nl2",
+#                     "class_id": 7,
 #                     "confidence": 0.852,
 #                     "bbox": {
 #                         "x1": 592.7,
@@ -34,35 +41,194 @@
 # }
 
 import cv2
-import json
 import os
+import sys
+from autoCorrespondancePoints import EXPECTED_MODEL_PATH, MARKER_CONFIDENCE, check_model_path
+from detectionPipeline import read_sampled_batches
+from detectionPostprocess import extract_boxes, boxes_to_detections
+from detectionStore import save_detection_data, JsonlDetectionWriter
+from detectorBackend import load_detector, BACKENDS
+from pipelineCache import run_cached, export_output
+from staticFrames import frame_signature, signature_distance
+
+# Mean thumbnail change (0-255) between processed frames treated as a camera cut
+CUT_THRESHOLD = 20.0
+
 
-def yardMarkerDetection(video_path):
+def yardMarkerDetection(video_path, model_path,
+                        output_path="cache/yardMarkerDetection/yardMarkerDetection.json",
+                        every=1, batch_size=16, conf=MARKER_CONFIDENCE, cut_threshold=CUT_THRESHOLD,
+                        model=None, backend="torch"):
     """
     Detect yard markers in video frames using a trained yolo model
-    
+
     Args:
         video_path: Path to input video file
-    
+        model_path: Path to yard marker model weights (.pt, or .onnx for the onnx backend)
+        output_path: Path to output .json, columnar .npz or streaming .jsonl file
+        every: Run the detector on one frame in this many (1 processes every frame)
+        batch_size: Number of frames grouped into one inference call
+        conf: Minimum detection confidence
+        cut_threshold: Mean thumbnail change (0-255) between processed frames that starts a new segment
+        model: Already loaded model to reuse across calls
+        backend: "torch" (Ultralytics) or "onnx" (ONNX Runtime on the CPU)
+
     Returns:
-        Dictionary with detection results
+        Dictionary with detection results. When streaming to .jsonl the frames are
+        written as they are produced and are not kept in the returned dictionary.
     """
-    # TODO: Implement yard marker detection logic
-    pass
+    if every < 1 or batch_size < 1:
+        raise ValueError(f"every and batch_size must be at least 1, got {every} and {batch_size}")
+
+    if model is None:
+        check_model_path(model_path)
+        model = load_detector(model_path, backend)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    print(f"Detecting yard markers: {video_path}")
+    print(f"FPS: {fps}, Total frames: {total_frames}, every {every} frame(s), Batch size: {batch_size}")
+
+    results = {
+        "video_info": {
+            "path": video_path,
+            "fps": fps,
+            "total_frames": total_frames,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "every": every
+        },
+        "frames": []
+    }
+
+    writer = None
+    if output_path.endswith(".jsonl"):
+        writer = JsonlDetectionWriter(output_path, {"video_info": results["video_info"]})
+
+    segment = 0
+    previous = None
+    counts = {"frames": 0, "detections": 0}
+
+    try:
+        for frame_numbers, frames in read_sampled_batches(cap, video_path, every, batch_size):
+            for frame_number, frame, r in zip(frame_numbers, frames, model(frames, verbose=False, conf=conf)):
+                signature = frame_signature(frame)
+                if previous is not None and signature_distance(signature, previous) > cut_threshold:
+                    segment += 1
+                previous = signature
+
+                record = {
+                    "frame_number": frame_number,
+                    "timestamp": frame_number / fps if fps else 0.0,
+                    "segment": segment,
+                    "detections": boxes_to_detections(extract_boxes(r), model.names)
+                }
+                counts["frames"] += 1
+                counts["detections"] += len(record["detections"])
+                if counts["frames"] % 50 == 0:
+                    print(f"Processed frame {frame_number}/{total_frames}")
+
+                if writer is not None:
+                    writer.write_frame(record)
+                else:
+                    results["frames"].append(record)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        save_detection_data(results, output_path)
+
+    print(f"Yard marker detection complete. Results saved to: {output_path}")
+    print(f"Detected {counts['detections']} yard markers across {counts['frames']} frames "
+          f"in {segment + 1} camera segment(s)")
+    return results
+
+
+def cachedYardMarkerDetection(video_path, model_path, every=1, output_ext=".npz",
+                              use_cache=True, **options):
+    """
+    Run the yard marker stage through the pipeline cache
+
+    The entry is keyed on the video, the model weights and the parameters that change
+    the output, so every consumer of the same clip shares one run of the model.
+
+    Args:
+        video_path: Path to input video file
+        model_path: Path to yard marker model weights
+        every: Run the detector on one frame in this many
+        output_ext: Output format, ".npz", ".jsonl" or ".json"
+        use_cache: Reuse a cached output when possible
+        **options: conf, cut_threshold, batch_size, model, backend (see yardMarkerDetection)
+
+    Returns:
+        (path, hit) of the cached output file
+    """
+    check_model_path(model_path)
+    params = {
+        "every": every,
+        "conf": options.get("conf", MARKER_CONFIDENCE),
+        "cut_threshold": options.get("cut_threshold", CUT_THRESHOLD),
+        "format": output_ext
+    }
+    return run_cached(
+        "yardMarkerDetection",
+        {"video": video_path, "model": model_path},
+        params,
+        output_ext,
+        lambda out: yardMarkerDetection(video_path, model_path, out, every=every, **options),
+        use_cache=use_cache
+    )
+
 
 def main():
     """Main function for standalone execution"""
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Yard Marker Detection Module')
     parser.add_argument('--video', type=str, required=True, help='Path to input video file')
-    parser.add_argument('--output', type=str, default='cache/yardMarkerDetection.json', 
-                       help='Path to output JSON file')
-    
+    parser.add_argument('--output', type=str, default='cache/yardMarkerDetection/yardMarkerDetection.json',
+                       help='Path to output file (.json, streaming .jsonl or columnar .npz)')
+    parser.add_argument('--model', type=str, required=True,
+                       help=f'Path to yard marker model weights (e.g. {EXPECTED_MODEL_PATH})')
+    parser.add_argument('--every', type=int, default=1,
+                       help='Run the detector on one frame in this many (default: 1)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                       help='Number of frames per inference call (default: 16)')
+    parser.add_argument('--conf', type=float, default=MARKER_CONFIDENCE,
+                       help=f'Minimum detection confidence (default: {MARKER_CONFIDENCE})')
+    parser.add_argument('--cut-threshold', type=float, default=CUT_THRESHOLD,
+                       help=f'Thumbnail change treated as a camera cut (default: {CUT_THRESHOLD})')
+    parser.add_argument('--backend', type=str, choices=BACKENDS, default='torch',
+                       help='Inference backend (default: torch)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Rerun the detector even if a cached output exists')
+
     args = parser.parse_args()
-    
-    # TODO: Call yardMarkerDetection function and save results
-    pass
+
+    if not os.path.exists(args.video):
+        print(f"Error: Video file not found: {args.video}")
+        return 1
+
+    try:
+        cached, hit = cachedYardMarkerDetection(args.video, args.model, args.every,
+                                                os.path.splitext(args.output)[1] or ".json",
+                                                use_cache=not args.no_cache, batch_size=args.batch_size,
+                                                conf=args.conf, cut_threshold=args.cut_threshold,
+                                                backend=args.backend)
+        export_output(cached, args.output)
+        print(f"Yard markers {'loaded from cache' if hit else 'detected'}: {args.output}")
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    return 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+
+# The pipeline scripts import each other as top level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scripts"))
+
+from detectorBackend import ArrayBoxes, ArrayResult
+
+# Gray level step between consecutive frames of the synthetic clips
+FRAME_STEP = 4
+
+
+def frame_number_of(frame):
+    """Frame number a synthetic clip encoded in the gray level of a frame"""
+    return int(round(float(frame.mean()) / FRAME_STEP))
+
+
+@pytest.fixture
+def make_clip(tmp_path):
+    """Writes a small MJPG clip whose frame n is filled with gray level FRAME_STEP * n"""
+    def make(name="clip.avi", frames=30, size=(64, 48), fps=30.0):
+        path = str(tmp_path / name)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+        for number in range(frames):
+            writer.write(np.full((size[1], size[0], 3), FRAME_STEP * number, dtype=np.uint8))
+        writer.release()
+        return path
+    return make
+
+
+class FakeDetector:
+    """
+    Stands in for a YOLO model: frame n of a synthetic clip gets one player box at x = n,
+    or the boxes returned by boxes_for(n) as (x1, y1, x2, y2, conf, cls) rows
+    """
+
+    names = {0: "player", 1: "referee"}
+
+    def __init__(self, boxes_for=None, fail_at=None):
+        self.boxes_for = boxes_for or (lambda n: [(n, 10, n + 20, 40, 0.9, 0)])
+        self.fail_at = fail_at
+        self.frames = []
+
+    def __call__(self, frames, verbose=False):
+        results = []
+        for frame in frames:
+            number = frame_number_of(frame)
+            if number == self.fail_at:
+                raise RuntimeError(f"detector failed on frame {number}")
+            self.frames.append(number)
+            rows = np.array(self.boxes_for(number), dtype=np.float64).reshape(-1, 6)
+            results.append(ArrayResult(ArrayBoxes(rows[:, :4], rows[:, 4], rows[:, 5]), self.names))
+        return results
+
+
+@pytest.fixture
+def fake_detector():
+    return FakeDetector
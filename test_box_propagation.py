@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for keyframe detection with optical flow propagation in between
+"""
+
+import cv2
+import numpy as np
+import pytest
+from boxPropagation import keyframe_detect, SOURCE_DETECTED, SOURCE_PROPAGATED
+from detectionPostprocess import boxes_from_arrays
+from detectionStore import load_detection_data
+from playerDetection import playerDetection
+
+BOX = [100.0, 60.0, 160.0, 140.0]
+
+
+def textured_frames(count, step=2):
+    """Frames of a smooth random texture panning right by step pixels per frame"""
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 255, (240, 400)).astype(np.uint8), (7, 7), 2)
+    for number in range(count):
+        yield number, cv2.cvtColor(np.roll(texture, step * number, axis=1), cv2.COLOR_GRAY2BGR)
+
+
+class LosingPropagator:
+    """Loses the given fraction of its points on each propagated frame"""
+
+    def __init__(self, lost):
+        self.lost = iter(lost)
+        self.motion = 0.0
+        self.lost_fraction = 0.0
+
+    def reset(self, frame, boxes):
+        self.boxes = boxes
+
+    def propagate(self, frame):
+        self.lost_fraction = next(self.lost)
+        return self.boxes
+
+
+class CountingDetector:
+    """Returns the box shifted with the texture, so detections and propagation agree"""
+
+    def __init__(self, step=2):
+        self.step = step
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        shift = self.step * (self.calls - 1)
+        return boxes_from_arrays(np.array([BOX]) + [shift, 0, shift, 0], np.array([0.9]), np.array([0]))
+
+
+def test_sources_follow_the_keyframe_interval():
+    detect = CountingDetector(step=0)
+    results = list(keyframe_detect(textured_frames(10, step=0), detect, keyframe_interval=4))
+
+    assert [source for _, _, source in results] == [SOURCE_DETECTED] + [SOURCE_PROPAGATED] * 3 + \
+        [SOURCE_DETECTED] + [SOURCE_PROPAGATED] * 3 + [SOURCE_DETECTED, SOURCE_PROPAGATED]
+    assert detect.calls == 3
+    assert [number for number, _, _ in results] == list(range(10))
+
+
+def test_propagated_boxes_follow_the_motion():
+    results = list(keyframe_detect(textured_frames(4), lambda frame: boxes_from_arrays(
+        np.array([BOX]), np.array([0.9]), np.array([0])), keyframe_interval=10))
+
+    for number, boxes, source in results[1:]:
+        assert source == SOURCE_PROPAGATED
+        np.testing.assert_allclose(boxes["xyxy"][0], np.array(BOX) + [2 * number, 0, 2 * number, 0], atol=0.5)
+
+
+def test_motion_and_drift_force_keyframes():
+    moving = [source for _, _, source in keyframe_detect(textured_frames(8, step=4), CountingDetector(step=4),
+                                                         keyframe_interval=100, motion_threshold=10)]
+    # The box moved 12 px by the third propagated frame
+    assert moving[:5] == [SOURCE_DETECTED, SOURCE_PROPAGATED, SOURCE_PROPAGATED, SOURCE_DETECTED, SOURCE_PROPAGATED]
+
+    detect = CountingDetector()
+    lost = [source for _, _, source in keyframe_detect(textured_frames(6), detect, keyframe_interval=100,
+                                                       drift_threshold=0.5,
+                                                       propagator=LosingPropagator([0.1, 0.4, 0.8, 0.0, 0.6]))]
+    assert lost == [SOURCE_DETECTED, SOURCE_PROPAGATED, SOURCE_PROPAGATED, SOURCE_DETECTED, SOURCE_PROPAGATED,
+                    SOURCE_DETECTED]
+    assert detect.calls == 3
+
+
+def test_player_detection_tags_every_frame(tmp_path, make_clip, fake_detector):
+    detector = fake_detector()
+    output = str(tmp_path / "detections.json")
+    playerDetection(make_clip(frames=20), "model.pt", output, keyframe_interval=5, model=detector)
+
+    frames = load_detection_data(output)["frames"]
+    detected = [f["frame_number"] for f in frames if f["source"] == SOURCE_DETECTED]
+    assert detected == detector.frames
+    assert detected[:1] == [0] and len(detected) >= 4
+    assert {f["source"] for f in frames} <= {SOURCE_DETECTED, SOURCE_PROPAGATED}
+    assert all(len(f["detections"]) == 1 for f in frames)
+
+    with pytest.raises(ValueError):
+        playerDetection(make_clip(), "model.pt", output, keyframe_interval=5, batch_size=4, model=detector)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for re-anchoring the moving camera homography on yard markers
+"""
+
+import cv2
+import numpy as np
+from cameraMotion import CameraMotionTracker, YardMarkerAnchor, line_correspondences
+
+# Field positions (feet) of the markers as autoCorrespondancePoints places them
+MARKERS = {"nl2": (90, 40), "nr2": (90, 120), "nl3": (120, 40), "nr3": (120, 120), "nl4": (150, 40)}
+
+
+def pixel_to_field(pan=0.0):
+    field = np.float32([[90, 40], [150, 40], [150, 120], [90, 120]])
+    pixels = np.float32([[300 + pan, 600], [1500 + pan, 600], [1300 + pan, 250], [500 + pan, 250]])
+    return cv2.getPerspectiveTransform(pixels, field)
+
+
+def marker_frame(frame_number, segment, H, labels=MARKERS, jitter=0.0):
+    field = np.float32([MARKERS[label] for label in labels]).reshape(-1, 1, 2)
+    pixels = cv2.perspectiveTransform(field, np.linalg.inv(H)).reshape(-1, 2) + jitter
+    detections = [{"class": label, "confidence": 0.9, "bbox": {"center_x": float(x), "center_y": float(y)}}
+                  for label, (x, y) in zip(labels, pixels)]
+    return {"frame_number": frame_number, "segment": segment, "detections": detections}
+
+
+def marker_data(frames, every=5):
+    return {"video_info": {"width": 1920, "height": 1080, "every": every}, "frames": frames}
+
+
+def assert_same_homography(H, expected):
+    points = np.float32([[400, 300], [1400, 300], [900, 550]]).reshape(-1, 1, 2)
+    np.testing.assert_allclose(cv2.perspectiveTransform(points, H), cv2.perspectiveTransform(points, expected),
+                               atol=0.05)
+
+
+def test_anchor_pools_nearby_samples_of_the_same_segment():
+    H = pixel_to_field()
+    frames = [marker_frame(0, 0, H, jitter=0.5), marker_frame(5, 0, H), marker_frame(10, 0, H),
+              # After a cut the markers show another view
+              marker_frame(15, 1, pixel_to_field(pan=400)), marker_frame(20, 1, pixel_to_field(pan=400))]
+    anchor = YardMarkerAnchor(marker_data(frames))
+
+    assert_same_homography(anchor(None, 5), H)
+    # Frame 12 is nearest to frame 10, the samples after the cut are left out
+    assert_same_homography(anchor(None, 12), H)
+    assert_same_homography(anchor(None, 18), pixel_to_field(pan=400))
+    # No sample close enough
+    assert anchor(None, 40) is None
+
+
+def test_anchor_needs_two_yard_lines():
+    H = pixel_to_field()
+    anchor = YardMarkerAnchor(marker_data([marker_frame(0, 0, H, labels=["nl2", "nr2", "nl3"]),
+                                           marker_frame(5, 0, H, labels=["nl2", "nr2"])], every=5))
+    assert anchor(None, 0) is None
+    assert len(anchor.correspondences(0)) == 3
+    assert anchor(None, 5) is None
+
+
+def test_tracker_re_anchors_with_the_frame_number():
+    calls = []
+    H = pixel_to_field()
+
+    def anchor(frame, frame_number):
+        calls.append(frame_number)
+        return H if frame_number >= 100 else None
+
+    # A blank frame has nothing to track, so every frame is registered again
+    blank = np.zeros((360, 640, 3), dtype=np.uint8)
+    tracker = CameraMotionTracker(np.eye(3), blank, anchor=anchor, anchor_retry=0)
+
+    np.testing.assert_allclose(tracker.update(blank, 99), np.eye(3))  # anchor and ORB fail
+    assert_same_homography(tracker.update(blank, 100), H)
+    assert calls == [99, 100]
+    assert tracker.anchors == 1 and tracker.failed_anchors == 1
+
+
+def field_line(H, x, y1=20, y2=140):
+    """Yard line at field x as detected in the image, theta and rho are not used by the anchor"""
+    ends = cv2.perspectiveTransform(np.float32([[x, y1], [x, y2]]).reshape(-1, 1, 2), np.linalg.inv(H)).ravel()
+    return [0.0, 0.0, *ends.tolist()]
+
+
+def test_line_correspondences_snap_to_painted_lines():
+    H = pixel_to_field()
+    lines = [field_line(H, 106), field_line(H, 112), field_line(H, 135, 30, 130)]
+
+    pixels, field = line_correspondences(H, lines)
+
+    # The line at 112 ft is between two painted lines and is dropped
+    np.testing.assert_allclose(field, [[105, 20], [105, 140], [135, 30], [135, 130]], atol=1e-3)
+    np.testing.assert_allclose(pixels, np.reshape([lines[0][2:], lines[2][2:]], (-1, 2)), atol=1e-4)
+    assert line_correspondences(H, np.zeros((0, 6)))[0].shape == (0, 2)
+
+
+def test_anchor_refines_markers_with_lines():
+    H = pixel_to_field()
+    # Marker boxes are centered a few pixels off
+    frames = [marker_frame(0, 0, H, jitter=np.array([[6, 0], [-6, 0], [5, 3], [0, -4], [-3, 2]]))]
+    lines = {"frames": [{"frame_number": 1, "lines": [field_line(H, x) for x in range(45, 196, 15)]}]}
+
+    markers_only = YardMarkerAnchor(marker_data(frames))(None, 0)
+    refined_anchor = YardMarkerAnchor(marker_data(frames), lines)
+    refined = refined_anchor(None, 0)
+
+    points = np.float32([[200, 620], [1700, 620], [950, 400]]).reshape(-1, 1, 2)
+    truth = cv2.perspectiveTransform(points, H)
+
+    def error(estimate):
+        return np.abs(cv2.perspectiveTransform(points, estimate) - truth)[..., 0].max()
+
+    assert refined_anchor.refined == 1
+    assert error(refined) < error(markers_only) / 2
+    # Lines of a frame too far away are not used
+    assert len(refined_anchor.frame_lines(20)) == 0
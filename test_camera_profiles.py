@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the camera profile registry and the stages that take their homography from it
+"""
+
+import json
+import cv2
+import numpy as np
+import pytest
+from cameraProfiles import (register_profile, assign_clip, load_profile, profile_for_clip, profile_homography,
+                            profile_inverse, is_stale)
+from fieldMask import homography_field_mask
+from homographyTransform import _profile_homography
+from playerDetection import _field_roi_homography
+
+PIXELS = [[200, 900], [1700, 900], [1300, 300], [600, 300], [950, 600]]
+
+
+def write_correspondences(path, scale=1.0):
+    src = np.float32(PIXELS[:4])
+    dst = np.float32([[0, 0], [300, 0], [300, 160], [0, 160]]) * scale
+    H = cv2.getPerspectiveTransform(src, dst)
+    field = cv2.perspectiveTransform(np.float32(PIXELS).reshape(-1, 1, 2), H).reshape(-1, 2)
+    points = [{"image_point": {"x": p[0], "y": p[1]}, "field_point": {"x": float(f[0]), "y": float(f[1])}}
+              for p, f in zip(PIXELS, field)]
+    with open(path, "w") as f:
+        json.dump({"correspondences": points}, f)
+    return H
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # file_digest keeps its digest cache under cache/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "registry.json")
+    H = write_correspondences("wide.json")
+    register_profile("stadium", "wide", "wide.json", registry_path=path)
+    write_correspondences("endzone.json", scale=0.5)
+    register_profile("stadium", "endzone", "endzone.json", registry_path=path)
+    return path, H
+
+
+def test_register_stores_homography_and_inverse(registry):
+    path, H = registry
+    profile = load_profile("stadium/wide", path)
+
+    np.testing.assert_allclose(profile_homography(profile), H / H[2, 2], rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(profile_inverse(profile) @ profile_homography(profile), np.eye(3), atol=1e-8)
+    assert profile["points"] == 5 and profile["max_reprojection_error"] < 0.01
+
+    # Profiles calibrated before H_inv was stored are inverted on load
+    legacy = {k: v for k, v in profile.items() if k != "H_inv"}
+    np.testing.assert_allclose(profile_inverse(legacy), profile_inverse(profile))
+
+    with pytest.raises(KeyError):
+        load_profile("stadium/skycam", path)
+
+
+def test_profile_for_clip_prefers_exact_path_then_longest_pattern(registry):
+    path, _ = registry
+    assign_clip("*.mp4", "stadium/endzone", path)
+    assign_clip("Wide - *.mp4", "stadium/wide", path)
+    assign_clip("games/Wide - special.mp4", "stadium/endzone", path)
+
+    assert profile_for_clip("games/Wide - 1st quarter.mp4", path)["key"] == "stadium/wide"
+    assert profile_for_clip("games/Endzone - 1st quarter.mp4", path)["key"] == "stadium/endzone"
+    assert profile_for_clip("games/./Wide - special.mp4", path)["key"] == "stadium/endzone"
+    assert profile_for_clip("games/Wide - 1st quarter.avi", path) is None
+    with pytest.raises(KeyError):
+        assign_clip("other.mp4", "stadium/skycam", path)
+
+
+def test_is_stale(registry, tmp_path):
+    path, _ = registry
+    profile = load_profile("stadium/wide", path)
+    assert not is_stale(profile)
+
+    write_correspondences("wide.json", scale=2.0)
+    assert is_stale(profile)
+
+    # Without the correspondence file the stored matrix is the only calibration left
+    (tmp_path / "wide.json").unlink()
+    assert not is_stale(profile)
+
+
+def test_stages_take_the_homography_of_the_clip_profile(registry, tmp_path):
+    path, H = registry
+    assign_clip("Wide - *.mp4", "stadium/wide", path)
+    profile = load_profile("stadium/wide", path)
+
+    detections = tmp_path / "detections.json"
+    detections.write_text(json.dumps({"video_info": {"path": "games/Wide - 1.mp4"}, "frames": []}))
+    profile_H, correspondence = _profile_homography(str(detections), registry_path=path)
+    assert correspondence is None
+    np.testing.assert_allclose(profile_H, profile_homography(profile))
+
+    # Named profile, and a stale one falls back to its correspondence file
+    write_correspondences("endzone.json", scale=0.25)
+    assert _profile_homography(str(detections), key="stadium/endzone", registry_path=path) == (None, "endzone.json")
+    with pytest.raises(ValueError):
+        _profile_homography(str(detections), video_path="games/Sideline.mp4", registry_path=path)
+
+
+def test_field_roi_homography_from_profile(registry, monkeypatch):
+    path, _ = registry
+    assign_clip("Wide - *.mp4", "stadium/wide", path)
+    monkeypatch.setattr("playerDetection.profile_for_clip", lambda clip: profile_for_clip(clip, path))
+    profile = load_profile("stadium/wide", path)
+
+    H, H_inv, params = _field_roi_homography("games/Wide - 1.mp4")
+    assert params == {"H": profile["H"]}
+    mask = homography_field_mask(H, (1080, 1920), H_inv=H_inv)
+    np.testing.assert_array_equal(mask, homography_field_mask(H, (1080, 1920)))
+
+    # An explicit correspondence file wins and keys the run on its content
+    _, H_inv, params = _field_roi_homography("games/Wide - 1.mp4", "endzone.json")
+    assert H_inv is None and set(params) == {"correspondence_sha256"}
+    with pytest.raises(ValueError):
+        _field_roi_homography("games/Sideline.mp4")
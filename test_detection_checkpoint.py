@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpointed, resumable .jsonl detection runs
+"""
+
+import json
+import pytest
+from detectionCheckpoint import recover_jsonl, load_checkpoint
+from detectionStore import save_detection_data, iter_frames, read_jsonl_header
+from playerDetection import playerDetection
+
+
+def frame(number):
+    return {"frame_number": number, "timestamp": number / 30, "detections": []}
+
+
+def sample_data(count=3):
+    return {"video_info": {"path": "clip.mp4", "fps": 30.0, "total_frames": count},
+            "frames": [frame(number) for number in range(count)]}
+
+
+def test_recover_jsonl_truncates_partial_line(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    save_detection_data(sample_data(), path)
+    complete = open(path).read()
+    with open(path, "a") as f:
+        f.write('{"frame_number": 3, "detec')
+
+    assert recover_jsonl(path) == (3, 2)
+    assert open(path).read() == complete
+
+
+def test_recover_jsonl_drops_corrupt_line_and_resumes(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    save_detection_data(sample_data(2), path)
+    with open(path, "a") as f:
+        f.write("not json\n")
+
+    assert recover_jsonl(path) == (2, 1)
+
+    # A resumed run appends after the last good frame
+    with open(path, "a") as f:
+        f.write(json.dumps(frame(2)) + "\n")
+    assert [f["frame_number"] for f in iter_frames(path)] == [0, 1, 2]
+
+
+def test_recover_jsonl_header_only(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    save_detection_data(sample_data(0), path)
+
+    assert recover_jsonl(path) == (0, None)
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch, make_clip):
+    # file_digest keeps its digest cache under cache/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "model.pt").write_bytes(b"weights")
+    return make_clip(frames=30), "model.pt", str(tmp_path / "detections.jsonl")
+
+
+def test_interrupted_run_resumes_after_last_written_frame(run, fake_detector):
+    video, model_path, output = run
+
+    with pytest.raises(RuntimeError):
+        playerDetection(video, model_path, output, checkpoint_every=5, model=fake_detector(fail_at=17))
+    checkpoint = load_checkpoint(output)
+    assert checkpoint["frames_written"] == 17 and checkpoint["last_frame"] == 16
+    assert not checkpoint["complete"]
+
+    # The process died in the middle of a line
+    with open(output, "a") as f:
+        f.write('{"frame_number": 17, "detections": [{"cla')
+
+    detector = fake_detector()
+    playerDetection(video, model_path, output, resume=True, checkpoint_every=5, model=detector)
+
+    assert detector.frames == list(range(17, 30))
+    frames = list(iter_frames(output))
+    assert [f["frame_number"] for f in frames] == list(range(30))
+    # Every frame kept the boxes detected on it, before and after the resume
+    assert [f["detections"][0]["bbox"]["x1"] for f in frames] == list(range(30))
+    assert read_jsonl_header(output)["video_info"]["path"] == video
+    assert load_checkpoint(output)["complete"]
+
+    # A complete run is not repeated
+    again = fake_detector()
+    playerDetection(video, model_path, output, resume=True, checkpoint_every=5, model=again)
+    assert again.frames == []
+
+
+def test_resume_rejects_changed_parameters(run, fake_detector):
+    video, model_path, output = run
+    with pytest.raises(RuntimeError):
+        playerDetection(video, model_path, output, checkpoint_every=5, model=fake_detector(fail_at=8))
+
+    with pytest.raises(ValueError, match="parameters"):
+        playerDetection(video, model_path, output, resume=True, checkpoint_every=5, model=fake_detector(),
+                        static_threshold=6.0)
+
+    with pytest.raises(ValueError):
+        playerDetection(video, model_path, output.replace(".jsonl", ".json"), resume=True, model=fake_detector())
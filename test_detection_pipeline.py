@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the threaded decode / inference / post-processing pipeline
+"""
+
+import threading
+import time
+import numpy as np
+import pytest
+from detectionPipeline import read_batches, run_detection_pipeline
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture, every frame is filled with its frame number"""
+
+    def __init__(self, count, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.position = 0
+
+    def read(self):
+        if self.position == self.fail_at:
+            raise IOError(f"corrupt frame {self.position}")
+        if self.position >= self.count:
+            return False, None
+        frame = np.full((4, 4, 3), self.position, dtype=np.uint8)
+        self.position += 1
+        return True, frame
+
+    def set(self, prop, value):
+        self.position = int(value)
+
+
+def test_read_batches_range_and_short_last_batch():
+    batches = list(read_batches(FakeCapture(20), batch_size=4, start_frame=5, end_frame=15))
+    assert [numbers for numbers, _ in batches] == [[5, 6, 7, 8], [9, 10, 11, 12], [13, 14]]
+    assert all(frame[0, 0, 0] == number for numbers, frames in batches for number, frame in zip(numbers, frames))
+
+
+def test_frames_are_handled_in_order():
+    rng = np.random.default_rng(0)
+
+    def infer_batch(frames):
+        # Uneven inference time must not reorder anything
+        time.sleep(rng.uniform(0, 0.005))
+        return [int(frame[0, 0, 0]) * 10 for frame in frames]
+
+    handled = []
+    stats = run_detection_pipeline(FakeCapture(50), infer_batch, lambda n, r: handled.append((n, r)),
+                                   batch_size=3, queue_size=2, progress_every=0)
+
+    assert handled == [(n, n * 10) for n in range(50)]
+    assert stats["decode"]["items"] == stats["inference"]["items"] == stats["postprocess"]["items"] == 50
+    assert stats["decode"]["queue_peak_depth"] <= 2
+
+
+@pytest.mark.parametrize("stage", ["decode", "inference", "postprocess"])
+def test_stage_errors_reach_the_caller(stage):
+    def infer_batch(frames):
+        if stage == "inference" and frames[0][0, 0, 0] >= 12:
+            raise RuntimeError("inference failed")
+        return [None] * len(frames)
+
+    def handle_frame(frame_number, result):
+        if stage == "postprocess" and frame_number == 7:
+            raise ValueError("post-processing failed")
+
+    cap = FakeCapture(1000, fail_at=20 if stage == "decode" else None)
+    expected = {"decode": IOError, "inference": RuntimeError, "postprocess": ValueError}[stage]
+    with pytest.raises(expected):
+        run_detection_pipeline(cap, infer_batch, handle_frame, batch_size=2, queue_size=2, progress_every=0)
+
+    # The worker threads were stopped instead of decoding the rest of the video
+    assert not any(t.name.startswith("detection-") for t in threading.enumerate())
+    assert cap.position < 1000
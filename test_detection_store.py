@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the detection store formats (.json, columnar .npz, streaming .jsonl)
+"""
+
+import pytest
+from detectionStore import load_detection_data, save_detection_data
+
+
+def detection(x1, y1, x2, y2, conf=0.75, **extra):
+    det = {
+        "class": "player",
+        "class_id": 0,
+        "confidence": conf,
+        "bbox": {
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "width": x2 - x1, "height": y2 - y1,
+            "center_x": (x1 + x2) / 2, "center_y": (y1 + y2) / 2
+        }
+    }
+    det.update(extra)
+    return det
+
+
+def sample_data():
+    # Values are exact in float32 so the .npz round trip compares equal
+    return {
+        "video_info": {"path": "clip.mp4", "fps": 30.0, "total_frames": 3},
+        "frames": [
+            {"frame_number": 0, "timestamp": 0.0, "source": "detected", "segment": 0,
+             "detections": [detection(10.0, 20.0, 30.0, 60.0, field_coords={"x": 1.5, "y": 2.25}, track_id=4),
+                            detection(100.0, 20.0, 130.5, 80.0, conf=0.5)]},
+            {"frame_number": 1, "timestamp": 1 / 30, "source": "propagated", "segment": 0, "detections": []},
+            {"frame_number": 2, "timestamp": 2 / 30, "source": "detected", "segment": 1,
+             "detections": [detection(12.0, 22.0, 32.0, 62.0, track_id=4)]}
+        ]
+    }
+
+
+@pytest.mark.parametrize("first, second", [(".json", ".npz"), (".npz", ".jsonl"), (".jsonl", ".json")])
+def test_round_trip(tmp_path, first, second):
+    data = sample_data()
+    save_detection_data(data, str(tmp_path / f"a{first}"))
+    save_detection_data(load_detection_data(str(tmp_path / f"a{first}")), str(tmp_path / f"b{second}"))
+    loaded = load_detection_data(str(tmp_path / f"b{second}"))
+
+    assert loaded["video_info"] == data["video_info"]
+    assert [f["frame_number"] for f in loaded["frames"]] == [0, 1, 2]
+    assert [f["source"] for f in loaded["frames"]] == ["detected", "propagated", "detected"]
+    assert [f["segment"] for f in loaded["frames"]] == [0, 0, 1]
+    for frame, expected in zip(loaded["frames"], data["frames"]):
+        assert frame["timestamp"] == pytest.approx(expected["timestamp"])
+        assert len(frame["detections"]) == len(expected["detections"])
+        for det, want in zip(frame["detections"], expected["detections"]):
+            assert det["bbox"] == pytest.approx(want["bbox"])
+            assert det["confidence"] == pytest.approx(want["confidence"])
+            assert det.get("track_id") == want.get("track_id")
+            assert det.get("field_coords") == want.get("field_coords")
+
+
+def test_npz_without_optional_columns(tmp_path):
+    data = sample_data()
+    for frame in data["frames"]:
+        frame.pop("source")
+        frame.pop("segment")
+        for det in frame["detections"]:
+            det.pop("track_id", None)
+            det.pop("field_coords", None)
+
+    save_detection_data(data, str(tmp_path / "plain.npz"))
+    loaded = load_detection_data(str(tmp_path / "plain.npz"))
+
+    assert all("source" not in f and "segment" not in f for f in loaded["frames"])
+    assert all("track_id" not in d and "field_coords" not in d for f in loaded["frames"] for d in f["detections"])
+
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy pre- and post-processing of the ONNX detector backend
+"""
+
+import numpy as np
+import pytest
+from detectorBackend import letterbox, scale_boxes, nms, postprocess, load_detector, OnnxDetector, MAX_WH
+
+
+def test_letterbox_keeps_aspect_and_centers_the_padding():
+    frame = np.full((360, 640, 3), 200, dtype=np.uint8)
+    boxed = letterbox(frame, (640, 640))
+
+    assert boxed.shape == (640, 640, 3)
+    # 640x360 fits the width, the 280 rows left over are split above and below
+    assert (boxed[:140] == 114).all() and (boxed[500:] == 114).all()
+    assert (boxed[140:500] == 200).all()
+
+
+def test_scale_boxes_undoes_the_letterbox():
+    frame_shape = (360, 640, 3)
+    frame_boxes = np.array([[100.0, 50.0, 200.0, 300.0], [600.0, 0.0, 640.0, 360.0]])
+    # The letterbox above keeps the scale and shifts y by 140
+    input_boxes = frame_boxes + [0, 140, 0, 140]
+
+    np.testing.assert_allclose(scale_boxes(input_boxes, (640, 640), frame_shape), frame_boxes)
+
+    small = np.array([[10.0, 150.0, 50.0, 200.0], [-5.0, 100.0, 700.0, 600.0]])
+    scaled = scale_boxes(small, (640, 640), (720, 1280, 3))
+    np.testing.assert_allclose(scaled[0], [20, 20, 100, 120])
+    # Boxes reaching into the padding are clipped to the frame
+    np.testing.assert_allclose(scaled[1], [0, 0, 1280, 720])
+
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    xyxy = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60], [0, 0, 10, 9.5]], dtype=np.float64)
+    scores = np.array([0.8, 0.9, 0.5, 0.7])
+
+    np.testing.assert_array_equal(nms(xyxy, scores, 0.5), [1, 2])
+    # A high enough threshold keeps everything, highest score first
+    np.testing.assert_array_equal(nms(xyxy, scores, 0.99), [1, 0, 3, 2])
+
+
+def test_postprocess_filters_converts_and_suppresses_per_class():
+    # One row per anchor (cx, cy, w, h, class 0 score, class 1 score), transposed to the head layout
+    prediction = np.array([
+        [50, 40, 20, 40, 0.9, 0.1],
+        [51, 40, 20, 40, 0.1, 0.8],
+        [50, 41, 20, 40, 0.6, 0.1],
+        [200, 100, 10, 10, 0.1, 0.1],
+    ], dtype=np.float32).T
+
+    xyxy, conf, cls = postprocess(prediction, conf=0.25, iou=0.5)
+
+    # The low-score anchor is dropped, the duplicate player is suppressed, the other class overlapping it is kept
+    np.testing.assert_allclose(xyxy, [[40, 20, 60, 60], [41, 20, 61, 60]])
+    np.testing.assert_allclose(conf, [0.9, 0.8])
+    np.testing.assert_array_equal(cls, [0, 1])
+    assert len(postprocess(prediction, conf=0.25, iou=0.5, max_det=1)[0]) == 1
+    assert xyxy.max() < MAX_WH
+
+
+def test_decode_returns_frame_coordinates():
+    detector = object.__new__(OnnxDetector)
+    detector.input_shape, detector.names, detector.conf, detector.iou = (640, 640), {0: "player"}, 0.25, 0.7
+    prediction = np.array([[100, 200, 40, 80, 0.9]], dtype=np.float32).T
+
+    result, = detector.decode([prediction], [np.zeros((360, 640, 3), dtype=np.uint8)])
+
+    np.testing.assert_allclose(result.boxes.xyxy, [[80, 20, 120, 100]])
+    assert result.names == {0: "player"} and result.boxes.cls.tolist() == [0.0]
+
+
+def test_load_detector_rejects_bad_backends():
+    with pytest.raises(ValueError, match="onnx"):
+        load_detector("model.pt", "onnx")
+    with pytest.raises(ValueError, match="backend"):
+        load_detector("model.onnx", "tensorrt")
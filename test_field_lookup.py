@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed pixel to field lookup table of fixed cameras
+"""
+
+import os
+import cv2
+import numpy as np
+import pytest
+from fieldLookup import build_lookup, load_lookup, lookup_path, FieldLookup
+from homographyTransform import transformPoints, homographyTransform
+
+WIDTH, HEIGHT = 640, 360
+# A broadcast view: the near sideline across the bottom of the frame, the far one near the top
+H = cv2.getPerspectiveTransform(np.float32([[40, 340], [600, 340], [470, 60], [170, 60]]),
+                                np.float32([[0, 0], [120, 0], [120, 53.3], [0, 53.3]]))
+
+
+def random_points(rng, count=2000):
+    return np.column_stack([rng.uniform(0, WIDTH - 1, count), rng.uniform(0, HEIGHT - 1, count)])
+
+
+def test_table_matches_the_homography_on_pixel_centers():
+    table = build_lookup(H, WIDTH, HEIGHT)
+    ys, xs = np.mgrid[0:HEIGHT, 0:WIDTH]
+    pixels = np.column_stack([xs.ravel(), ys.ravel()])
+
+    np.testing.assert_allclose(table.reshape(-1, 2), transformPoints(pixels, H), rtol=1e-5, atol=1e-4)
+    lookup = FieldLookup(table, H)
+    np.testing.assert_allclose(lookup.transform(pixels[::97], interpolate=False), transformPoints(pixels[::97], H),
+                               rtol=1e-5, atol=1e-4)
+
+
+def test_interpolation_between_pixels_stays_within_an_inch():
+    points = random_points(np.random.default_rng(0))
+    lookup = FieldLookup(build_lookup(H, WIDTH, HEIGHT), H)
+
+    error = np.linalg.norm(lookup.transform(points) - transformPoints(points, H), axis=1)
+    assert error.max() < 1 / 12
+    # The nearest pixel is off by up to half a pixel, still well under a foot here
+    nearest = np.linalg.norm(lookup.transform(points, interpolate=False) - transformPoints(points, H), axis=1)
+    assert error.mean() < nearest.mean() and nearest.max() < 1.0
+
+
+def test_points_outside_the_frame_fall_back_to_the_homography():
+    # Feet on the bottom and right border, and a box partly outside the frame
+    points = np.array([[WIDTH, 200], [320, HEIGHT], [-10, 300], [100, 100]], dtype=np.float64)
+    lookup = FieldLookup(build_lookup(H, WIDTH, HEIGHT), H)
+
+    np.testing.assert_allclose(lookup.transform(points), transformPoints(points, H), rtol=1e-4, atol=1e-3)
+    with pytest.raises(ValueError):
+        FieldLookup(lookup.table).transform(points)
+
+
+def test_tables_are_cached_per_homography(tmp_path):
+    root = str(tmp_path / "fieldLookup")
+    lookup = load_lookup(H, WIDTH, HEIGHT, root)
+
+    assert isinstance(lookup.table, np.memmap) and not lookup.table.flags.writeable
+    assert load_lookup(H * 2.0, WIDTH, HEIGHT, root).table.filename == lookup.table.filename
+    moved = H.copy()
+    moved[0, 2] += 1.0
+    assert lookup_path(moved, WIDTH, HEIGHT, root) != lookup_path(H, WIDTH, HEIGHT, root)
+    assert lookup_path(H, WIDTH, HEIGHT + 2, root) != lookup_path(H, WIDTH, HEIGHT, root)
+    assert [name for name in os.listdir(root) if not name.endswith(".npy") or ".tmp." in name] == []
+
+
+def test_detection_transform_through_the_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    corners = random_points(rng, 50)
+    frames = [{"frame_number": n, "detections": [
+        {"bbox": {"x1": x - 10, "y1": y - 40, "x2": x + 10, "y2": y}} for x, y in corners[n * 5:(n + 1) * 5]]}
+        for n in range(10)]
+    data = {"video_info": {"path": "clip.mp4", "width": WIDTH, "height": HEIGHT}, "frames": frames}
+
+    homographyTransform(None, data, use_lookup=True, H=H)
+
+    actual = [[d["field_coords"]["x"], d["field_coords"]["y"]] for frame in frames for d in frame["detections"]]
+    np.testing.assert_allclose(actual, transformPoints(corners, H), atol=1 / 12)
+    assert len(os.listdir(tmp_path / "cache" / "fieldLookup")) == 1
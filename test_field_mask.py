@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for cropping inference to the field and dropping off-field boxes
+"""
+
+import cv2
+import numpy as np
+from detectionPostprocess import boxes_from_arrays
+from detectionStore import load_detection_data
+from fieldMask import FieldRegion, FieldRegionTracker, green_field_mask
+from playerDetection import playerDetection
+
+TURF = (40, 140, 40)
+STANDS = (200, 200, 200)
+
+
+def stadium_frame(width=320, height=240, field_top=100, shift=0):
+    """Gray stands above a green field that starts at field_top"""
+    frame = np.full((height, width, 3), STANDS, dtype=np.uint8)
+    frame[field_top:] = TURF
+    for x in range(20 + shift, width, 60):
+        cv2.line(frame, (x, field_top), (x, height - 1), (255, 255, 255), 2)  # yard lines
+    return frame
+
+
+def test_restore_boxes_moves_to_frame_and_drops_off_field_feet():
+    mask = np.zeros((240, 320), dtype=np.uint8)
+    mask[100:, 40:300] = 255
+    region = FieldRegion(mask, top_pad=0.15, pad=10)
+
+    x1, y1, x2, y2 = region.rect
+    assert (x1, x2, y2) == (30, 310, 240) and y1 == 100 - int(140 * 0.15) - 10
+    assert region.crop(np.zeros((240, 320, 3))).shape[:2] == (y2 - y1, x2 - x1)
+
+    # Boxes in crop coordinates: feet on the field, feet in the stands, feet beside the field
+    boxes = boxes_from_arrays([[50, 60, 70, 120], [50, 5, 70, 20], [0, 80, 8, 130]], [0.9, 0.8, 0.7], [0, 0, 0])
+    restored = region.restore_boxes(boxes)
+
+    np.testing.assert_allclose(restored["xyxy"], [[50 + x1, 60 + y1, 70 + x1, 120 + y1]])
+    np.testing.assert_allclose(restored["conf"], [0.9])
+
+
+def test_empty_mask_keeps_the_whole_frame():
+    region = FieldRegion(np.zeros((240, 320), dtype=np.uint8))
+    assert region.rect == (0, 0, 320, 240) and region.pixel_fraction() == 1.0
+
+    boxes = boxes_from_arrays([[5, 5, 20, 30]], [0.9], [0])
+    np.testing.assert_allclose(region.restore_boxes(boxes)["xyxy"], boxes["xyxy"])
+
+
+def test_green_mask_and_tracker_updates():
+    mask = green_field_mask(stadium_frame())
+    assert mask[:90].max() == 0
+    assert (mask[110:] > 0).mean() > 0.95
+
+    tracker = FieldRegionTracker("green")
+    first = tracker.region_for(stadium_frame())
+    assert tracker.region_for(stadium_frame()) is first
+    # A pan that changes the view recomputes the mask
+    tracker.region_for(stadium_frame(field_top=40))
+    assert tracker.updates == 2
+
+
+def test_player_detection_keeps_on_field_boxes(tmp_path, fake_detector):
+    video = str(tmp_path / "stadium.avi")
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (320, 240))
+    for _ in range(3):
+        writer.write(stadium_frame())
+    writer.release()
+
+    crops = []
+
+    def boxes_for(number):
+        # One player on the field and one spectator in the stands, in crop coordinates
+        return [(100, 60, 120, 110, 0.9, 0), (100, 0, 120, 10, 0.8, 0)]
+
+    class CroppedDetector(fake_detector):
+        def __call__(self, frames, verbose=False):
+            crops.extend(frame.shape[:2] for frame in frames)
+            return super().__call__(frames, verbose)
+
+    output = str(tmp_path / "detections.json")
+    playerDetection(video, "model.pt", output, field_roi="green", model=CroppedDetector(boxes_for))
+
+    # The stands above the crop never reach the detector
+    assert all(height < 240 for height, _ in crops)
+    frames = load_detection_data(output)["frames"]
+    assert [len(frame["detections"]) for frame in frames] == [1, 1, 1]
+    bbox = frames[0]["detections"][0]["bbox"]
+    assert bbox["y2"] > 100 and bbox["x2"] - bbox["x1"] == 20
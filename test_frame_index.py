@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for exact frame seeking through the per-video frame index
+"""
+
+import os
+import cv2
+import numpy as np
+import pytest
+from conftest import frame_number_of
+from frameIndex import FrameIndex, read_frame_at, iter_frames_at, index_path, load_frame_index, extract_frames
+
+FPS = 30.0
+
+
+def clip_index(frames, gop=5):
+    """Index of a make_clip video, as ffprobe would list it with a keyframe every gop frames"""
+    return FrameIndex(np.arange(frames) * 1000.0 / FPS, np.arange(0, frames, gop), FPS)
+
+
+def test_keyframe_and_timestamp_lookups():
+    index = FrameIndex([0, 40, 80, 120, 160, 200], [0, 3], 25.0)
+
+    assert index.frame_count == 6
+    assert [index.keyframe_before(n) for n in (0, 2, 3, 5)] == [0, 0, 3, 3]
+    assert [index.frame_at_msec(ms) for ms in (-5, 0, 19, 21, 120, 999)] == [0, 0, 0, 1, 3, 5]
+    assert index.timestamp(4) == pytest.approx(0.16)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = FrameIndex([0, 33.3, 66.7], [0, 2], 29.97, video_sha256="abc")
+    path = str(tmp_path / "index" / "clip.npz")
+    index.save(path)
+
+    loaded = FrameIndex.load(path)
+    np.testing.assert_allclose(loaded.pts_ms, index.pts_ms)
+    assert loaded.keyframes.tolist() == [0, 2] and loaded.fps == pytest.approx(29.97)
+    assert loaded.video_sha256 == "abc"
+    assert os.listdir(tmp_path / "index") == ["clip.npz"]
+
+
+def test_read_frame_at_lands_on_the_exact_frame(make_clip):
+    cap = cv2.VideoCapture(make_clip(frames=30))
+    index = clip_index(30)
+    try:
+        for number in (17, 3, 29, 0, 10):
+            ret, frame = read_frame_at(cap, index, number)
+            assert ret and frame_number_of(frame) == number
+        # Reading continues after the frame that was seeked to
+        read_frame_at(cap, index, 12)
+        assert frame_number_of(cap.read()[1]) == 13
+
+        assert read_frame_at(cap, index, 30) == (False, None)
+        assert read_frame_at(cap, index, -1) == (False, None)
+    finally:
+        cap.release()
+
+
+def test_iter_frames_at_sorts_and_skips_unreadable_frames(make_clip):
+    cap = cv2.VideoCapture(make_clip(frames=30))
+    try:
+        frames = list(iter_frames_at(cap, clip_index(30), [21, 2, 4, 4, 25, 40, 9]))
+    finally:
+        cap.release()
+
+    assert [number for number, _ in frames] == [2, 4, 9, 21, 25]
+    assert all(frame_number_of(frame) == number for number, frame in frames)
+
+
+def test_cached_index_is_used_for_extraction(tmp_path, monkeypatch, make_clip):
+    # file_digest keeps its digest cache under cache/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    video = make_clip(frames=20)
+    clip_index(20).save(index_path(video))
+
+    assert load_frame_index(video).frame_count == 20
+    written = extract_frames(video, [15, 5], str(tmp_path / "frames"))
+    assert [os.path.basename(path) for path in written] == ["frame_000005.jpg", "frame_000015.jpg"]
+    assert frame_number_of(cv2.imread(written[1])) == 15
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized homography transform
+"""
+
+import json
+import cv2
+import numpy as np
+from detectionStore import save_detection_data, load_detection_data, detections_to_columns, iter_frames
+from homographyTransform import (transformPoints, transformFrames, bottomCenters, loadHomography,
+                                 homographyTransform, homographyTransformColumns, homographyTransformStream)
+
+
+def reference_transform(frames, H):
+    """The per-detection loop the vectorized transform replaced"""
+    field = []
+    for frame in frames:
+        for det in frame["detections"]:
+            bbox = det["bbox"]
+            pt = np.array([[(bbox["x1"] + bbox["x2"]) / 2.0, bbox["y2"]]], dtype=np.float32).reshape(-1, 1, 2)
+            field.append(cv2.perspectiveTransform(pt, H)[0][0])
+    return np.array(field, dtype=np.float64).reshape(-1, 2)
+
+
+def random_frames(rng, count=40):
+    frames = []
+    for number in range(count):
+        detections = []
+        for _ in range(rng.integers(0, 6)):
+            x1, y1 = rng.uniform(0, 1800), rng.uniform(0, 1000)
+            detections.append({"bbox": {"x1": x1, "y1": y1, "x2": x1 + rng.uniform(10, 60),
+                                        "y2": y1 + rng.uniform(30, 120)},
+                               "confidence": 0.9, "class_id": 0, "class": "player"})
+        frames.append({"frame_number": number, "detections": detections})
+    return frames
+
+
+SRC = np.float32([[200, 900], [1700, 900], [1300, 300], [600, 300]])
+DST = np.float32([[0, 0], [300, 0], [300, 160], [0, 160]])
+
+
+def test_transform_frames_matches_per_point_loop():
+    rng = np.random.default_rng(0)
+    H = cv2.getPerspectiveTransform(SRC, DST)
+    frames = random_frames(rng)
+
+    expected = reference_transform(frames, H)
+    transformFrames(frames, H)
+    actual = np.array([[d["field_coords"]["x"], d["field_coords"]["y"]]
+                       for frame in frames for d in frame["detections"]])
+    np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-4)
+
+
+def test_transform_points_chunks_and_empty_input():
+    rng = np.random.default_rng(1)
+    H = np.array([[1.2, 0.1, 5.0], [0.05, 0.9, -3.0], [1e-4, 2e-4, 1.0]])
+    points = rng.uniform(0, 1000, size=(1000, 2))
+
+    np.testing.assert_allclose(transformPoints(points, H, chunk_size=64), transformPoints(points, H), rtol=1e-6)
+    assert transformPoints(np.zeros((0, 2)), H).shape == (0, 2)
+    np.testing.assert_allclose(bottomCenters([(10, 20, 30, 60)]), [[20, 60]])
+
+
+def test_every_storage_format_gets_the_same_field_coordinates(tmp_path):
+    # Manual [x, y] points and automatic {"x", "y"} points in one file
+    correspondence_file = str(tmp_path / "correspondence.json")
+    with open(correspondence_file, "w") as f:
+        json.dump({"correspondences": [
+            {"image_point": SRC[0].tolist(), "field_point": DST[0].tolist()},
+            {"image_point": SRC[1].tolist(), "field_point": DST[1].tolist()},
+            {"image_point": {"x": float(SRC[2][0]), "y": float(SRC[2][1])},
+             "field_point": {"x": float(DST[2][0]), "y": float(DST[2][1])}},
+            {"image_point": SRC[3].tolist(), "field_point": DST[3].tolist()}]}, f)
+    np.testing.assert_allclose(loadHomography(correspondence_file), cv2.getPerspectiveTransform(SRC, DST), atol=1e-6)
+
+    data = {"video_info": {"path": "clip.mp4", "fps": 30.0, "total_frames": 40},
+            "frames": random_frames(np.random.default_rng(2))}
+    save_detection_data(data, str(tmp_path / "detections.jsonl"))
+    expected = reference_transform(data["frames"], loadHomography(correspondence_file))
+
+    in_memory = homographyTransform(correspondence_file, load_detection_data(str(tmp_path / "detections.jsonl")))
+    columns = homographyTransformColumns(correspondence_file, detections_to_columns(data))
+    homographyTransformStream(correspondence_file, str(tmp_path / "detections.jsonl"),
+                              str(tmp_path / "field.jsonl"), chunk_frames=7)
+    streamed = list(iter_frames(str(tmp_path / "field.jsonl")))
+
+    for frames in (in_memory["frames"], streamed):
+        actual = [[d["field_coords"]["x"], d["field_coords"]["y"]] for frame in frames for d in frame["detections"]]
+        np.testing.assert_allclose(np.array(actual).reshape(-1, 2), expected, rtol=1e-6, atol=1e-4)
+    np.testing.assert_allclose(columns["field_xy"], expected, rtol=1e-6, atol=1e-4)
+    assert [frame["frame_number"] for frame in streamed] == list(range(40))
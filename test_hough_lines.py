@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for the Hough yard line detector and its line confidence
+"""
+
+import cv2
+import numpy as np
+import pytest
+from houghLines import HoughLineDetector, line_coverage
+
+
+def test_line_coverage_counts_overlap_once():
+    segments = np.array([[0, 0, 0, 10], [0, 15, 0, 5],  # overlapping pieces, one drawn backwards
+                         [0, 20, 0, 30],                  # after a gap
+                         [100, 0, 100, 10]], dtype=np.float64)
+    length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    labels = np.array([0, 0, 0, 1])
+
+    np.testing.assert_allclose(line_coverage(segments, length, labels), [25, 10])
+    assert len(line_coverage(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int))) == 0
+
+
+def test_confidence_is_bounded():
+    frame = np.full((360, 640, 3), (40, 120, 40), dtype=np.uint8)
+    for x in range(80, 640, 120):
+        # Both edges of every painted line give their own segments
+        cv2.line(frame, (x, 0), (x + 20, 359), (255, 255, 255), 5)
+
+    lines, confidence, support = HoughLineDetector(reuse_threshold=None)(frame)
+
+    assert len(lines) >= 4
+    assert np.all(confidence > 0) and np.all(confidence <= 1)
+    # A full-height line covers about its length relative to the diagonal
+    assert confidence.max() == pytest.approx(360 / np.hypot(360, 640), abs=0.1)
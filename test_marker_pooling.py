@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for pooling yard marker detections over a camera segment
+"""
+
+import numpy as np
+import pytest
+import yardMarkerDetection
+from autoCorrespondancePoints import pool_marker_detections, samples_from_marker_data, findVideoCorrespondancePoints
+from detectionStore import save_detection_data
+
+
+def marker(label, x, y, conf=0.8):
+    return {"label": label, "confidence": conf, "bbox": {"center_x": x, "center_y": y}}
+
+
+def sample(number, *detections):
+    return {"frame_number": number, "segment": 0, "detections": list(detections)}
+
+
+def test_pool_rejects_outliers_and_rare_labels():
+    samples = [sample(i, marker("nl2", 100 + (i % 3), 200), marker("fl3", 500, 120)) for i in range(9)]
+    # One misplaced nl2 box and a label seen only once
+    samples.append(sample(9, marker("nl2", 400, 50), marker("nr4", 800, 300)))
+
+    pooled = {p["label"]: p for p in pool_marker_detections(samples, min_support=0.5)}
+
+    assert set(pooled) == {"fl3", "nl2"}
+    assert pooled["nl2"]["bbox"]["center_x"] == pytest.approx(101)
+    assert pooled["nl2"]["bbox"]["center_y"] == pytest.approx(200)
+    assert pooled["nl2"]["support"] == 9
+    assert pooled["fl3"]["support"] == 9
+
+
+def test_pool_keeps_most_confident_duplicate_per_sample():
+    samples = [sample(i, marker("nl2", 100, 200, conf=0.9), marker("nl2", 140, 200, conf=0.4)) for i in range(4)]
+
+    pooled = pool_marker_detections(samples)
+
+    assert len(pooled) == 1
+    assert pooled[0]["bbox"]["center_x"] == pytest.approx(100)
+    assert pooled[0]["confidence"] == pytest.approx(0.9)
+    assert pooled[0]["spread_px"] == pytest.approx(0)
+
+
+def test_pool_empty_segment():
+    assert pool_marker_detections([]) == []
+    assert pool_marker_detections([sample(0)]) == []
+
+
+def marker_frame(number, segment, *detections):
+    return {"frame_number": number, "segment": segment,
+            "detections": [{"class": label, "confidence": 0.8, "bbox": {"center_x": x, "center_y": y}}
+                           for label, x, y in detections]}
+
+
+def test_samples_keep_only_yard_marker_labels():
+    data = {"frames": [marker_frame(0, 0, ("nl2", 100, 200), ("50", 300, 200)), {"frame_number": 15, "detections": []}]}
+
+    samples = samples_from_marker_data(data)
+
+    assert [(s["frame_number"], s["segment"]) for s in samples] == [(0, 0), (15, 0)]
+    assert [d["label"] for d in samples[0]["detections"]] == ["nl2"]
+
+
+def test_video_correspondences_per_camera_segment(tmp_path, monkeypatch):
+    marker_path = str(tmp_path / "markers.json")
+    frames = [marker_frame(n * 15, 0, ("nl2", 100 + n % 2, 300), ("nl3", 400, 300), ("fl2", 120, 80))
+              for n in range(6)]
+    # After a cut the camera shows other markers; one frame misses nr4
+    frames += [marker_frame(n * 15, 1, ("nr4", 200, 310), ("fr4", 210, 90)) for n in range(6, 9)]
+    frames.append(marker_frame(135, 1, ("fr4", 212, 90)))
+    save_detection_data({"video_info": {"path": "clip.mp4", "width": 1280, "height": 720}, "frames": frames},
+                        marker_path)
+    monkeypatch.setattr(yardMarkerDetection, "cachedYardMarkerDetection",
+                        lambda video_path, model_path, every, **options: (marker_path, True))
+    model_path = tmp_path / "markers.pt"
+    model_path.write_bytes(b"weights")
+
+    segments = findVideoCorrespondancePoints("clip.mp4", str(model_path), every=15)
+
+    assert [(s["start_frame"], s["end_frame"], s["samples"]) for s in segments] == [(0, 75, 6), (90, 135, 4)]
+    labels = [[p["yard_marker_info"]["label"] for p in s["correspondences"]] for s in segments]
+    assert labels == [["fl2", "nl2", "nl3"], ["fr4", "nr4"]]
+    assert segments[1]["correspondences"][1]["yard_marker_info"]["support"] == 3
+    np.testing.assert_allclose([segments[0]["correspondences"][1]["image_point"]["x"]], [100.5])
+
+    with pytest.raises(FileNotFoundError):
+        findVideoCorrespondancePoints("clip.mp4", str(tmp_path / "missing.pt"))
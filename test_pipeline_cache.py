@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed stage cache
+"""
+
+import os
+import pytest
+from pipelineCache import lookup, store, run_cached, invalidate, list_entries, export_output
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # file_digest keeps its digest cache under cache/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"video bytes")
+    return tmp_path
+
+
+def test_lookup_miss_then_store_hit(workdir):
+    root = str(workdir / "pipeline")
+    inputs = {"video": "clip.mp4"}
+    assert lookup("stage", inputs, {"every": 1}, root) is None
+
+    output = workdir / "out.json"
+    output.write_text("{}")
+    stored = store("stage", inputs, {"every": 1}, {"output": str(output)}, root)
+
+    entry = lookup("stage", inputs, {"every": 1}, root)
+    assert entry is not None and entry["key"] == stored["key"]
+    assert open(entry["paths"]["output"]).read() == "{}"
+    # Copied, not moved
+    assert output.exists()
+
+
+def test_key_depends_on_params_and_input_content(workdir):
+    root = str(workdir / "pipeline")
+    calls = []
+
+    def produce(path):
+        calls.append(path)
+        with open(path, "w") as f:
+            f.write(str(len(calls)))
+
+    first, hit = run_cached("stage", {"video": "clip.mp4"}, {"every": 1}, ".txt", produce, root)
+    assert not hit
+    again, hit = run_cached("stage", {"video": "clip.mp4"}, {"every": 1}, ".txt", produce, root)
+    assert hit and again == first and len(calls) == 1
+
+    _, hit = run_cached("stage", {"video": "clip.mp4"}, {"every": 2}, ".txt", produce, root)
+    assert not hit
+
+    (workdir / "clip.mp4").write_bytes(b"different video bytes")
+    _, hit = run_cached("stage", {"video": "clip.mp4"}, {"every": 1}, ".txt", produce, root)
+    assert not hit and len(calls) == 3
+
+
+def test_use_cache_false_reruns(workdir):
+    root = str(workdir / "pipeline")
+    produce = lambda path: open(path, "w").close()
+    run_cached("stage", {"video": "clip.mp4"}, {}, ".txt", produce, root)
+    _, hit = run_cached("stage", {"video": "clip.mp4"}, {}, ".txt", produce, root, use_cache=False)
+    assert not hit
+    assert len(list_entries("stage", root)) == 1
+
+
+def test_missing_output_is_a_miss(workdir):
+    root = str(workdir / "pipeline")
+    path, _ = run_cached("stage", {"video": "clip.mp4"}, {}, ".txt", lambda p: open(p, "w").close(), root)
+    os.remove(path)
+    assert lookup("stage", {"video": "clip.mp4"}, {}, root) is None
+
+
+def test_invalidate_filters(workdir):
+    root = str(workdir / "pipeline")
+    (workdir / "other.mp4").write_bytes(b"other")
+    produce = lambda path: open(path, "w").close()
+    run_cached("detect", {"video": "clip.mp4"}, {}, ".txt", produce, root)
+    run_cached("detect", {"video": "other.mp4"}, {}, ".txt", produce, root)
+    run_cached("track", {"video": "clip.mp4"}, {}, ".txt", produce, root)
+
+    assert invalidate(input_path=str(workdir / "other.mp4"), cache_root=root) == 1
+    assert invalidate(stage="track", cache_root=root) == 1
+    remaining = list_entries(cache_root=root)
+    assert [entry["stage"] for entry in remaining] == ["detect"]
+    assert invalidate(key=remaining[0]["key"][:8], cache_root=root) == 1
+    assert list_entries(cache_root=root) == []
+
+
+def test_failed_stage_leaves_no_entry(workdir):
+    root = str(workdir / "pipeline")
+
+    def produce(path):
+        with open(path, "w") as f:
+            f.write("partial")
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError):
+        run_cached("stage", {"video": "clip.mp4"}, {}, ".txt", produce, root)
+    assert lookup("stage", {"video": "clip.mp4"}, {}, root) is None
+    # Neither the temporary output nor a half built entry is left behind
+    assert [name for name in os.listdir(root) if not os.path.isdir(os.path.join(root, name))] == []
+    assert list_entries(cache_root=root) == []
+
+
+def test_optional_input_and_export(workdir):
+    root = str(workdir / "pipeline")
+
+    def produce(path):
+        with open(path, "w") as f:
+            f.write("result")
+
+    inputs = {"video": "clip.mp4", "correspondence": None}
+    cached, _ = run_cached("stage", inputs, {}, ".txt", produce, root)
+    assert run_cached("stage", inputs, {}, ".txt", produce, root) == (cached, True)
+
+    exported = export_output(cached, str(workdir / "exports" / "result.txt"))
+    with open(exported, "w") as f:
+        f.write("edited")
+    # Editing the exported copy never changes the cache entry
+    assert open(cached).read() == "result"
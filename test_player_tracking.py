@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for handing track ids back to the detection they came from
+"""
+
+import numpy as np
+from playerTracking import track_frame
+
+
+class FakeTrack:
+    def __init__(self, track_id, supplementary, confirmed=True):
+        self.track_id = track_id
+        self.supplementary = supplementary
+        self.confirmed = confirmed
+        self.time_since_update = 0
+
+    def is_confirmed(self):
+        return self.confirmed
+
+    def get_det_supplementary(self):
+        return self.supplementary
+
+
+class FakeTracker:
+    """
+    Mimics deep_sort_realtime: zero-area boxes are dropped from the detections but others
+    is indexed by the position of the remaining ones. Every detection becomes a confirmed
+    track whose id is the left edge of its box.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def update_tracks(self, raw, frame=None, others=None):
+        self.calls.append((raw, others))
+        kept = [d for d in raw if d[0][2] > 0 and d[0][3] > 0]
+        return [FakeTrack(int(box[0]), others[i] if others else None) for i, (box, _, _) in enumerate(kept)]
+
+
+def detection(x1, y1, x2, y2, conf):
+    return {"class": "player", "confidence": conf, "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}}
+
+
+def test_track_ids_land_on_their_detection():
+    detections = [
+        detection(100, 0, 140, 80, 0.5),
+        detection(200, 0, 200, 80, 0.95),  # no width
+        detection(300, 0, 340, 80, 0.9),
+        detection(400, 0, 405, 10, 0.8),   # too small
+        detection(500, 50, 540, 50, 0.85),  # no height
+        detection(600, 0, 640, 80, 0.7),
+    ]
+    tracker = FakeTracker()
+
+    tracked = track_frame(tracker, np.zeros((100, 700, 3), np.uint8), detections, min_box_size=0)
+
+    assert tracked == 4
+    # Every track id is the left edge of the box it was made from
+    for det in detections:
+        if "track_id" in det:
+            assert det["track_id"] == det["bbox"]["x1"]
+    assert "track_id" not in detections[1] and "track_id" not in detections[4]
+    # Most confident first
+    _, others = tracker.calls[0]
+    assert others == [2, 3, 5, 0]
+
+
+def test_limits_and_empty_frames():
+    detections = [detection(100 * i, 0, 100 * i + 40, 80, 0.1 * i) for i in range(1, 6)]
+    tracker = FakeTracker()
+
+    assert track_frame(tracker, None, detections, min_box_size=20, max_detections=2) == 2
+    assert [d.get("track_id") for d in detections] == [None, None, None, 400, 500]
+
+    assert track_frame(tracker, None, []) == 0
+    assert tracker.calls[-1] == ([], None)
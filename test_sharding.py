@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting player detection across processes by frame range
+"""
+
+import multiprocessing
+import os
+import pytest
+import playerDetection as detection
+from detectionStore import load_detection_data, iter_frames
+from playerDetection import playerDetection, playerDetectionSharded
+
+
+class InlinePool:
+    """Stands in for a spawn Pool, running the shards one after another in this process"""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, function, jobs):
+        self.jobs.extend(jobs)
+        # Finish the shards out of order, the merge must still follow the frame ranges
+        paths = {index: function(job) for index, job in reversed(list(enumerate(jobs)))}
+        return [paths[index] for index in range(len(jobs))]
+
+
+@pytest.fixture
+def inline_shards(tmp_path, monkeypatch, fake_detector):
+    # file_digest keeps its digest cache under cache/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    jobs = []
+    context = type("InlineContext", (), {"Pool": lambda self, processes: InlinePool(jobs)})()
+    monkeypatch.setattr(multiprocessing, "get_context", lambda method: context)
+    # Each shard loads its own model through the onnx backend
+    monkeypatch.setattr(detection, "load_detector", lambda path, backend, threads=None: fake_detector())
+    return jobs
+
+
+@pytest.mark.parametrize("extension", [".json", ".jsonl"])
+def test_shards_merge_in_frame_order(tmp_path, make_clip, fake_detector, inline_shards, extension):
+    video = make_clip(frames=30)
+    output = str(tmp_path / f"sharded{extension}")
+
+    written = playerDetectionSharded(video, "model.onnx", output, shards=3, backend="onnx")
+
+    assert written == 30
+    assert [(start, end) for _, _, _, start, end, _, _ in inline_shards] == [(0, 10), (10, 20), (20, None)]
+    frames = list(iter_frames(output))
+    assert [f["frame_number"] for f in frames] == list(range(30))
+    # Every frame kept the box detected on the matching decoded frame
+    assert [f["detections"][0]["bbox"]["x1"] for f in frames] == list(range(30))
+    assert not [name for name in os.listdir(tmp_path) if ".shard" in name]
+
+
+def test_sharded_output_matches_a_single_process_run(tmp_path, make_clip, fake_detector, inline_shards):
+    video = make_clip(frames=25)
+    single = str(tmp_path / "single.json")
+    sharded = str(tmp_path / "sharded.json")
+
+    playerDetection(video, "model.onnx", single, model=fake_detector())
+    playerDetectionSharded(video, "model.onnx", sharded, shards=4, backend="onnx")
+
+    assert load_detection_data(sharded)["frames"] == load_detection_data(single)["frames"]
+
+
+def test_sharding_rejects_resume(tmp_path, make_clip):
+    with pytest.raises(ValueError):
+        playerDetectionSharded(make_clip(), "model.onnx", str(tmp_path / "out.jsonl"), resume=True)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for reusing detections on frames that did not change
+"""
+
+import cv2
+import numpy as np
+import pytest
+from boxPropagation import SOURCE_DETECTED
+from detectionStore import load_detection_data
+from playerDetection import playerDetection
+from staticFrames import StaticFrameFilter, SOURCE_REUSED
+
+
+def field_frame(shift=0, brightness=0):
+    frame = np.full((360, 640, 3), (40, 120, 40), dtype=np.uint8)
+    for x in range(40, 640, 80):
+        cv2.line(frame, (x + shift, 0), (x + shift, 359), (255, 255, 255), 3)
+    cv2.rectangle(frame, (300 + shift, 150), (330 + shift, 220), (0, 0, 200), -1)
+    return cv2.add(frame, np.full_like(frame, brightness))
+
+
+def test_static_filter_reuses_unchanged_frames():
+    static_filter = StaticFrameFilter(threshold=6.0)
+    frame = field_frame()
+
+    assert not static_filter.is_static(frame)  # first frame is always detected
+    assert static_filter.is_static(frame.copy())
+    assert static_filter.is_static(field_frame(brightness=2))  # compression-level noise
+    assert static_filter.skip_ratio() == pytest.approx(2 / 3)
+
+
+def test_static_filter_detects_local_motion():
+    static_filter = StaticFrameFilter(threshold=6.0)
+    static_filter.is_static(field_frame())
+
+    moved = field_frame()
+    cv2.rectangle(moved, (500, 150), (530, 220), (0, 0, 200), -1)  # one player entered
+    assert not static_filter.is_static(moved)
+    # The changed frame became the new reference
+    assert static_filter.is_static(moved.copy())
+
+
+def test_static_filter_max_reuse():
+    static_filter = StaticFrameFilter(threshold=6.0, max_reuse=2)
+    frame = field_frame()
+    assert [static_filter.is_static(frame) for _ in range(6)] == [False, True, True, False, True, True]
+
+
+def test_player_detection_reuses_static_frames(tmp_path, make_clip, fake_detector):
+    detector = fake_detector()
+    output = str(tmp_path / "detections.json")
+    # Consecutive frames of the clip differ by 4 gray levels, every second one crosses the threshold
+    playerDetection(make_clip(frames=10), "model.pt", output, static_threshold=6.0, model=detector)
+
+    frames = load_detection_data(output)["frames"]
+    assert detector.frames == [0, 2, 4, 6, 8]
+    assert [f["source"] for f in frames] == [SOURCE_DETECTED if n % 2 == 0 else SOURCE_REUSED for n in range(10)]
+    # A reused frame carries the boxes of the frame the detector last ran on
+    assert [f["detections"][0]["bbox"]["x1"] for f in frames] == [n - n % 2 for n in range(10)]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for turning line keypoints into fitted yard lines
+"""
+
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from detectorBackend import ArrayBoxes
+from yardLineDetection import (hesse_normal, cluster_segments, fit_lines, keypoint_segments, detect_frame_lines,
+                               line_record, save_line_data, load_line_data, lines_to_columns, iter_frame_lines)
+
+
+def test_hesse_normal_is_sign_stable_for_vertical_lines():
+    segments = np.array([[100, 0, 100.2, 500], [100.2, 500, 100, 0],
+                         [300, 0, 299.8, 500], [300, 500, 300.2, 0]], dtype=np.float64)
+    theta, rho = hesse_normal(segments)
+
+    assert np.all(np.abs(theta) < 0.01)
+    np.testing.assert_allclose(rho, [100, 100, 300, 300], atol=0.5)
+
+
+def test_cluster_and_fit_lines():
+    segments = np.array([
+        [100, 0, 101, 200], [101.5, 300, 102.5, 500],  # one yard line, split by a player
+        [400, 500, 398, 0],                            # a second line, drawn bottom to top
+        [700, 10, 705, 250], [705.5, 260, 710, 490]
+    ], dtype=np.float64)
+    weights = np.array([0.9, 0.7, 0.8, 0.6, 0.6])
+
+    labels = cluster_segments(segments)
+    assert labels[0] == labels[1] and labels[3] == labels[4]
+    assert len(set(labels.tolist())) == 3
+
+    lines, confidence, support = fit_lines(segments, weights, labels)
+
+    # Sorted left to right
+    assert lines[:, 1].tolist() == sorted(lines[:, 1].tolist())
+    np.testing.assert_array_equal(support, [2, 1, 2])
+    np.testing.assert_allclose(confidence, [0.8, 0.8, 0.6])
+    # Every end point lies on its fitted line
+    for theta, rho, x1, y1, x2, y2 in lines:
+        assert x1 * np.cos(theta) + y1 * np.sin(theta) == pytest.approx(rho, abs=1e-6)
+        assert x2 * np.cos(theta) + y2 * np.sin(theta) == pytest.approx(rho, abs=1e-6)
+    np.testing.assert_allclose(lines[0, [2, 4]], [100, 102.5], atol=0.5)
+
+
+def test_fit_lines_without_segments():
+    lines, confidence, support = fit_lines(np.zeros((0, 4)), np.zeros(0), cluster_segments(np.zeros((0, 4))))
+    assert lines.shape == (0, 6) and len(confidence) == 0 and len(support) == 0
+
+
+def test_keypoint_segments_span_the_visible_keypoints():
+    xy = np.array([
+        [[100, 0], [101, 100], [102, 200], [0, 0]],  # last keypoint not detected
+        [[300, 0], [300, 5], [0, 0], [0, 0]],        # too short
+        [[500, 0], [0, 0], [0, 0], [0, 0]],          # a single keypoint
+        [[0, 0], [700, 50], [703, 300], [705, 450]],
+    ], dtype=np.float64)
+    visible = (xy != 0).any(axis=-1)
+
+    segments, keep = keypoint_segments(xy, visible)
+
+    np.testing.assert_array_equal(keep, [0, 3])
+    np.testing.assert_allclose(segments, [[100, 0, 102, 200], [700, 50, 705, 450]])
+
+
+def test_detect_frame_lines_from_a_pose_result():
+    xy = np.array([[[100, 0], [100.5, 100], [101, 200]], [[101.5, 300], [102, 400], [102.5, 500]],
+                   [[400, 0], [400, 250], [400, 500]]], dtype=np.float32)
+    keypoint_conf = np.array([[0.9, 0.9, 0.9], [0.9, 0.9, 0.9], [0.9, 0.1, 0.9]], dtype=np.float32)
+    result = SimpleNamespace(keypoints=SimpleNamespace(xy=xy, conf=keypoint_conf),
+                             boxes=ArrayBoxes(np.zeros((3, 4)), np.array([0.9, 0.7, 0.8]), np.zeros(3)))
+
+    lines, confidence, support = detect_frame_lines(result)
+
+    np.testing.assert_array_equal(support, [2, 1])
+    np.testing.assert_allclose(lines[:, 1], [100, 400], atol=1.5)
+    assert detect_frame_lines(SimpleNamespace(keypoints=None, boxes=None))[0].shape == (0, 6)
+
+
+@pytest.mark.parametrize("extension", [".npz", ".jsonl"])
+def test_line_data_round_trip(tmp_path, extension):
+    segments = np.array([[100, 0, 101, 200], [400, 500, 398, 0]], dtype=np.float64)
+    labels = cluster_segments(segments)
+    frames = [line_record(0, 30.0, *fit_lines(segments, np.array([0.9, 0.8]), labels)),
+              line_record(15, 30.0, *fit_lines(np.zeros((0, 4)), np.zeros(0), cluster_segments(np.zeros((0, 4)))))]
+    data = {"video_info": {"path": "clip.mp4", "fps": 30.0}, "frames": frames}
+    path = str(tmp_path / f"lines{extension}")
+
+    save_line_data(data, path)
+    loaded = load_line_data(path)
+
+    assert loaded["video_info"] == data["video_info"]
+    assert [f["frame_number"] for f in loaded["frames"]] == [0, 15]
+    np.testing.assert_allclose(loaded["frames"][0]["lines"], frames[0]["lines"], atol=1e-3)
+    assert loaded["frames"][1]["lines"] == [] and loaded["frames"][0]["support"] == [1, 1]
+    assert [(number, len(lines)) for number, lines in iter_frame_lines(lines_to_columns(data))] == [(0, 2), (15, 0)]